@@ -0,0 +1,103 @@
+"""Benchmark PDF export throughput against the number of rendering workers.
+
+Renders synthetic consultation reports the way the export endpoints do, from
+an asyncio event loop, once in a thread pool (the old behaviour) and once in
+process pools of increasing size. For each run it reports reports per second
+and how late a 5 ms timer on the event loop fires, which stands in for API
+requests waiting behind ReportLab for the GIL.
+
+    uv run python benchmarks/bench_pdf_rendering.py --reports 200 --workers 1,2,4,8
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from services.export_service import render_session_pdf  # noqa: E402
+from services.pdf_service import render_to_file          # noqa: E402
+
+TICK = 0.005
+
+def sample_report(n_transcripts: int, n_suggestions: int) -> dict:
+    """A consultation report about the size of a long visit."""
+    return {
+        "session":     {"id": 1, "title": "Benchmark consultation", "created_at": "2026-01-01 09:30:00"},
+        "transcripts": [
+            "Patient reports fever and a dry cough for three days, worse at night, with mild chest pain. " * 20
+            for _ in range(n_transcripts)
+        ],
+        "suggestions": [
+            {
+                "type":        ["diagnosis", "test", "drug", "red_flag"][i % 4],
+                "content":     "Consider community-acquired pneumonia; order a chest X-ray and CBC. " * 3,
+                "confidence":  "medium",
+                "status":      "pending",
+                "doctor_note": None,
+            }
+            for i in range(n_suggestions)
+        ],
+    }
+
+async def measure_lag(stop: asyncio.Event, lags: list):
+    """Record how much later than scheduled a short sleep on the event loop wakes up."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+async def render_all(executor, report: dict, n_reports: int, spool: str) -> tuple:
+    loop  = asyncio.get_running_loop()
+    stop  = asyncio.Event()
+    lags  = []
+    timer = asyncio.create_task(measure_lag(stop, lags))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        loop.run_in_executor(executor, render_to_file, render_session_pdf, report, os.path.join(spool, f"{i}.pdf"))
+        for i in range(n_reports)
+    ))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await timer
+    return elapsed, lags
+
+def run(label: str, executor, report: dict, n_reports: int):
+    with tempfile.TemporaryDirectory() as spool:
+        # Warm up so process start-up and imports aren't counted
+        asyncio.run(render_all(executor, report, executor._max_workers, spool))
+        elapsed, lags = asyncio.run(render_all(executor, report, n_reports, spool))
+    lags.sort()
+    p95 = lags[int(len(lags) * 0.95)] if lags else 0
+    print(f"{label:<18} {n_reports / elapsed:>10.1f} {statistics.median(lags) * 1000:>14.2f} {p95 * 1000:>11.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--reports",     type=int, default=200, help="reports rendered per run")
+    parser.add_argument("--workers",     default="1,2,4", help="comma-separated process pool sizes")
+    parser.add_argument("--threads",     type=int, default=4, help="thread pool size for the baseline")
+    parser.add_argument("--transcripts", type=int, default=5, help="transcripts per report")
+    parser.add_argument("--suggestions", type=int, default=12, help="suggestions per report")
+    args = parser.parse_args()
+
+    report = sample_report(args.transcripts, args.suggestions)
+    with tempfile.TemporaryDirectory() as spool:
+        size = render_to_file(render_session_pdf, report, os.path.join(spool, "sample.pdf"))
+    print(f"{args.reports} reports, {size // 1024} KB each, {os.cpu_count()} CPUs\n")
+    print(f"{'executor':<18} {'reports/s':>10} {'loop lag p50':>14} {'lag p95':>11}  (ms)")
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        run(f"threads x{args.threads}", executor, report, args.reports)
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            run(f"processes x{workers}", executor, report, args.reports)
+
+if __name__ == "__main__":
+    main()
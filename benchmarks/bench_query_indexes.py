@@ -0,0 +1,146 @@
+"""Benchmark the hot per-session queries with and without the secondary indexes.
+
+Loads synthetic sessions, transcripts and suggestions into a scratch database,
+then times the "latest transcript for a session" and "suggestions for a
+session" queries before and after creating the indexes from migration 0003.
+
+Point BENCH_DATABASE_URL at an empty database — the script drops and
+recreates the tables there. It never touches DATABASE_URL.
+
+    BENCH_DATABASE_URL=postgresql://... uv run python benchmarks/bench_query_indexes.py --transcripts 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, insert, select, text
+
+load_dotenv()
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL")
+if not BENCH_DATABASE_URL:
+    sys.exit("Set BENCH_DATABASE_URL to a scratch database; this script drops its tables.")
+
+# db.database refuses to import without DATABASE_URL; the models only need the metadata
+os.environ.setdefault("DATABASE_URL", BENCH_DATABASE_URL)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from db.database import Base       # noqa: E402
+from db import models              # noqa: E402
+
+SECONDARY_INDEXES = ["ix_transcripts_session_id_created_at", "ix_suggestions_session_id_status"]
+BATCH_SIZE        = 10_000
+
+def load_data(engine, n_sessions: int, n_transcripts: int, n_suggestions: int):
+    """Recreate the tables and fill them with synthetic rows."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        for i in range(0, n_sessions, BATCH_SIZE):
+            conn.execute(insert(models.Session), [
+                {"id": j + 1, "title": f"Consultation {j + 1}", "created_at": start + timedelta(minutes=j)}
+                for j in range(i, min(i + BATCH_SIZE, n_sessions))
+            ])
+        print(f"Inserted {n_sessions} sessions")
+
+        for i in range(0, n_transcripts, BATCH_SIZE):
+            conn.execute(insert(models.Transcript), [
+                {
+                    "session_id": random.randint(1, n_sessions),
+                    "text":       "Patient reports fever and a dry cough for three days.",
+                    "created_at": start + timedelta(seconds=random.randint(0, 365 * 86400)),
+                }
+                for _ in range(i, min(i + BATCH_SIZE, n_transcripts))
+            ])
+        print(f"Inserted {n_transcripts} transcripts")
+
+        statuses = list(models.FeedbackStatus)
+        for i in range(0, n_suggestions, BATCH_SIZE):
+            conn.execute(insert(models.Suggestion), [
+                {
+                    "session_id": random.randint(1, n_sessions),
+                    "type":       "diagnosis",
+                    "content":    "Viral upper respiratory tract infection",
+                    "confidence": "medium",
+                    "status":     random.choice(statuses),
+                }
+                for _ in range(i, min(i + BATCH_SIZE, n_suggestions))
+            ])
+        print(f"Inserted {n_suggestions} suggestions")
+
+def set_indexes(engine, enabled: bool):
+    """Create or drop the secondary indexes declared on the models."""
+    indexes = [
+        index
+        for table in (models.Transcript.__table__, models.Suggestion.__table__)
+        for index in table.indexes
+        if index.name in SECONDARY_INDEXES
+    ]
+    with engine.begin() as conn:
+        for index in indexes:
+            if enabled:
+                index.create(conn, checkfirst=True)
+            else:
+                index.drop(conn, checkfirst=True)
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ANALYZE"))
+
+def time_query(engine, build_query, n_sessions: int, runs: int) -> dict:
+    """Run a query for random sessions and return latency percentiles in milliseconds."""
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(runs):
+            query   = build_query(random.randint(1, n_sessions))
+            started = time.perf_counter()
+            conn.execute(query).all()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+    }
+
+def latest_transcript(session_id: int):
+    return (
+        select(models.Transcript)
+        .where(models.Transcript.session_id == session_id)
+        .order_by(models.Transcript.created_at.desc())
+        .limit(1)
+    )
+
+def session_suggestions(session_id: int):
+    return select(models.Suggestion).where(models.Suggestion.session_id == session_id)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions",    type=int, default=50_000)
+    parser.add_argument("--transcripts", type=int, default=1_000_000)
+    parser.add_argument("--suggestions", type=int, default=1_000_000)
+    parser.add_argument("--runs",        type=int, default=200)
+    parser.add_argument("--skip-load",   action="store_true", help="reuse data from a previous run")
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    if not args.skip_load:
+        load_data(engine, args.sessions, args.transcripts, args.suggestions)
+
+    queries = {
+        "latest transcript for session": latest_transcript,
+        "suggestions for session":       session_suggestions,
+    }
+
+    print(f"\n{'query':<32}{'indexes':<10}{'p50 ms':>10}{'p95 ms':>10}")
+    for enabled in (False, True):
+        set_indexes(engine, enabled)
+        for name, build_query in queries.items():
+            result = time_query(engine, build_query, args.sessions, args.runs)
+            print(f"{name:<32}{'on' if enabled else 'off':<10}{result['p50']:>10.2f}{result['p95']:>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -13,12 +15,59 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set in the .env file")
 
+# Connection pool settings. Neon closes idle connections, so connections are
+# recycled before that happens and checked with a ping before being reused.
+DB_POOL_SIZE     = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW  = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT  = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE  = int(os.getenv("DB_POOL_RECYCLE", "240"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# Driver used by the async engine: asyncpg or psycopg (psycopg 3)
+DB_ASYNC_DRIVER  = os.getenv("DB_ASYNC_DRIVER", "asyncpg")
+
+POOL_OPTIONS = dict(
+    pool_size     = DB_POOL_SIZE,
+    max_overflow  = DB_MAX_OVERFLOW,
+    pool_timeout  = DB_POOL_TIMEOUT,
+    pool_recycle  = DB_POOL_RECYCLE,
+    pool_pre_ping = DB_POOL_PRE_PING,
+)
+
+def make_async_url(url: str, driver: str = DB_ASYNC_DRIVER):
+    """Turn the sync DATABASE_URL into the equivalent URL for an async driver."""
+    url = make_url(url)
+
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+
+    if driver not in ("asyncpg", "psycopg"):
+        raise ValueError(f"Unsupported DB_ASYNC_DRIVER: {driver}")
+
+    url = url.set(drivername=f"postgresql+{driver}")
+    if driver == "asyncpg":
+        # asyncpg doesn't understand libpq-only query options such as the
+        # sslmode/channel_binding parameters in Neon connection strings
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        query.pop("channel_binding", None)
+        url = url.set(query=query)
+    return url
+
 # Create the engine that connects to the PostgreSQL database
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
+
+# Async engine for routes that run on the event loop
+async_engine = create_async_engine(make_async_url(DATABASE_URL), **POOL_OPTIONS)
 
 # Each request gets its own isolated database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async sessions keep loaded attributes after commit, since lazy loading
+# isn't available outside of an await
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Base class that all models inherit from to register their tables
 Base = declarative_base()
 
@@ -29,4 +78,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Async equivalent of get_db, for async routes
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from db.database import Base
@@ -14,15 +14,25 @@ class FeedbackStatus(str, enum.Enum):
 # Represents a single doctor-patient consultation
 class Session(Base):
     __tablename__ = "sessions"
+    __table_args__ = (
+        # Matches the newest-first keyset pagination used by the session list
+        Index("ix_sessions_created_at_id", "created_at", "id"),
+    )
 
     id         = Column(Integer, primary_key=True, index=True)
     title      = Column(String(200), default="New Consultation")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Watermark for incremental suggestions: everything before this position
+    # in the session's transcripts has already been analyzed
+    analyzed_transcript_id = Column(Integer, nullable=True)
+    analyzed_chars         = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Deleting a session also removes its transcripts and suggestions
-    transcripts = relationship("Transcript", back_populates="session", cascade="all, delete")
-    suggestions = relationship("Suggestion", back_populates="session", cascade="all, delete")
+    transcripts = relationship("Transcript", back_populates="session", cascade="all, delete", order_by="Transcript.created_at")
+    suggestions = relationship("Suggestion", back_populates="session", cascade="all, delete", order_by="Suggestion.id")
+    exports     = relationship("PdfExport", cascade="all, delete")
 
 # Stores the transcribed text produced from the audio recording
 class Transcript(Base):
@@ -33,7 +43,24 @@ class Transcript(Base):
     text       = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    session = relationship("Session", back_populates="transcripts")
+    session  = relationship("Session", back_populates="transcripts")
+    analysis = relationship("TranscriptAnalysis", back_populates="transcript", uselist=False, cascade="all, delete")
+
+# Serves "latest transcript for a session" without scanning the table
+Index("ix_transcripts_session_id_created_at", Transcript.session_id, Transcript.created_at.desc())
+
+# Stores the symptom extraction and retrieval results for a transcript so the
+# suggestions and discharge flows can share them instead of recomputing
+class TranscriptAnalysis(Base):
+    __tablename__ = "transcript_analyses"
+
+    id            = Column(Integer, primary_key=True, index=True)
+    transcript_id = Column(Integer, ForeignKey("transcripts.id"), nullable=False, unique=True)
+    symptoms      = Column(Text, nullable=False)   # comma-separated terms extracted by the LLM
+    chunk_ids     = Column(JSON, nullable=False)   # knowledge base chunk IDs, in retrieval order
+    created_at    = Column(DateTime(timezone=True), server_default=func.now())
+
+    transcript = relationship("Transcript", back_populates="analysis")
 
 # Stores each AI-generated suggestion linked to a session
 class Suggestion(Base):
@@ -49,4 +76,59 @@ class Suggestion(Base):
     doctor_note = Column(Text, nullable=True)  # filled in if the doctor modifies the suggestion
     created_at  = Column(DateTime(timezone=True), server_default=func.now())
 
-    session = relationship("Session", back_populates="suggestions")
\ No newline at end of file
+    session = relationship("Session", back_populates="suggestions")
+
+# Serves per-session suggestion lookups, optionally filtered by feedback status
+Index("ix_suggestions_session_id_status", Suggestion.session_id, Suggestion.status)
+
+# Text and provenance of each knowledge base chunk, keyed by the same ID as its
+# vector. The vector index only holds IDs; suggestions cite chunks by ID.
+class KnowledgeChunk(Base):
+    __tablename__ = "knowledge_chunks"
+
+    id         = Column(String(64), primary_key=True)
+    text       = Column(Text, nullable=False)
+    source     = Column(String(300))                 # OpenFDA or the guideline title
+    drug_name  = Column(String(300), nullable=True)  # drug label chunks only
+    page       = Column(Integer, nullable=True)      # guideline PDF chunks only
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+# The last rendered PDF of each kind for a session, served again while the
+# session is unchanged. etag identifies the session version it was built from
+# and names the file it is stored in (see export_cache_service).
+class PdfExport(Base):
+    __tablename__ = "pdf_exports"
+    __table_args__ = (
+        UniqueConstraint("session_id", "kind", name="uq_pdf_exports_session_id_kind"),
+    )
+
+    id         = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False)
+    kind       = Column(String(20), nullable=False)   # export | discharge
+    etag       = Column(String(80), nullable=False)
+    size       = Column(Integer, nullable=False)      # bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# A long-running pipeline (suggestions, discharge summary, transcription)
+# queued to run outside the request that asked for it. Workers claim queued
+# jobs by flipping their status, so the table is the queue and no broker is needed.
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Serves the workers' "next queued job that is due" lookup
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id          = Column(String(32), primary_key=True)   # random hex, so job URLs can't be guessed
+    kind        = Column(String(30), nullable=False)     # suggestions | discharge | transcribe
+    status      = Column(String(20), nullable=False, default="queued")  # queued | running | succeeded | failed
+    session_id  = Column(Integer, nullable=True, index=True)
+    payload     = Column(JSON, nullable=False)           # arguments for the job handler
+    result      = Column(JSON, nullable=True)
+    error       = Column(Text, nullable=True)
+    attempts    = Column(Integer, nullable=False, default=0, server_default="0")
+    run_at      = Column(DateTime(timezone=True), nullable=False)  # not picked up before this, for retry backoff
+    created_at  = Column(DateTime(timezone=True), server_default=func.now())
+    started_at  = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, update
+from sqlalchemy.orm import joinedload, selectinload
+from db import models
+
+def session_with_children(session_id: int, with_suggestions: bool = True):
+    """Build a query for a session with its transcripts (and suggestions) loaded up front.
+
+    Transcripts are joined into the session query and suggestions are fetched
+    with one extra SELECT ... IN, so reading either collection afterwards never
+    triggers a lazy load. Works with both sync and async sessions:
+    `db.scalars(query).unique().first()`.
+    """
+    query = (
+        select(models.Session)
+        .where(models.Session.id == session_id)
+        .options(joinedload(models.Session.transcripts))
+    )
+    if with_suggestions:
+        query = query.options(selectinload(models.Session.suggestions))
+    return query
+
+def touch_session(session_id: int):
+    """Build an update that marks a session as changed, for edits to its transcripts or suggestions.
+
+    Cached PDF exports are versioned by the session's updated_at, so anything
+    that changes what an export shows has to bump it. The time is set here
+    rather than by the database so edits within the same second still differ.
+    """
+    return (
+        update(models.Session)
+        .where(models.Session.id == session_id)
+        .values(updated_at=datetime.now(timezone.utc))
+    )
+
+def set_watermark(session_id: int, transcript_id: int, chars: int):
+    """Build an update that moves a session's analysis watermark.
+
+    updated_at is left as it is: analysis changes no field an export shows,
+    and the suggestions it saves raise the max suggestion ID the session
+    export is versioned by, so the discharge summary keeps its ETag.
+    """
+    return (
+        update(models.Session)
+        .where(models.Session.id == session_id)
+        .values(analyzed_transcript_id=transcript_id, analyzed_chars=chars, updated_at=models.Session.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
@@ -0,0 +1,69 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Optional
+from db.models import FeedbackStatus
+
+# Response models returned by the API. They read straight from ORM objects,
+# so routes can return query results and FastAPI serializes only these fields.
+
+class SessionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id:         int
+    title:      Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class SessionPage(BaseModel):
+    items:       list[SessionOut]
+    next_cursor: Optional[str] = None   # pass back as ?cursor= to get the next page
+
+class TranscriptOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id:         int
+    session_id: int
+    text:       str
+    created_at: Optional[datetime] = None
+
+class SuggestionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id:          int
+    session_id:  int
+    type:        Optional[str] = None
+    content:     Optional[str] = None
+    confidence:  Optional[str] = None
+    source_docs: Optional[str] = None
+    status:      Optional[FeedbackStatus] = None
+    doctor_note: Optional[str] = None
+    created_at:  Optional[datetime] = None
+
+class SessionDetail(BaseModel):
+    session:     SessionOut
+    transcripts: list[TranscriptOut]
+    suggestions: list[SuggestionOut]
+
+class SuggestionsResponse(BaseModel):
+    suggestions: list[SuggestionOut]
+
+class ChunkOut(BaseModel):
+    id:        str
+    text:      str
+    source:    Optional[str] = None
+    drug_name: Optional[str] = None
+    page:      Optional[int] = None
+
+class JobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id:          str
+    kind:        str
+    status:      str                       # queued | running | succeeded | failed
+    session_id:  Optional[int] = None
+    attempts:    int = 0
+    result:      Optional[dict] = None     # set once the job has succeeded
+    error:       Optional[str] = None      # last failure, kept while a retry is queued
+    created_at:  Optional[datetime] = None
+    started_at:  Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -9,10 +9,10 @@ const client = axios.create({
 })
 
 // Session endpoints
-export const createSession = (title) => client.post('/sessions', { title })
-export const getSessions   = ()      => client.get('/sessions')
-export const getSession    = (id)    => client.get(`/sessions/${id}`)
-export const deleteSession = (id)    => client.delete(`/sessions/${id}`)
+export const createSession = (title)  => client.post('/sessions', { title })
+export const getSessions   = (params) => client.get('/sessions', { params })
+export const getSession    = (id)     => client.get(`/sessions/${id}`)
+export const deleteSession = (id)     => client.delete(`/sessions/${id}`)
 
 // Transcription endpoint — sends audio as form data
 export const transcribeAudio = (audioBlob, sessionId) => {
@@ -24,9 +24,80 @@ export const transcribeAudio = (audioBlob, sessionId) => {
   })
 }
 
-// Suggestions endpoint
-export const getSuggestions = (sessionId) =>
-  client.post('/suggestions', { session_id: sessionId })
+// Live transcription socket — send audio windows as binary messages and the
+// text "end" when done; the server replies with the transcript so far
+export const openLiveTranscription = (sessionId) => {
+  const base = new URL(client.defaults.baseURL, window.location.href)
+  base.protocol = base.protocol === 'https:' ? 'wss:' : 'ws:'
+  const socket = new WebSocket(`${base.href.replace(/\/$/, '')}/transcribe/live?session_id=${sessionId}`)
+  socket.binaryType = 'arraybuffer'
+  return socket
+}
+
+// Suggestions endpoint — incremental only analyzes transcript text added since
+// the last run and returns all of the session's suggestions
+export const getSuggestions = (sessionId, incremental = false) =>
+  client.post('/suggestions', { session_id: sessionId, incremental })
+
+// Streaming suggestions endpoint — calls onSuggestion for each suggestion as
+// soon as the server sends it, and resolves once the stream is finished
+export const streamSuggestions = async (sessionId, onSuggestion) => {
+  const res = await fetch(`${client.defaults.baseURL}/suggestions/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ session_id: sessionId }),
+  })
+  if (!res.ok) throw new Error(`Request failed with status ${res.status}`)
+
+  const reader  = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer    = ''
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    // Server-sent events are separated by a blank line
+    const events = buffer.split('\n\n')
+    buffer       = events.pop()
+    for (const event of events) {
+      const lines = event.split('\n')
+      const name  = lines.find(l => l.startsWith('event: '))?.slice(7)
+      const data  = lines.find(l => l.startsWith('data: '))?.slice(6)
+      if (name === 'suggestion' && data) onSuggestion(JSON.parse(data))
+    }
+  }
+}
+
+// Background jobs — pass { background: true } as params to /transcribe,
+// /suggestions or /sessions/{id}/discharge to get a 202 with a job instead
+export const getJob = (jobId) => client.get(`/jobs/${jobId}`)
+
+// Follow a job over server-sent events — calls onUpdate with the job whenever
+// its status changes, and resolves with it once it has succeeded or failed
+export const watchJob = (jobId, onUpdate = () => {}) =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(`${client.defaults.baseURL}/jobs/${jobId}/events`)
+    let job      = null
+
+    source.addEventListener('status', (e) => {
+      job = JSON.parse(e.data)
+      onUpdate(job)
+    })
+    source.addEventListener('done', () => {
+      source.close()
+      resolve(job)
+    })
+    source.onerror = () => {
+      source.close()
+      reject(new Error('Lost connection to the job event stream'))
+    }
+  })
+
+// Knowledge base passages cited by a suggestion
+export const getSuggestionSources = (suggestionId) =>
+  client.get(`/suggestions/${suggestionId}/sources`)
 
 // Feedback endpoint
 export const submitFeedback = (suggestionId, status, doctorNote = null) =>
@@ -1,64 +1,87 @@
 import { useState, useRef } from 'react'
-import { transcribeAudio } from '../api/client'
+import { openLiveTranscription } from '../api/client'
+
+// Length of each audio window sent for live transcription
+const WINDOW_MS = 8000
 
 export default function AudioRecorder({ sessionId, onTranscriptReady }) {
   const [recording, setRecording]   = useState(false)
   const [loading, setLoading]       = useState(false)
   const [error, setError]           = useState(null)
 
-  // Hold a reference to the MediaRecorder instance across renders
-  const mediaRecorderRef = useRef(null)
-  // Collect audio chunks as they come in during recording
-  const audioChunksRef   = useRef([])
+  // Hold references to the microphone, socket and window timer across renders
+  const streamRef   = useRef(null)
+  const socketRef   = useRef(null)
+  const recorderRef = useRef(null)
+  const timerRef    = useRef(null)
+
+  // Record one self-contained window; restarting the recorder for every window
+  // gives each one its own header so the server can transcribe it on its own
+  const recordWindow = () => {
+    const recorder = new MediaRecorder(streamRef.current)
+    recorderRef.current = recorder
+    const chunks = []
+
+    recorder.ondataavailable = (e) => {
+      if (e.data.size > 0) chunks.push(e.data)
+    }
+
+    recorder.onstop = async () => {
+      const socket = socketRef.current
+      if (chunks.length && socket?.readyState === WebSocket.OPEN) {
+        const blob = new Blob(chunks, { type: 'audio/webm' })
+        socket.send(await blob.arrayBuffer())
+      }
+      // Start the next window, or tell the server the consultation is over
+      if (timerRef.current) recordWindow()
+      else socket?.send('end')
+    }
+
+    recorder.start()
+  }
 
-  // Start recording from the microphone
+  // Start recording from the microphone and stream it to the server
   const startRecording = async () => {
     setError(null)
     try {
-      const stream = await navigator.mediaDevices.getUserMedia({ audio: true })
-      const mediaRecorder = new MediaRecorder(stream)
-      mediaRecorderRef.current = mediaRecorder
-      audioChunksRef.current   = []
-
-      // Collect audio data as it becomes available
-      mediaRecorder.ondataavailable = (e) => {
-        if (e.data.size > 0) audioChunksRef.current.push(e.data)
-      }
+      streamRef.current = await navigator.mediaDevices.getUserMedia({ audio: true })
+    } catch {
+      setError('Microphone access was denied. Please allow microphone access and try again.')
+      return
+    }
 
-      // When recording stops, send the audio to Whisper
-      mediaRecorder.onstop = async () => {
-        const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' })
-        await sendToWhisper(audioBlob)
+    const socket = openLiveTranscription(sessionId)
+    socketRef.current = socket
 
-        // Stop all microphone tracks to release the mic
-        stream.getTracks().forEach(t => t.stop())
-      }
+    // Show the transcript as it grows; the final message closes the recording
+    socket.onmessage = (e) => {
+      const message = JSON.parse(e.data)
+      if (message.text) onTranscriptReady(message.text)
+      if (message.type === 'final') setLoading(false)
+    }
+    socket.onerror = () => {
+      setError('Transcription failed. Please try again.')
+      setLoading(false)
+    }
+    socket.onclose = () => setLoading(false)
 
-      mediaRecorder.start()
+    socket.onopen = () => {
+      recordWindow()
+      timerRef.current = setInterval(() => recorderRef.current?.stop(), WINDOW_MS)
       setRecording(true)
-    } catch {
-      setError('Microphone access was denied. Please allow microphone access and try again.')
     }
   }
 
-  // Stop the recording and trigger onstop
+  // Stop recording; the last window is sent before the socket is told to finish
   const stopRecording = () => {
-    mediaRecorderRef.current?.stop()
-    setRecording(false)
-  }
+    clearInterval(timerRef.current)
+    timerRef.current = null
+    recorderRef.current?.stop()
 
-  // Send the recorded audio blob to the FastAPI transcribe endpoint
-  const sendToWhisper = async (audioBlob) => {
+    // Stop all microphone tracks to release the mic
+    streamRef.current?.getTracks().forEach(t => t.stop())
+    setRecording(false)
     setLoading(true)
-    try {
-      const res = await transcribeAudio(audioBlob, sessionId)
-      // Pass the transcript text up to the parent component
-      onTranscriptReady(res.data.text)
-    } catch {
-      setError('Transcription failed. Please try again.')
-    } finally {
-      setLoading(false)
-    }
   }
 
   return (
@@ -66,7 +89,7 @@ export default function AudioRecorder({ sessionId, onTranscriptReady }) {
       {error && <p className="error">{error}</p>}
 
       {loading ? (
-        <p>Transcribing audio, please wait...</p>
+        <p>Finishing transcription, please wait...</p>
       ) : recording ? (
         <button onClick={stopRecording} className="btn btn-stop">
           Stop Recording
@@ -80,4 +103,4 @@ export default function AudioRecorder({ sessionId, onTranscriptReady }) {
       {recording && <p className="recording-indicator">Recording in progress...</p>}
     </div>
   )
-}
\ No newline at end of file
+}
@@ -1,5 +1,5 @@
 import { useState } from 'react'
-import { submitFeedback } from '../api/client'
+import { submitFeedback, getSuggestionSources } from '../api/client'
 
 export default function SuggestionCard({ suggestion, onFeedbackSubmitted }) {
   const [status, setStatus]       = useState(suggestion.status)
@@ -7,6 +7,7 @@ export default function SuggestionCard({ suggestion, onFeedbackSubmitted }) {
   const [editing, setEditing]     = useState(false)
   const [loading, setLoading]     = useState(false)
   const [error, setError]         = useState(null)
+  const [sources, setSources]     = useState(null)
 
   // Submit the doctor's feedback for this suggestion
   const handleFeedback = async (newStatus) => {
@@ -25,6 +26,20 @@ export default function SuggestionCard({ suggestion, onFeedbackSubmitted }) {
     }
   }
 
+  // Load the cited knowledge base passages the first time, then toggle them
+  const toggleSources = async () => {
+    if (sources) {
+      setSources(null)
+      return
+    }
+    try {
+      const res = await getSuggestionSources(suggestion.id)
+      setSources(res.data)
+    } catch {
+      setError('Failed to load sources.')
+    }
+  }
+
   // Map suggestion type to a readable label
   const typeLabels = {
     diagnosis: 'Diagnosis',
@@ -57,10 +72,23 @@ export default function SuggestionCard({ suggestion, onFeedbackSubmitted }) {
       {/* The actual suggestion content */}
       <p className="suggestion-content">{suggestion.content}</p>
 
-      {/* Show which knowledge base chunks were used */}
+      {/* Show which knowledge base chunks were cited, expandable to their text */}
       {suggestion.source_docs && (
-        <p className="source-docs">Source: {suggestion.source_docs}</p>
+        <p className="source-docs">
+          <button onClick={toggleSources} className="link-button">
+            {sources ? 'Hide sources' : `Sources (${suggestion.source_docs.split(',').length})`}
+          </button>
+        </p>
       )}
+      {sources && sources.map((chunk) => (
+        <blockquote key={chunk.id} className="source-chunk">
+          <strong>
+            {chunk.drug_name || chunk.source}
+            {chunk.page ? `, p. ${chunk.page}` : ''}
+          </strong>
+          <p>{chunk.text}</p>
+        </blockquote>
+      ))}
 
       {/* Doctor note input — only visible when modifying */}
       {editing && (
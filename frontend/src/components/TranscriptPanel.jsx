@@ -1,18 +1,18 @@
 import { useState } from 'react'
-import { getSuggestions } from '../api/client'
+import { getSuggestions, streamSuggestions } from '../api/client'
 
-export default function TranscriptPanel({ sessionId, transcript, onSuggestionsReady }) {
+export default function TranscriptPanel({ sessionId, transcript, hasSuggestions, onSuggestionsReady, onSuggestionReceived }) {
   const [loading, setLoading] = useState(false)
   const [error, setError]     = useState(null)
 
-  // Send the transcript to the RAG pipeline and get AI suggestions back
+  // Send the transcript to the RAG pipeline and show each suggestion as it streams in
   const handleGetSuggestions = async () => {
     setLoading(true)
     setError(null)
     try {
-      const res = await getSuggestions(sessionId)
-      // Pass the suggestions up to the parent component
-      onSuggestionsReady(res.data.suggestions)
+      onSuggestionsReady([])
+      // Pass each suggestion up to the parent component as soon as it arrives
+      await streamSuggestions(sessionId, onSuggestionReceived)
     } catch {
       setError('Failed to generate suggestions. Please try again.')
     } finally {
@@ -20,6 +20,20 @@ export default function TranscriptPanel({ sessionId, transcript, onSuggestionsRe
     }
   }
 
+  // Add suggestions for whatever was said since the last run
+  const handleRefreshSuggestions = async () => {
+    setLoading(true)
+    setError(null)
+    try {
+      const res = await getSuggestions(sessionId, true)
+      onSuggestionsReady(res.data.suggestions)
+    } catch {
+      setError('Failed to refresh suggestions. Please try again.')
+    } finally {
+      setLoading(false)
+    }
+  }
+
   // Nothing to show if there is no transcript yet
   if (!transcript) return null
 
@@ -35,12 +49,13 @@ export default function TranscriptPanel({ sessionId, transcript, onSuggestionsRe
       {error && <p className="error">{error}</p>}
 
       {/* Once the doctor reviews the transcript, they can request AI suggestions */}
+      {/* Later requests only analyze the part of the transcript that is new */}
       <button
-        onClick={handleGetSuggestions}
+        onClick={hasSuggestions ? handleRefreshSuggestions : handleGetSuggestions}
         disabled={loading}
         className="btn btn-primary"
       >
-        {loading ? 'Generating suggestions...' : 'Get AI Suggestions'}
+        {loading ? 'Generating suggestions...' : hasSuggestions ? 'Refresh AI Suggestions' : 'Get AI Suggestions'}
       </button>
     </div>
   )
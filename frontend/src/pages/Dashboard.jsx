@@ -63,10 +63,10 @@ export default function Dashboard() {
     }
   }
 
-  // Called by AudioRecorder when Whisper returns the transcript
+  // Called by AudioRecorder whenever the live transcript grows; existing
+  // suggestions stay, and a refresh only adds ones for the new text
   const handleTranscriptReady = (text) => {
     setTranscript(text)
-    setSuggestions([])
   }
 
   // Called by TranscriptPanel when the RAG pipeline returns suggestions
@@ -74,6 +74,11 @@ export default function Dashboard() {
     setSuggestions(data)
   }
 
+  // Called by TranscriptPanel for each suggestion streamed from the RAG pipeline
+  const handleSuggestionReceived = (suggestion) => {
+    setSuggestions(prev => [...prev, suggestion])
+  }
+
   // Refresh the session data after the doctor submits feedback
   const handleFeedbackSubmitted = async () => {
     if (!session) return
@@ -146,7 +151,9 @@ export default function Dashboard() {
             <TranscriptPanel
               sessionId={session.id}
               transcript={transcript}
+              hasSuggestions={suggestions.length > 0}
               onSuggestionsReady={handleSuggestionsReady}
+              onSuggestionReceived={handleSuggestionReceived}
             />
           </div>
 
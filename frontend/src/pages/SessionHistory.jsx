@@ -2,22 +2,47 @@ import { useState, useEffect } from 'react'
 import { useNavigate } from 'react-router-dom'
 import { getSessions, deleteSession } from '../api/client'
 
+const PAGE_SIZE = 20
+
 export default function SessionHistory() {
-  const [sessions, setSessions] = useState([])
-  const [loading, setLoading]   = useState(true)
-  const [error, setError]       = useState(null)
-  const navigate                = useNavigate()
+  const [sessions, setSessions]       = useState([])
+  const [nextCursor, setNextCursor]   = useState(null)
+  const [search, setSearch]           = useState('')
+  const [dateFrom, setDateFrom]       = useState('')
+  const [dateTo, setDateTo]           = useState('')
+  const [loading, setLoading]         = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [error, setError]             = useState(null)
+  const navigate                      = useNavigate()
 
-  // Load all sessions when the page mounts
+  // Reload the first page whenever the filters change, debounced while typing
   useEffect(() => {
-    loadSessions()
-  }, [])
+    const timer = setTimeout(() => loadSessions(), 300)
+    return () => clearTimeout(timer)
+  }, [search, dateFrom, dateTo]) // eslint-disable-line react-hooks/exhaustive-deps
+
+  // Build the query parameters for the current filters and page
+  const buildParams = (cursor) => {
+    const params = { limit: PAGE_SIZE }
+    if (cursor)   params.cursor       = cursor
+    if (search)   params.q            = search
+    if (dateFrom) params.created_from = dateFrom
+    // Include the whole of the end day
+    if (dateTo) {
+      const end = new Date(dateTo)
+      end.setDate(end.getDate() + 1)
+      params.created_to = end.toISOString().slice(0, 10)
+    }
+    return params
+  }
 
   const loadSessions = async () => {
     setLoading(true)
+    setError(null)
     try {
-      const res = await getSessions()
-      setSessions(res.data)
+      const res = await getSessions(buildParams(null))
+      setSessions(res.data.items)
+      setNextCursor(res.data.next_cursor)
     } catch {
       setError('Failed to load sessions.')
     } finally {
@@ -25,6 +50,20 @@ export default function SessionHistory() {
     }
   }
 
+  // Fetch the next page and append it to the list
+  const loadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const res = await getSessions(buildParams(nextCursor))
+      setSessions(prev => [...prev, ...res.data.items])
+      setNextCursor(res.data.next_cursor)
+    } catch {
+      setError('Failed to load more sessions.')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleDelete = async (id) => {
     try {
       await deleteSession(id)
@@ -49,6 +88,18 @@ export default function SessionHistory() {
         </button>
       </div>
 
+      {/* Search by title and filter by date range */}
+      <div className="session-filters">
+        <input
+          type="search"
+          placeholder="Search by title"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+        />
+        <input type="date" value={dateFrom} onChange={(e) => setDateFrom(e.target.value)} />
+        <input type="date" value={dateTo}   onChange={(e) => setDateTo(e.target.value)} />
+      </div>
+
       {error && <p className="error">{error}</p>}
 
       {loading ? (
@@ -80,8 +131,14 @@ export default function SessionHistory() {
               </div>
             </div>
           ))}
+
+          {nextCursor && (
+            <button onClick={loadMore} disabled={loadingMore} className="btn btn-secondary load-more">
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
       )}
     </div>
   )
-}
\ No newline at end of file
+}
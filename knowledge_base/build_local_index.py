@@ -0,0 +1,69 @@
+import os
+import sys
+import json
+import sqlite3
+import re
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from services.retrieval_service import LOCAL_INDEX_PATH, LOCAL_EMBED_MODEL, KeywordIndex, load_embedding_model, normalize_rows  # noqa: E402
+from services.chunk_service import save_chunks  # noqa: E402
+
+# Chunks stored by an earlier LangChain + Chroma version of the knowledge base
+CHROMA_PATH = os.path.join(os.path.dirname(__file__), "chroma_store", "chroma.sqlite3")
+
+BATCH_SIZE = 64
+
+def load_chroma_chunks(path: str = CHROMA_PATH) -> list:
+    """Read chunk IDs, texts and sources from the Chroma SQLite store."""
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as conn:
+        rows = conn.execute("""
+            SELECT e.embedding_id, d.string_value, s.string_value
+            FROM embeddings e
+            JOIN embedding_metadata d ON d.id = e.id AND d.key = 'chroma:document'
+            LEFT JOIN embedding_metadata s ON s.id = e.id AND s.key = 'source'
+            ORDER BY e.id
+        """).fetchall()
+    return [
+        {"id": chunk_id, "text": text, "source": source, "drug_name": drug_name_from_text(text)}
+        for chunk_id, text, source in rows if text and text.strip()
+    ]
+
+def drug_name_from_text(text: str):
+    """Drug label chunks that start a label begin with "Drug: Brand (generic)"."""
+    match = re.match(r"Drug: (.+)", text)
+    return match.group(1).strip() if match else None
+
+def write_local_index(chunks: list, path: str = LOCAL_INDEX_PATH, model_name: str = LOCAL_EMBED_MODEL):
+    """Embed chunks with the local model and save them as a local retrieval index.
+
+    The index is a directory holding the unit-length embeddings as a NumPy
+    matrix (embeddings.npy), one JSON line per chunk in the same row order
+    (chunks.jsonl), the BM25 index for hybrid search (keyword_index.json) and
+    the model name (meta.json), which is written last.
+    """
+    model = load_embedding_model(model_name)
+    texts = [c["text"] for c in chunks]
+
+    print(f"Embedding {len(texts)} chunks with {model_name}...")
+    embeddings = np.asarray(list(model.passage_embed(texts, batch_size=BATCH_SIZE)), dtype=np.float32)
+    embeddings = normalize_rows(embeddings)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "embeddings.npy"), embeddings)
+    with open(os.path.join(path, "chunks.jsonl"), "w") as f:
+        for chunk in chunks:
+            f.write(json.dumps({"id": chunk["id"], "text": chunk["text"]}) + "\n")
+    KeywordIndex.build(chunks).save(os.path.join(path, "keyword_index.json"))
+    # Text and provenance for citations, shared with the Pinecone setup
+    save_chunks(chunks)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"model": model_name, "dimension": int(embeddings.shape[1]), "count": len(chunks)}, f)
+
+    print(f"Local index written to {os.path.abspath(path)}")
+
+if __name__ == "__main__":
+    write_local_index(load_chroma_chunks())
@@ -3,17 +3,50 @@ import os
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from pinecone import Pinecone, ServerlessSpec
+from pypdf import PdfReader
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from dotenv import load_dotenv
+import argparse
+import hashlib
+import random
+import sqlite3
+import json
+import re
 import io
+import sys
 import time
+import threading
 
 load_dotenv()
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from services.retrieval_service import KeywordIndex  # noqa: E402
+from services.chunk_service import save_chunks, delete_chunks  # noqa: E402
+
 # Where WHO PDFs will be saved locally
 DOCS_PATH = os.path.join(os.path.dirname(__file__), "docs")
 
+# BM25 index over the same chunks and IDs as Pinecone, used by hybrid search
+KEYWORD_INDEX_PATH = os.path.join(os.path.dirname(__file__), "keyword_index.json")
+
+# Records which chunks are stored and where the last run got to, so a re-run
+# skips unchanged chunks and an interrupted run resumes from its last page
+CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), "ingest_checkpoint.sqlite3")
+
 # OpenFDA API endpoint for drug label information
-OPENFDA_URL = "https://api.fda.gov/drug/label.json"
+OPENFDA_URL     = "https://api.fda.gov/drug/label.json"
+OPENFDA_API_KEY = os.getenv("OPENFDA_API_KEY")  # optional, raises the daily request limit
+OPENFDA_MAX_SKIP = 25000                       # OpenFDA rejects larger skip values
+
+# Ingestion settings
+PAGE_SIZE   = int(os.getenv("INGEST_PAGE_SIZE", "100"))   # OpenFDA records per request
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "50"))  # chunks per embed/upsert call
+WORKERS     = int(os.getenv("INGEST_WORKERS", "4"))       # concurrent embed/upsert batches
+RETRIES     = int(os.getenv("INGEST_RETRIES", "5"))
+PDF_PAGES   = int(os.getenv("INGEST_PDF_PAGES", "10"))    # PDF pages read and chunked at a time
+
+EMBED_MODEL = "multilingual-e5-large"
 
 # Free WHO guideline PDFs — publicly available
 WHO_PDFS = [
@@ -27,26 +60,33 @@ WHO_PDFS = [
     },
 ]
 
+def with_retries(fn, *args, retries: int = None, **kwargs):
+    """Call fn, retrying failures with exponential backoff and jitter."""
+    retries = RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = min(2 ** attempt, 30) * (0.5 + random.random())
+            print(f"{getattr(fn, '__name__', 'call')} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
 # ----------------------------------------------------------------
 # OpenFDA
 # ----------------------------------------------------------------
 
-def fetch_openfda_drugs(limit=50):
-    """Fetch drug label data from the OpenFDA API."""
-    print(f"Fetching {limit} drug records from OpenFDA...")
-    params   = { "limit": limit, "skip": 0 }
-    response = requests.get(OPENFDA_URL, params=params, timeout=30)
-    response.raise_for_status()
-    return response.json().get("results", [])
-
-def parse_drug_to_text(drug):
-    """Convert a raw OpenFDA drug record into a readable text chunk."""
-    sections = []
-
+def drug_name(drug):
+    """Return "Brand (generic)" for an OpenFDA drug record."""
     openfda = drug.get("openfda", {})
     brand   = openfda.get("brand_name",   ["Unknown"])[0]
     generic = openfda.get("generic_name", ["Unknown"])[0]
-    sections.append(f"Drug: {brand} ({generic})")
+    return f"{brand} ({generic})"
+
+def parse_drug_to_text(drug):
+    """Convert a raw OpenFDA drug record into a readable text chunk."""
+    sections = [f"Drug: {drug_name(drug)}"]
 
     fields = {
         "indications_and_usage":     "Indications and Usage",
@@ -64,90 +104,560 @@ def parse_drug_to_text(drug):
 
     return "\n\n".join(sections)
 
-def load_openfda_documents():
-    """Fetch drugs from OpenFDA and convert them into LangChain Document objects."""
-    drugs = fetch_openfda_drugs(limit=50)
-    docs  = []
+def drugs_to_documents(drugs: list) -> list:
+    """Convert OpenFDA drug records into LangChain Document objects."""
+    docs = []
     for drug in drugs:
         text = parse_drug_to_text(drug)
         if text.strip():
             docs.append(Document(
                 page_content=text,
-                metadata={"source": "OpenFDA", "type": "drug_label"}
+                metadata={"source": "OpenFDA", "origin": "openfda", "type": "drug_label", "drug_name": drug_name(drug)}
             ))
-    print(f"Loaded {len(docs)} drug documents from OpenFDA")
     return docs
 
+class OpenFDASource:
+    """Pages through the OpenFDA drug label set.
+
+    A cursor is the next request to make, so a checkpointed cursor resumes
+    the listing where it stopped. OpenFDA returns a search_after link for the
+    next page in the Link header; plain skip paging is the fallback.
+    """
+
+    origins = ("openfda",)
+
+    def __init__(self, page_size: int = PAGE_SIZE):
+        self.page_size = page_size
+
+    def first_cursor(self) -> dict:
+        params = {"limit": self.page_size}
+        if OPENFDA_API_KEY:
+            params["api_key"] = OPENFDA_API_KEY
+        return {"url": OPENFDA_URL, "params": params}
+
+    def fetch_page(self, cursor: dict):
+        response = requests.get(cursor["url"], params=cursor.get("params"), timeout=30)
+        # OpenFDA answers 404 once a query runs past the last result
+        if response.status_code == 404:
+            return [], None
+        response.raise_for_status()
+        body = response.json()
+
+        next_url = response.links.get("next", {}).get("url")
+        if next_url:
+            return body.get("results", []), {"url": next_url, "params": None}
+
+        params = dict(cursor.get("params") or {})
+        skip   = params.get("skip", 0) + self.page_size
+        total  = body.get("meta", {}).get("results", {}).get("total", 0)
+        if not cursor.get("params") or skip >= total or skip > OPENFDA_MAX_SKIP:
+            return body.get("results", []), None
+        params["skip"] = skip
+        return body.get("results", []), {"url": cursor["url"], "params": params}
+
+    def pages(self, cursor: dict = None):
+        """Yield (documents, cursor for the page after) until the listing ends."""
+        cursor = cursor or self.first_cursor()
+        while cursor:
+            drugs, cursor = with_retries(self.fetch_page, cursor)
+            print(f"Fetched {len(drugs)} drug records from OpenFDA")
+            yield drugs_to_documents(drugs), cursor
+
+class FileSource:
+    """Local stand-in for OpenFDA: drug label records from a saved JSON
+    file, either a list of records or an OpenFDA response with "results".
+    """
+
+    origins = ("openfda",)
+
+    def __init__(self, path: str, page_size: int = PAGE_SIZE):
+        with open(path) as f:
+            data = json.load(f)
+        self.drugs     = data["results"] if isinstance(data, dict) else data
+        self.page_size = page_size
+
+    def pages(self, cursor: dict = None):
+        offset = (cursor or {}).get("offset", 0)
+        while offset < len(self.drugs):
+            drugs   = self.drugs[offset:offset + self.page_size]
+            offset += self.page_size
+            yield drugs_to_documents(drugs), ({"offset": offset} if offset < len(self.drugs) else None)
+
 # ----------------------------------------------------------------
-# Chunking and Storing in Pinecone
+# WHO guideline PDFs
 # ----------------------------------------------------------------
 
-def build_knowledge_base():
-    """Fetch all sources, chunk the text, embed with Pinecone inference, and store."""
+def download_pdf(url: str, path: str):
+    """Stream a PDF to disk, writing to a temporary name until it is complete."""
+    tmp_path = f"{path}.part"
+    with requests.get(url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(tmp_path, "wb") as out:
+            for block in response.iter_content(chunk_size=1024 * 1024):
+                out.write(block)
+    os.replace(tmp_path, path)
 
-    # Load documents
-    openfda_docs = load_openfda_documents()
-    all_docs     = openfda_docs
+def read_pdf_pages(path: str, start: int = 0):
+    """Yield (page number, text) one page at a time, starting at page index `start`.
 
-    print(f"\nTotal documents loaded: {len(all_docs)}")
+    pypdf only parses a page when it is accessed, so a long guideline is
+    never held in memory as a whole.
+    """
+    reader = PdfReader(path)
+    for index in range(start, len(reader.pages)):
+        text = reader.pages[index].extract_text() or ""
+        yield index + 1, text
 
-    # Split into smaller chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=500,
-        chunk_overlap=50,
-    )
-    chunks = splitter.split_documents(all_docs)
-    print(f"Total chunks after splitting: {len(chunks)}")
-
-    # Initialize Pinecone
-    pc         = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-    index_name = os.getenv("PINECONE_INDEX")
-    existing   = [i.name for i in pc.list_indexes()]
-
-    # Create index if it does not exist
-    if index_name not in existing:
-        print(f"Creating Pinecone index: {index_name}...")
-        pc.create_index(
-            name=index_name,
-            dimension=1024,  # dimension for multilingual-e5-large
-            metric="cosine",
-            spec=ServerlessSpec(cloud="aws", region="us-east-1")
-        )
-        # Wait for the index to be ready
-        while not pc.describe_index(index_name).status["ready"]:
-            time.sleep(1)
-        print("Index created.")
-    else:
-        print(f"Index '{index_name}' already exists.")
-
-    index = pc.Index(index_name)
-
-    # Embed and store chunks in batches of 50
-    print("Embedding and storing chunks in Pinecone...")
-    batch_size = 50
-    texts      = [c.page_content for c in chunks]
-
-    for i in range(0, len(texts), batch_size):
-        batch  = texts[i:i + batch_size]
-        # Embed the batch using Pinecone inference
-        embeddings = pc.inference.embed(
-            model="multilingual-e5-large",
-            inputs=batch,
+class PdfSource:
+    """Guideline PDFs from DOCS_PATH: the WHO_PDFS list, downloaded on first
+    use, followed by any other PDFs placed in the folder. Pages are read a
+    few at a time and each becomes a document tagged with its page number,
+    so chunks can be cited by page.
+
+    A cursor is the file and the index of the next page to read. PDFs that
+    can't be downloaded or read are listed in `failed`, so the run isn't
+    treated as complete and their stored chunks are kept.
+    """
+
+    origins = ("pdfs",)
+
+    def __init__(self, docs_path: str = DOCS_PATH, pdfs: list = WHO_PDFS, download: bool = True, pages_per_step: int = PDF_PAGES):
+        self.docs_path      = docs_path
+        self.pdfs           = pdfs
+        self.download       = download
+        self.pages_per_step = pages_per_step
+        self.failed         = []
+
+    def files(self) -> list:
+        """Return (file name, title) for each PDF to ingest, downloading the WHO PDFs if needed."""
+        os.makedirs(self.docs_path, exist_ok=True)
+        files = []
+        for pdf in self.pdfs:
+            name = os.path.basename(pdf["url"])
+            path = os.path.join(self.docs_path, name)
+            if not os.path.exists(path) and self.download:
+                print(f"Downloading {pdf['title']}...")
+                try:
+                    with_retries(download_pdf, pdf["url"], path)
+                except Exception as e:
+                    print(f"Skipping {pdf['title']}: {e}")
+                    self.failed.append(pdf["title"])
+            if os.path.exists(path):
+                files.append((name, pdf["title"]))
+
+        listed = {name for name, _ in files}
+        for name in sorted(os.listdir(self.docs_path)):
+            if name.lower().endswith(".pdf") and name not in listed:
+                files.append((name, os.path.splitext(name)[0].replace("_", " ")))
+        return files
+
+    def pages(self, cursor: dict = None):
+        files = self.files()
+        names = [name for name, _ in files]
+        first = names.index(cursor["file"]) if cursor and cursor.get("file") in names else 0
+
+        for i in range(first, len(files)):
+            name, title = files[i]
+            start       = cursor["page"] if cursor and i == first and cursor.get("file") == name else 0
+            print(f"Reading {title} from page {start + 1}")
+
+            docs = []
+            try:
+                for number, text in read_pdf_pages(os.path.join(self.docs_path, name), start):
+                    if text.strip():
+                        docs.append(Document(
+                            page_content=text,
+                            metadata={"source": title, "origin": "pdfs", "type": "guideline", "file": name, "page": number}
+                        ))
+                    if number % self.pages_per_step == 0:
+                        yield docs, {"file": name, "page": number}
+                        docs = []
+            except Exception as e:
+                print(f"Skipping the rest of {title}: {e}")
+                self.failed.append(title)
+
+            # The last pages of this file, then continue with the next one
+            following = {"file": files[i + 1][0], "page": 0} if i + 1 < len(files) else None
+            yield docs, following
+
+class CombinedSource:
+    """Runs several sources one after another. The cursor records which
+    source is current and that source's own cursor.
+    """
+
+    def __init__(self, sources: list):
+        self.sources = sources
+
+    @property
+    def origins(self) -> tuple:
+        return tuple(origin for source in self.sources for origin in source.origins)
+
+    @property
+    def failed(self) -> list:
+        return [name for source in self.sources for name in getattr(source, "failed", [])]
+
+    def pages(self, cursor: dict = None):
+        # A cursor from before sources were combined belongs to the first source
+        if cursor and "source" not in cursor:
+            cursor = {"source": 0, "cursor": cursor}
+        first = cursor["source"] if cursor else 0
+
+        for i in range(first, len(self.sources)):
+            inner = cursor["cursor"] if cursor and i == first else None
+            for docs, next_inner in self.sources[i].pages(inner):
+                if next_inner is not None:
+                    yield docs, {"source": i, "cursor": next_inner}
+                elif i + 1 < len(self.sources):
+                    yield docs, {"source": i + 1, "cursor": None}
+                else:
+                    yield docs, None
+
+# ----------------------------------------------------------------
+# Vector stores
+# ----------------------------------------------------------------
+
+class PineconeSink:
+    """Embeds chunks with Pinecone inference, saves their text to the chunk
+    store and their vectors to the Pinecone index, under the same IDs.
+    """
+
+    def __init__(self):
+        self.pc         = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        self.index_name = os.getenv("PINECONE_INDEX")
+        existing        = [i.name for i in self.pc.list_indexes()]
+
+        # Create index if it does not exist
+        if self.index_name not in existing:
+            print(f"Creating Pinecone index: {self.index_name}...")
+            self.pc.create_index(
+                name=self.index_name,
+                dimension=1024,  # dimension for multilingual-e5-large
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            )
+            # Wait for the index to be ready
+            while not self.pc.describe_index(self.index_name).status["ready"]:
+                time.sleep(1)
+            print("Index created.")
+        else:
+            print(f"Index '{self.index_name}' already exists.")
+
+        self.index = self.pc.Index(self.index_name)
+
+    def embed(self, texts: list) -> list:
+        embeddings = self.pc.inference.embed(
+            model=EMBED_MODEL,
+            inputs=texts,
             parameters={"input_type": "passage"}
         )
-        # Prepare vectors with metadata
-        vectors = []
-        for j, (text, embedding) in enumerate(zip(batch, embeddings)):
-            vectors.append({
-                "id":       f"chunk-{i + j}",
-                "values":   embedding.values,
-                "metadata": {"text": text}
-            })
-        index.upsert(vectors=vectors)
-        print(f"Stored chunks {i + 1} to {min(i + batch_size, len(texts))}")
+        return [e.values for e in embeddings]
+
+    def store(self, chunks: list, embeddings: list):
+        # Text first, so every vector the index can return resolves to a chunk
+        save_chunks(chunks)
+        self.index.upsert(vectors=[
+            {"id": c["id"], "values": values} for c, values in zip(chunks, embeddings)
+        ])
+
+    def delete(self, ids: list):
+        for i in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[i:i + 1000])
+        delete_chunks(ids)
+
+    def list_ids(self, prefix: str) -> list:
+        ids = []
+        for page in self.index.list(prefix=prefix):
+            ids.extend(page)
+        return ids
+
+class MemorySink:
+    """Local stand-in for Pinecone and the chunk store that keeps chunks and
+    vectors in a dict, embedding text as hashed word counts. For tests and
+    dry runs.
+    """
+
+    def __init__(self, dimension: int = 64):
+        self.dimension = dimension
+        self.vectors   = {}
+        self.lock      = threading.Lock()
+
+    def embed(self, texts: list) -> list:
+        embeddings = []
+        for text in texts:
+            values = [0.0] * self.dimension
+            for word in re.findall(r"\w+", text.lower()):
+                values[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimension] += 1.0
+            embeddings.append(values)
+        return embeddings
+
+    def store(self, chunks: list, embeddings: list):
+        with self.lock:
+            for chunk, values in zip(chunks, embeddings):
+                self.vectors[chunk["id"]] = {"chunk": chunk, "values": values}
+
+    def delete(self, ids: list):
+        with self.lock:
+            for chunk_id in ids:
+                self.vectors.pop(chunk_id, None)
+
+    def list_ids(self, prefix: str) -> list:
+        with self.lock:
+            return [chunk_id for chunk_id in self.vectors if chunk_id.startswith(prefix)]
+
+# ----------------------------------------------------------------
+# Checkpoint
+# ----------------------------------------------------------------
+
+def chunk_id(text: str) -> str:
+    """Stable vector ID derived from the chunk text, so unchanged chunks keep their IDs."""
+    return "chunk-" + hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+# Before checkpoints, vectors were numbered by position: chunk-0, chunk-1, ...
+LEGACY_ID = re.compile(r"chunk-\d+$")
+
+def remove_legacy_vectors(sink):
+    """Delete the position-numbered vectors, which no checkpoint has seen and the stale sweep would never remove."""
+    legacy = [i for i in with_retries(sink.list_ids, "chunk-") if LEGACY_ID.match(i)]
+    if legacy:
+        with_retries(sink.delete, legacy)
+        print(f"Deleted {len(legacy)} vectors left by the pre-checkpoint ingest script")
+
+class IngestCheckpoint:
+    """SQLite record of ingested chunks and the progress of the current run.
+
+    Each chunk row remembers the source it came from (its origin), the run
+    that last saw it and whether it is in the vector store. Chunks of a
+    source that a completed full run read without seeing them no longer
+    exist in that source and are deleted from the store.
+    """
+
+    def __init__(self, path: str = CHECKPOINT_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id        TEXT PRIMARY KEY,
+                text      TEXT NOT NULL,
+                source    TEXT NOT NULL,
+                page      INTEGER,
+                origin    TEXT,
+                stored    INTEGER NOT NULL DEFAULT 0,
+                last_seen INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS progress (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        # Checkpoints written before PDF ingestion have no page column
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(chunks)")]
+        if "page" not in columns:
+            self.conn.execute("ALTER TABLE chunks ADD COLUMN page INTEGER")
+        # Older checkpoints didn't record origins; drug labels are the only chunks with source "OpenFDA"
+        if "origin" not in columns:
+            self.conn.execute("ALTER TABLE chunks ADD COLUMN origin TEXT")
+            self.conn.execute("UPDATE chunks SET origin = CASE WHEN source = 'OpenFDA' THEN 'openfda' ELSE 'pdfs' END")
+            self.conn.commit()
+
+        # Chunks stored before the chunk store existed kept their text in
+        # Pinecone metadata only; store them again to fill the chunk store
+        if self.get("format", 1) < 2:
+            self.conn.execute("UPDATE chunks SET stored = 0")
+            self.set("format", 2)
+
+    def get(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM progress WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key: str, value):
+        self.conn.execute("INSERT OR REPLACE INTO progress (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+        self.conn.commit()
+
+    def start_run(self) -> int:
+        """Resume the unfinished run if there is one, otherwise start a new run."""
+        if not self.get("active", False):
+            self.set("run", self.get("run", 0) + 1)
+            self.set("cursor", None)
+            self.set("active", True)
+        return self.get("run")
+
+    def finish_run(self):
+        self.set("cursor", None)
+        self.set("active", False)
+
+    def see(self, chunks: list, run: int) -> list:
+        """Record chunks as seen in this run and return the ones not yet stored."""
+        self.conn.executemany("""
+            INSERT INTO chunks (id, text, source, page, origin, last_seen) VALUES (:id, :text, :source, :page, :origin, :run)
+            ON CONFLICT(id) DO UPDATE SET last_seen = :run, origin = :origin
+        """, [dict(c, run=run) for c in chunks])
+        self.conn.commit()
+
+        ids    = [c["id"] for c in chunks]
+        stored = set()
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT id FROM chunks WHERE stored = 1 AND id IN ({','.join('?' * len(part))})", part
+            )
+            stored.update(row[0] for row in rows)
+        return [c for c in chunks if c["id"] not in stored]
+
+    def mark_stored(self, ids: list):
+        self.conn.executemany("UPDATE chunks SET stored = 1 WHERE id = ?", [(i,) for i in ids])
+        self.conn.commit()
+
+    def stale_ids(self, run: int, origins: tuple) -> list:
+        """Chunks from the given origins that this run didn't see."""
+        marks = ",".join("?" * len(origins))
+        rows  = self.conn.execute(f"SELECT id FROM chunks WHERE last_seen < ? AND origin IN ({marks})", (run, *origins))
+        return [row[0] for row in rows]
+
+    def remove(self, ids: list):
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in ids])
+        self.conn.commit()
+
+    def stored_chunks(self) -> list:
+        rows = self.conn.execute("SELECT id, text FROM chunks WHERE stored = 1 ORDER BY id")
+        return [{"id": chunk_id, "text": text} for chunk_id, text in rows]
+
+# ----------------------------------------------------------------
+# Chunking and Storing
+# ----------------------------------------------------------------
+
+splitter = RecursiveCharacterTextSplitter(
+    chunk_size=500,
+    chunk_overlap=50,
+)
+
+def split_documents(docs: list) -> list:
+    """Split documents into chunks with content-hash IDs, dropping duplicates."""
+    chunks = {}
+    for chunk in splitter.split_documents(docs):
+        text = chunk.page_content
+        chunks.setdefault(chunk_id(text), {
+            "id":     chunk_id(text),
+            "text":   text,
+            "source":    chunk.metadata.get("source", ""),
+            "drug_name": chunk.metadata.get("drug_name"),
+            "page":      chunk.metadata.get("page"),
+            "origin":    chunk.metadata.get("origin"),
+        })
+    return list(chunks.values())
+
+def store_batch(sink, batch: list) -> list:
+    """Embed and store one batch of chunks, returning their IDs."""
+    embeddings = with_retries(sink.embed, [c["text"] for c in batch])
+    with_retries(sink.store, batch, embeddings)
+    return [c["id"] for c in batch]
+
+def build_knowledge_base(source=None, sink=None, checkpoint_path: str = CHECKPOINT_PATH,
+                         workers: int = WORKERS, max_pages: int = None,
+                         keyword_index_path: str = KEYWORD_INDEX_PATH):
+    """Fetch all sources, chunk the text, embed and store the new chunks.
+
+    Pages are fetched one after another while up to `workers` batches are
+    embedded and upserted concurrently. At most twice that many batches wait
+    in the pool, so fetching pauses when storing falls behind. The checkpoint
+    moves past a page only once every batch from it and the pages before it
+    is stored, so a crash resumes at the first page that wasn't finished.
+    """
+    source     = source or CombinedSource([OpenFDASource(), PdfSource()])
+    sink       = sink or PineconeSink()
+    checkpoint = IngestCheckpoint(checkpoint_path)
+    run        = checkpoint.start_run()
+    cursor     = checkpoint.get("cursor")
+    print(f"{'Resuming' if cursor else 'Starting'} ingestion run {run}")
+
+    # Once per checkpoint, so the first checkpointed run clears out the old IDs
+    if not checkpoint.get("legacy_removed", False):
+        remove_legacy_vectors(sink)
+        checkpoint.set("legacy_removed", True)
+
+    slots    = threading.BoundedSemaphore(workers * 2)
+    pending  = deque()   # (cursor after the page, futures for its batches), in page order
+    complete = True
+    totals   = {"chunks": 0, "new": 0}
+
+    # Move the checkpoint past every page at the front whose batches are all stored
+    def advance(wait: bool = False):
+        while pending and (wait or all(f.done() for f in pending[0][1])):
+            next_cursor, futures = pending.popleft()
+            for future in futures:
+                checkpoint.mark_stored(future.result())
+            checkpoint.set("cursor", next_cursor)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for page, (docs, next_cursor) in enumerate(source.pages(cursor), start=1):
+            chunks = split_documents(docs)
+            new    = checkpoint.see(chunks, run)
+            totals["chunks"] += len(chunks)
+            totals["new"]    += len(new)
+
+            futures = []
+            for i in range(0, len(new), EMBED_BATCH):
+                slots.acquire()
+                future = pool.submit(store_batch, sink, new[i:i + EMBED_BATCH])
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+            pending.append((next_cursor, futures))
+            advance()
+
+            if max_pages and page >= max_pages and next_cursor:
+                complete = False
+                break
+        advance(wait=True)
+
+    print(f"Stored {totals['new']} new of {totals['chunks']} chunks")
+
+    # A skipped or unreadable PDF would look like deleted content, so nothing
+    # is removed and the next run continues this one, trying the PDFs again
+    failed = getattr(source, "failed", [])
+    if failed:
+        complete = False
+        print(f"Could not read {', '.join(failed)}; keeping stored chunks until a run reads every source")
+
+    if complete:
+        # Chunks that no longer exist in the sources read by this run are
+        # removed from the store; sources left out of the run keep theirs
+        stale = checkpoint.stale_ids(run, source.origins)
+        if stale:
+            with_retries(sink.delete, stale)
+            checkpoint.remove(stale)
+            print(f"Deleted {len(stale)} chunks that are no longer in the source")
+        checkpoint.finish_run()
+    elif not failed:
+        print(f"Stopped after {max_pages} pages; the next run continues from here")
+
+    # Save the keyword index for hybrid search, with the same chunk IDs
+    chunks = checkpoint.stored_chunks()
+    if keyword_index_path:
+        KeywordIndex.build(chunks).save(keyword_index_path)
+        print(f"Keyword index saved to {keyword_index_path}")
 
     print(f"\nKnowledge base built successfully.")
     print(f"Total chunks stored: {len(chunks)}")
 
 if __name__ == "__main__":
-    build_knowledge_base()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the knowledge base")
+    parser.add_argument("--workers",     type=int, default=WORKERS, help="concurrent embed/upsert batches")
+    parser.add_argument("--max-pages",   type=int, help="stop after this many pages; the next run continues")
+    parser.add_argument("--from-file",   help="read drug label records from a JSON file instead of OpenFDA")
+    parser.add_argument("--skip-pdfs",   action="store_true", help="ingest drug labels only, keeping the stored guideline chunks")
+    parser.add_argument("--memory-sink", action="store_true", help="keep vectors in memory instead of Pinecone")
+    parser.add_argument("--checkpoint",  help="checkpoint database path")
+    args = parser.parse_args()
+
+    # A memory sink run must not mark chunks as stored in the real checkpoint
+    # or replace the keyword index that matches Pinecone
+    sources = [FileSource(args.from_file) if args.from_file else OpenFDASource()]
+    if not args.skip_pdfs:
+        sources.append(PdfSource())
+
+    build_knowledge_base(
+        source             = CombinedSource(sources),
+        sink               = MemorySink() if args.memory_sink else None,
+        checkpoint_path    = args.checkpoint or (":memory:" if args.memory_sink else CHECKPOINT_PATH),
+        workers            = args.workers,
+        max_pages          = args.max_pages,
+        keyword_index_path = None if args.memory_sink else KEYWORD_INDEX_PATH,
+    )
@@ -1,12 +1,26 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import math
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from db.database import Base, engine
-from routers import audio, rag, sessions, feedback
+from routers import audio, rag, sessions, feedback, jobs
+from services.rag_service import close_retriever
+from services.pdf_service import shutdown_pool
+from services.job_service import start_workers, stop_workers
+from services.outbound_service import OutboundUnavailable
 
-# Create all DB tables on startup
-Base.metadata.create_all(bind=engine)
+# Start the background job workers, and when the server shuts down stop them,
+# release the retriever's async Pinecone connections and stop the PDF
+# rendering processes
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_workers()
+    yield
+    await stop_workers()
+    await close_retriever()
+    shutdown_pool()
 
-app = FastAPI(title="MedAssist API", version="1.0.0")
+app = FastAPI(title="MedAssist API", version="1.0.0", lifespan=lifespan)
 
 # Allow all origins for now — will lock down to Vercel URL after frontend deployment
 app.add_middleware(
@@ -17,11 +31,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# A provider stayed rate limited or unreachable for the whole deadline of a
+# call: tell the client to retry later instead of failing with a 500
+@app.exception_handler(OutboundUnavailable)
+async def outbound_unavailable(request: Request, exc: OutboundUnavailable):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
 # Register all routers
 app.include_router(audio.router,    prefix="/api", tags=["Audio"])
 app.include_router(rag.router,      prefix="/api", tags=["RAG"])
 app.include_router(sessions.router, prefix="/api", tags=["Sessions"])
 app.include_router(feedback.router, prefix="/api", tags=["Feedback"])
+app.include_router(jobs.router,     prefix="/api", tags=["Jobs"])
 
 # Simple health check to confirm the server is running
 @app.get("/")
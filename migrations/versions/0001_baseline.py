@@ -0,0 +1,60 @@
+"""Baseline schema: sessions, transcripts and suggestions
+
+Deployments that predate migrations already have these tables from
+Base.metadata.create_all, so each table is only created if it is missing.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "sessions" not in existing:
+        op.create_table(
+            "sessions",
+            sa.Column("id",         sa.Integer(), primary_key=True),
+            sa.Column("title",      sa.String(200)),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_sessions_id", "sessions", ["id"])
+
+    if "transcripts" not in existing:
+        op.create_table(
+            "transcripts",
+            sa.Column("id",         sa.Integer(), primary_key=True),
+            sa.Column("session_id", sa.Integer(), sa.ForeignKey("sessions.id"), nullable=False),
+            sa.Column("text",       sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_transcripts_id", "transcripts", ["id"])
+
+    if "suggestions" not in existing:
+        op.create_table(
+            "suggestions",
+            sa.Column("id",          sa.Integer(), primary_key=True),
+            sa.Column("session_id",  sa.Integer(), sa.ForeignKey("sessions.id"), nullable=False),
+            sa.Column("type",        sa.String(50)),
+            sa.Column("content",     sa.Text()),
+            sa.Column("confidence",  sa.String(20)),
+            sa.Column("source_docs", sa.Text()),
+            sa.Column("status",      sa.Enum("accepted", "rejected", "modified", "pending", name="feedbackstatus")),
+            sa.Column("doctor_note", sa.Text(), nullable=True),
+            sa.Column("created_at",  sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_suggestions_id", "suggestions", ["id"])
+
+def downgrade():
+    op.drop_table("suggestions")
+    op.drop_table("transcripts")
+    op.drop_table("sessions")
+    sa.Enum(name="feedbackstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""Add transcript_analyses for shared symptom extraction and retrieval results
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # May already exist on deployments where create_all ran after the model was added
+    if "transcript_analyses" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "transcript_analyses",
+        sa.Column("id",            sa.Integer(), primary_key=True),
+        sa.Column("transcript_id", sa.Integer(), sa.ForeignKey("transcripts.id"), nullable=False, unique=True),
+        sa.Column("symptoms",      sa.Text(), nullable=False),
+        sa.Column("chunk_ids",     sa.JSON(), nullable=False),
+        sa.Column("created_at",    sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_transcript_analyses_id", "transcript_analyses", ["id"])
+
+def downgrade():
+    op.drop_table("transcript_analyses")
@@ -0,0 +1,33 @@
+"""Add indexes for the session list, latest-transcript and per-session suggestion queries
+
+On PostgreSQL the indexes are built CONCURRENTLY so existing deployments
+keep serving traffic while they are created.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_sessions_created_at_id",            "sessions",    ["created_at", "id"]),
+    ("ix_transcripts_session_id_created_at", "transcripts", ["session_id", sa.text("created_at DESC")]),
+    ("ix_suggestions_session_id_status",     "suggestions", ["session_id", "status"]),
+]
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
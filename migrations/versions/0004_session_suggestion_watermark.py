@@ -0,0 +1,22 @@
+"""Add the incremental suggestion watermark to sessions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("sessions", sa.Column("analyzed_transcript_id", sa.Integer(), nullable=True))
+    op.add_column("sessions", sa.Column("analyzed_chars", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade():
+    with op.batch_alter_table("sessions") as batch:
+        batch.drop_column("analyzed_chars")
+        batch.drop_column("analyzed_transcript_id")
@@ -0,0 +1,27 @@
+"""Add knowledge_chunks, the local store of knowledge base chunk text and provenance
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "knowledge_chunks",
+        sa.Column("id",         sa.String(64), primary_key=True),
+        sa.Column("text",       sa.Text(), nullable=False),
+        sa.Column("source",     sa.String(300)),
+        sa.Column("drug_name",  sa.String(300), nullable=True),
+        sa.Column("page",       sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+def downgrade():
+    op.drop_table("knowledge_chunks")
@@ -0,0 +1,30 @@
+"""Add pdf_exports, the persisted cache of rendered session and discharge PDFs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "pdf_exports",
+        sa.Column("id",         sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("sessions.id"), nullable=False),
+        sa.Column("kind",       sa.String(20), nullable=False),
+        sa.Column("etag",       sa.String(80), nullable=False),
+        sa.Column("content",    sa.LargeBinary(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint("session_id", "kind", name="uq_pdf_exports_session_id_kind"),
+    )
+    op.create_index("ix_pdf_exports_id", "pdf_exports", ["id"])
+
+def downgrade():
+    op.drop_index("ix_pdf_exports_id", table_name="pdf_exports")
+    op.drop_table("pdf_exports")
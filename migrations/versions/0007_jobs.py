@@ -0,0 +1,37 @@
+"""Add jobs, the database-backed queue for background pipelines
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "jobs",
+        sa.Column("id",          sa.String(32), primary_key=True),
+        sa.Column("kind",        sa.String(30), nullable=False),
+        sa.Column("status",      sa.String(20), nullable=False),
+        sa.Column("session_id",  sa.Integer(), nullable=True),
+        sa.Column("payload",     sa.JSON(), nullable=False),
+        sa.Column("result",      sa.JSON(), nullable=True),
+        sa.Column("error",       sa.Text(), nullable=True),
+        sa.Column("attempts",    sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("run_at",      sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at",  sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("started_at",  sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_jobs_session_id", "jobs", ["session_id"])
+    op.create_index("ix_jobs_status_run_at", "jobs", ["status", "run_at"])
+
+def downgrade():
+    op.drop_index("ix_jobs_status_run_at", table_name="jobs")
+    op.drop_index("ix_jobs_session_id", table_name="jobs")
+    op.drop_table("jobs")
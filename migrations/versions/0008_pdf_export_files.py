@@ -0,0 +1,26 @@
+"""Keep stored PDF exports on disk, leaving only their metadata in pdf_exports
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # The stored PDFs have no files yet; they are rendered again on next download
+    op.execute("DELETE FROM pdf_exports")
+    with op.batch_alter_table("pdf_exports") as batch:
+        batch.drop_column("content")
+        batch.add_column(sa.Column("size", sa.Integer(), nullable=False))
+
+def downgrade():
+    op.execute("DELETE FROM pdf_exports")
+    with op.batch_alter_table("pdf_exports") as batch:
+        batch.drop_column("size")
+        batch.add_column(sa.Column("content", sa.LargeBinary(), nullable=False))
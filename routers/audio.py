@@ -1,51 +1,162 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from sqlalchemy.orm import Session as DBSession
-from db.database import get_db
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_async_db
 from db import models
-from dotenv import load_dotenv
-from groq import Groq
+from db.schemas import JobOut
+from db.queries import touch_session
+from services.transcription_service import transcribe_upload, transcribe_bytes, merge_overlap, spool_job_upload, discard_job_upload
+from services.job_service import aenqueue_job
+from services.outbound_service import OutboundUnavailable
+from routers.jobs import accepted
+import asyncio
 import os
 
-load_dotenv()
-
-# Load the Groq client with the API key from .env
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-
 router = APIRouter()
 
-# Accept an audio file and a session ID, transcribe with Whisper via Groq, and save to DB
-@router.post("/transcribe")
+# How many live audio windows from one connection are transcribed at once
+LIVE_CONCURRENCY = int(os.getenv("TRANSCRIBE_LIVE_CONCURRENCY", "2"))
+
+# Accept an audio file and a session ID, transcribe with Whisper via Groq, and save to DB.
+# With ?background=true the recording is queued as a job and a 202 is returned
+# straight away; the finished job's result holds the text and transcript ID.
+@router.post("/transcribe", responses={202: {"model": JobOut}})
 async def transcribe(
     file: UploadFile = File(...),
     session_id: int  = Form(...),
-    db: DBSession    = Depends(get_db)
+    background: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Make sure the session exists before saving the transcript
-    session = db.query(models.Session).filter(models.Session.id == session_id).first()
+    session = await db.get(models.Session, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Read the audio bytes from the uploaded file
-    audio_bytes = await file.read()
+    if background:
+        # The worker may run in another process, so the recording is spooled to
+        # the shared spool directory and only its path travels with the job
+        path    = await spool_job_upload(file)
+        payload = {"path": path, "filename": file.filename or "recording.webm", "content_type": file.content_type or "audio/webm"}
+        try:
+            job = await aenqueue_job("transcribe", session_id, payload, db)
+        except Exception:
+            discard_job_upload(path)
+            raise
+        return accepted(job)
 
     try:
-        # Send the audio to Whisper via Groq for transcription
-        response = client.audio.transcriptions.create(
-            model="whisper-large-v3",
-            file=(file.filename, audio_bytes, file.content_type),
-        )
+        # Spool the upload to disk and transcribe it, in segments if it is long
+        transcript_text = await transcribe_upload(file)
+    except OutboundUnavailable:
+        # Whisper is rate limited or unreachable: answered with a 503 and Retry-After
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
-    transcript_text = response.text
-
     # Save the transcript to the database linked to the session
     transcript = models.Transcript(
         session_id=session_id,
         text=transcript_text
     )
     db.add(transcript)
-    db.commit()
-    db.refresh(transcript)
+    await db.commit()
+
+    return { "text": transcript_text, "transcript_id": transcript.id }
+
+# Transcribe a consultation while it is happening. The client sends each
+# audio window (a complete, self-contained recording of a few seconds) as a
+# binary message and "end" when the visit is over. Windows are transcribed in
+# the background and appended in order to one rolling Transcript row, and the
+# text so far is pushed back after every window:
+#   {"type": "partial" | "final", "text": "...", "transcript_id": 1}
+# Clients whose windows overlap connect with ?overlap=true, so the words
+# repeated at the start of each window are dropped. Without it every word is
+# kept, since a speaker may genuinely repeat words across a boundary.
+@router.websocket("/transcribe/live")
+async def transcribe_live(websocket: WebSocket, session_id: int, overlap: bool = False, db: AsyncSession = Depends(get_async_db)):
+    session = await db.get(models.Session, session_id)
+    if not session:
+        await websocket.close(code=4404, reason="Session not found")
+        return
+    await websocket.accept()
+
+    transcript  = None
+    connected   = True
+    results     = {}   # window number -> text, for windows finished out of order
+    next_window = 0    # next window number to append to the transcript
+    lock        = asyncio.Lock()
+    semaphore   = asyncio.Semaphore(LIVE_CONCURRENCY)
+    tasks       = []
+
+    async def send(message_type: str):
+        nonlocal connected
+        if not connected or transcript is None:
+            return
+        try:
+            await websocket.send_json({"type": message_type, "text": transcript.text, "transcript_id": transcript.id})
+        except (WebSocketDisconnect, RuntimeError):
+            connected = False
+
+    # Append every window that is next in line, then save and push the new text
+    async def append_ready_windows():
+        nonlocal transcript, next_window
+        appended = False
+        while next_window in results:
+            text        = results.pop(next_window).strip()
+            next_window += 1
+            if not text:
+                continue
+            if transcript is None:
+                transcript = models.Transcript(session_id=session_id, text=text)
+                db.add(transcript)
+            else:
+                if overlap:
+                    text = merge_overlap(transcript.text, text)
+                if text:
+                    transcript.text = f"{transcript.text} {text}"
+            appended = True
+
+        if appended:
+            # Any stored analysis was made from the shorter text
+            if transcript.id:
+                await db.execute(delete(models.TranscriptAnalysis).where(
+                    models.TranscriptAnalysis.transcript_id == transcript.id
+                ))
+            # Exports of the session are out of date too
+            await db.execute(touch_session(session_id))
+            await db.commit()
+            await send("partial")
+
+    async def process_window(number: int, audio: bytes):
+        try:
+            async with semaphore:
+                text = await transcribe_bytes(audio, f"window-{number:05d}.webm", "audio/webm")
+        except Exception as e:
+            print(f"Live transcription of window {number} failed: {e}")
+            text = ""
+        async with lock:
+            results[number] = text
+            await append_ready_windows()
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                tasks.append(asyncio.create_task(process_window(len(tasks), message["bytes"])))
+            elif message.get("text") == "end":
+                break
+    except WebSocketDisconnect:
+        connected = False
+
+    # Finish the windows still in flight, even if the client has gone away
+    await asyncio.gather(*tasks)
 
-    return { "text": transcript_text, "transcript_id": transcript.id }
\ No newline at end of file
+    if connected:
+        if transcript is not None:
+            await send("final")
+        else:
+            await websocket.send_json({"type": "final", "text": "", "transcript_id": None})
+        await websocket.close()
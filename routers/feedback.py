@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session as DBSession
 from db.database import get_db
 from db import models
+from db.schemas import SuggestionOut
+from db.queries import touch_session
 from pydantic import BaseModel
 from typing import Optional
 
@@ -14,7 +16,7 @@ class FeedbackBody(BaseModel):
     doctor_note: Optional[str] = None
 
 # Submit feedback for a single suggestion
-@router.post("/feedback")
+@router.post("/feedback", response_model=SuggestionOut)
 def submit_feedback(body: FeedbackBody, db: DBSession = Depends(get_db)):
     suggestion = db.query(models.Suggestion).filter(
         models.Suggestion.id == body.suggestion_id
@@ -27,12 +29,14 @@ def submit_feedback(body: FeedbackBody, db: DBSession = Depends(get_db)):
     suggestion.status      = body.status
     suggestion.doctor_note = body.doctor_note
 
+    # Feedback shows up in the session export, so mark the session as changed
+    db.execute(touch_session(suggestion.session_id))
     db.commit()
     db.refresh(suggestion)
     return suggestion
 
 # Get all feedback for a specific session
-@router.get("/feedback/{session_id}")
+@router.get("/feedback/{session_id}", response_model=list[SuggestionOut])
 def get_feedback(session_id: int, db: DBSession = Depends(get_db)):
     suggestions = db.query(models.Suggestion).filter(
         models.Suggestion.session_id == session_id
@@ -0,0 +1,67 @@
+import time
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_async_db
+from db import models
+from db.schemas import JobOut
+from services.job_service import TERMINAL, JOB_POLL_INTERVAL, aget_job, await_job_change
+
+router = APIRouter()
+
+# Seconds between keep-alive comments on an event stream with nothing new, so
+# proxies don't close it while a long job runs
+KEEPALIVE_SECONDS = 15
+
+# The 202 response for a queued job, pointing at where to follow it
+def accepted(job: models.Job):
+    return JSONResponse(
+        JobOut.model_validate(job).model_dump(mode="json"),
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+# Get the status of a background job, and its result once it has succeeded
+@router.get("/jobs/{job_id}", response_model=JobOut)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+# Follow a background job as server-sent events. A "status" event carrying the
+# job is sent now and whenever its status changes, then "done" once it has
+# succeeded or failed.
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    if not await db.get(models.Job, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_state = None
+        last_sent  = time.monotonic()
+        while True:
+            job = await aget_job(job_id)
+            if job is None:
+                break
+
+            state = (job.status, job.attempts)
+            if state != last_state:
+                last_state = state
+                last_sent  = time.monotonic()
+                yield f"event: status\ndata: {JobOut.model_validate(job).model_dump_json()}\n\n"
+            elif time.monotonic() - last_sent >= KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            if job.status in TERMINAL:
+                break
+            await await_job_change(job_id, JOB_POLL_INTERVAL)
+
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,49 +1,112 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session as DBSession
-from db.database import get_db
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_async_db
 from db import models
-from services.rag_service import run_rag_pipeline
+from db.schemas import ChunkOut, SuggestionOut, SuggestionsResponse, JobOut
+from services.rag_service import astream_rag_pipeline, cache
+from services.analysis_service import aget_transcript_context
+from services.suggestion_service import (
+    alatest_transcript, alatest_suggestion_id, advance_watermark, suggestion_values,
+    agenerate_session_suggestions, arefresh_suggestions,
+)
+from services.job_service import aenqueue_job
+from routers.jobs import accepted
+from services.chunk_service import aget_chunks
+from services.output_service import output_stats
+from services.outbound_service import outbound_stats
 from pydantic import BaseModel
 
 router = APIRouter()
 
 class SuggestionsRequest(BaseModel):
     session_id: int
+    # Only analyze transcript content added since the last run and merge the
+    # results into the session's existing suggestions
+    incremental: bool = False
 
-# Run the RAG pipeline on the latest transcript for a session
-@router.post("/suggestions")
-def get_suggestions(body: SuggestionsRequest, db: DBSession = Depends(get_db)):
+# Get the latest transcript for a session, or raise a 404
+async def get_latest_transcript(session_id: int, db: AsyncSession) -> models.Transcript:
+    transcript = await alatest_transcript(session_id, db)
+    if not transcript:
+        raise HTTPException(status_code=404, detail="No transcript found for this session")
+    return transcript
+
+# Run the RAG pipeline on the latest transcript for a session. With
+# ?background=true the run is queued as a job and a 202 is returned straight
+# away; poll /api/jobs/{id} or follow /api/jobs/{id}/events for the result.
+@router.post("/suggestions", response_model=SuggestionsResponse, responses={202: {"model": JobOut}})
+async def get_suggestions(body: SuggestionsRequest, background: bool = False, db: AsyncSession = Depends(get_async_db)):
+    if background:
+        payload = {"incremental": body.incremental}
+        if body.incremental:
+            if not await db.get(models.Session, body.session_id):
+                raise HTTPException(status_code=404, detail="Session not found")
+        else:
+            await get_latest_transcript(body.session_id, db)
+            # Lets a retried job find the suggestions an earlier attempt saved
+            payload["after_suggestion_id"] = await alatest_suggestion_id(body.session_id, db)
+        job = await aenqueue_job("suggestions", body.session_id, payload, db)
+        return accepted(job)
+
+    if body.incremental:
+        session = await db.get(models.Session, body.session_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return { "suggestions": await arefresh_suggestions(session, db) }
+
+    transcript = await get_latest_transcript(body.session_id, db)
+    return { "suggestions": await agenerate_session_suggestions(transcript, db) }
+
+# Same as /suggestions, but sends each suggestion as a server-sent event as soon
+# as the LLM finishes writing it, saving it to the database on the way out
+@router.post("/suggestions/stream")
+async def stream_suggestions(body: SuggestionsRequest, db: AsyncSession = Depends(get_async_db)):
+    transcript = await get_latest_transcript(body.session_id, db)
 
-    # Get the latest transcript for this session
-    transcript = (
-        db.query(models.Transcript)
-        .filter(models.Transcript.session_id == body.session_id)
-        .order_by(models.Transcript.created_at.desc())
-        .first()
+    async def events():
+        context = await aget_transcript_context(transcript, db)
+        async for s in astream_rag_pipeline(transcript.text, context):
+            values = suggestion_values(body.session_id, s)
+            if values is None:
+                continue
+            suggestion = models.Suggestion(**values)
+            db.add(suggestion)
+            await db.commit()
+            await db.refresh(suggestion)
+            yield f"event: suggestion\ndata: {SuggestionOut.model_validate(suggestion).model_dump_json()}\n\n"
+        await advance_watermark(transcript, db)
+        await db.commit()
+        yield "event: done\ndata: {}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    if not transcript:
-        raise HTTPException(status_code=404, detail="No transcript found for this session")
+# Resolve a suggestion's cited chunk IDs to the knowledge base passages they name
+@router.get("/suggestions/{suggestion_id}/sources", response_model=list[ChunkOut])
+async def get_suggestion_sources(suggestion_id: int, db: AsyncSession = Depends(get_async_db)):
+    suggestion = await db.get(models.Suggestion, suggestion_id)
+    if not suggestion:
+        raise HTTPException(status_code=404, detail="Suggestion not found")
+
+    chunk_ids = [c.strip() for c in (suggestion.source_docs or "").split(",") if c.strip()]
+    chunks    = await aget_chunks(chunk_ids)
+    return [chunks[chunk_id] for chunk_id in chunk_ids if chunk_id in chunks]
+
+# Report hit/miss counters for the RAG cache
+@router.get("/cache/stats")
+def get_cache_stats():
+    return cache.stats()
+
+# Report how often LLM output failed validation and needed a repair call or fallback
+@router.get("/generation/stats")
+def get_generation_stats():
+    return output_stats.stats()
 
-    # Run the full RAG pipeline
-    suggestions_data = run_rag_pipeline(transcript.text)
-
-    # Save each suggestion to the database, skip empty or invalid ones
-    saved = []
-    for s in suggestions_data:
-        # Skip suggestions that are missing required fields
-        if not s.get("content") or not s.get("type"):
-            continue
-        suggestion = models.Suggestion(
-            session_id  = body.session_id,
-            type        = s.get("type",        "diagnosis"),
-            content     = s.get("content",     ""),
-            confidence  = s.get("confidence",  "medium"),
-            source_docs = s.get("source_docs", ""),
-        )
-        db.add(suggestion)
-        db.commit()
-        db.refresh(suggestion)
-        saved.append(suggestion)
-
-    return { "suggestions": saved }
\ No newline at end of file
+# Report calls, retries, 429s, timeouts and give-ups per external provider
+@router.get("/outbound/stats")
+def get_outbound_stats():
+    return outbound_stats()
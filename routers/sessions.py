@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi.responses import FileResponse, Response
+from starlette.background import BackgroundTask
+from sqlalchemy import select, tuple_, func
 from sqlalchemy.orm import Session as DBSession
-from db.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import get_db, get_async_db, engine
 from db import models
+from db.schemas import SessionOut, SessionDetail, SessionPage, JobOut
+from db.queries import session_with_children
 from pydantic import BaseModel
 from typing import Optional
-from services.export_service import generate_session_pdf
-from services.discharge_service import generate_discharge_pdf
-from services.rag_service import run_discharge_pipeline
-import io
+from datetime import datetime, timezone
+from services.export_cache_service import CACHE_CONTROL, aget_session_version, export_etag, etag_matches, aget_cached_export, remove_cached_files
+from services.report_service import arender_session_export, arender_discharge_export
+from services.job_service import aenqueue_job
+from routers.jobs import accepted
+import os
+import base64
 
 router = APIRouter()
 
@@ -21,7 +29,7 @@ class SessionUpdate(BaseModel):
     title: str
 
 # Create a new consultation session
-@router.post("/sessions")
+@router.post("/sessions", response_model=SessionOut)
 def create_session(body: SessionCreate, db: DBSession = Depends(get_db)):
     session = models.Session(title=body.title)
     db.add(session)
@@ -29,15 +37,63 @@ def create_session(body: SessionCreate, db: DBSession = Depends(get_db)):
     db.refresh(session)
     return session
 
-# Get all sessions, newest first
-@router.get("/sessions")
-def get_sessions(db: DBSession = Depends(get_db)):
-    return db.query(models.Session).order_by(models.Session.created_at.desc()).all()
+# Encode the position of the last session on a page as an opaque cursor
+def encode_cursor(session: models.Session) -> str:
+    raw = f"{session.created_at.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+# Decode a cursor back into the (created_at, id) it points at
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, session_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(session_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# SQLite stores server-set timestamps as whole-second text but binds datetimes
+# with microseconds, which would sort a session created in the same second as
+# the cursor before it; normalizing the bound value keeps them comparable
+def cursor_time(created_at: datetime):
+    return func.datetime(created_at) if engine.dialect.name == "sqlite" else created_at
+
+# Get sessions newest first, one page at a time. Pages are keyed on
+# (created_at, id) so every page costs the same however deep it is.
+@router.get("/sessions", response_model=SessionPage)
+def get_sessions(
+    limit:        int                = Query(20, ge=1, le=100),
+    cursor:       Optional[str]      = None,
+    q:            Optional[str]      = None,
+    created_from: Optional[datetime] = None,
+    created_to:   Optional[datetime] = None,
+    db: DBSession = Depends(get_db),
+):
+    query = select(models.Session)
+
+    if cursor:
+        created_at, session_id = decode_cursor(cursor)
+        query = query.where(
+            tuple_(models.Session.created_at, models.Session.id) < tuple_(cursor_time(created_at), session_id)
+        )
+    if q:
+        query = query.where(models.Session.title.ilike(f"%{q}%"))
+    if created_from:
+        query = query.where(models.Session.created_at >= created_from)
+    if created_to:
+        query = query.where(models.Session.created_at < created_to)
+
+    # Fetch one extra row to find out whether there is another page
+    rows = db.scalars(
+        query.order_by(models.Session.created_at.desc(), models.Session.id.desc()).limit(limit + 1)
+    ).all()
+
+    items       = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return { "items": items, "next_cursor": next_cursor }
 
 # Get a single session with its transcripts and suggestions
-@router.get("/sessions/{session_id}")
+@router.get("/sessions/{session_id}", response_model=SessionDetail)
 def get_session(session_id: int, db: DBSession = Depends(get_db)):
-    s = db.query(models.Session).filter(models.Session.id == session_id).first()
+    s = db.scalars(session_with_children(session_id)).unique().first()
     if not s:
         raise HTTPException(status_code=404, detail="Session not found")
     return {
@@ -47,12 +103,15 @@ def get_session(session_id: int, db: DBSession = Depends(get_db)):
     }
 
 # Update the title of an existing session
-@router.put("/sessions/{session_id}")
+@router.put("/sessions/{session_id}", response_model=SessionOut)
 def update_session(session_id: int, body: SessionUpdate, db: DBSession = Depends(get_db)):
     s = db.query(models.Session).filter(models.Session.id == session_id).first()
     if not s:
         raise HTTPException(status_code=404, detail="Session not found")
     s.title = body.title
+    # Set here rather than by the database so the export ETags change even
+    # within the same second (see touch_session)
+    s.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(s)
     return s
@@ -63,55 +122,88 @@ def delete_session(session_id: int, db: DBSession = Depends(get_db)):
     s = db.query(models.Session).filter(models.Session.id == session_id).first()
     if not s:
         raise HTTPException(status_code=404, detail="Session not found")
+    exports = [export.etag for export in s.exports]
     db.delete(s)
     db.commit()
+    remove_cached_files(exports)
     return {"message": "Session deleted successfully"}
 
-# Export a session as a PDF report
-@router.get("/sessions/{session_id}/export")
-def export_session(session_id: int, db: DBSession = Depends(get_db)):
-    s = db.query(models.Session).filter(models.Session.id == session_id).first()
-    if not s:
-        raise HTTPException(status_code=404, detail="Session not found")
+def pdf_headers(filename: str, etag: str) -> dict:
+    return {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "ETag":                etag,
+        "Cache-Control":       CACHE_CONTROL,
+    }
 
-    pdf_bytes = generate_session_pdf(s, s.transcripts, s.suggestions)
+def stored_pdf_response(path: str, filename: str, etag: str):
+    """Stream a stored PDF from the export cache in chunks, leaving the file in place."""
+    return FileResponse(path, media_type="application/pdf", headers=pdf_headers(filename, etag))
 
-    return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+def pdf_file_response(path: str, filename: str, etag: str):
+    """Stream a freshly rendered PDF from its temp file in chunks, then delete the file."""
+    return FileResponse(
+        path,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename=session_{session_id}.pdf"
-        }
+        headers=pdf_headers(filename, etag),
+        background=BackgroundTask(os.remove, path),
     )
 
-# Generate and export a discharge summary PDF for a session
-@router.get("/sessions/{session_id}/discharge")
-def export_discharge(session_id: int, db: DBSession = Depends(get_db)):
-    s = db.query(models.Session).filter(models.Session.id == session_id).first()
-    if not s:
-        raise HTTPException(status_code=404, detail="Session not found")
+def not_modified(etag: str):
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
 
-    # Get the latest transcript for this session
-    transcript = (
-        db.query(models.Transcript)
-        .filter(models.Transcript.session_id == session_id)
-        .order_by(models.Transcript.created_at.desc())
-        .first()
-    )
+# Export a session as a PDF report. The rendered PDF is stored until the
+# session changes, and clients holding the current version get a 304.
+@router.get("/sessions/{session_id}/export")
+async def export_session(
+    session_id:    int,
+    if_none_match: Optional[str] = Header(None),
+    db:            AsyncSession = Depends(get_async_db),
+):
+    version = await aget_session_version(session_id, db)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Session not found")
 
-    if not transcript:
+    etag = export_etag("export", session_id, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    filename = f"session_{session_id}.pdf"
+    stored   = await aget_cached_export(session_id, "export", etag, db)
+    if stored is not None:
+        return stored_pdf_response(stored, filename, etag)
+
+    path = await arender_session_export(session_id, etag, db)
+    return pdf_file_response(path, filename, etag)
+
+# Generate and export a discharge summary PDF for a session. Like the session
+# export it is stored per session version, so repeat downloads skip the LLM.
+# With ?background=true the summary is generated by a job instead and a 202 is
+# returned; the finished job's result holds the URL to download it from.
+@router.get("/sessions/{session_id}/discharge", responses={202: {"model": JobOut}})
+async def export_discharge(
+    session_id:    int,
+    background:    bool = False,
+    if_none_match: Optional[str] = Header(None),
+    db:            AsyncSession = Depends(get_async_db),
+):
+    version = await aget_session_version(session_id, db)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    if version["transcript_id"] is None:
         raise HTTPException(status_code=404, detail="No transcript found for this session")
 
-    # Run the discharge RAG pipeline
-    discharge_content = run_discharge_pipeline(transcript.text)
+    if background:
+        job = await aenqueue_job("discharge", session_id, {}, db)
+        return accepted(job)
 
-    # Generate the discharge PDF
-    pdf_bytes = generate_discharge_pdf(s, transcript.text, discharge_content)
+    etag = export_etag("discharge", session_id, version)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
 
-    return StreamingResponse(
-        io.BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename=discharge_{session_id}.pdf"
-        }
-    )
\ No newline at end of file
+    filename = f"discharge_{session_id}.pdf"
+    stored   = await aget_cached_export(session_id, "discharge", etag, db)
+    if stored is not None:
+        return stored_pdf_response(stored, filename, etag)
+
+    path = await arender_discharge_export(session_id, etag, db)
+    return pdf_file_response(path, filename, etag)
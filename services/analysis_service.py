@@ -0,0 +1,45 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import models
+from db.database import AsyncSessionLocal
+from services.rag_service import aretrieve_context, afetch_chunk_texts
+
+async def aget_transcript_context(transcript: models.Transcript, db: AsyncSession) -> dict:
+    """Return the extracted symptoms and retrieved chunks for a transcript.
+
+    The first call runs extraction and retrieval and stores the result against
+    the transcript; later calls (e.g. the discharge export after suggestions)
+    only resolve the stored chunk IDs back to text. The result is stored in a
+    session of its own, so the caller's transaction and loaded objects are
+    left alone.
+    """
+    analysis = await db.scalar(
+        select(models.TranscriptAnalysis)
+        .where(models.TranscriptAnalysis.transcript_id == transcript.id)
+    )
+    if analysis is not None:
+        print(f"Reusing stored analysis for transcript {transcript.id}")
+        texts     = await afetch_chunk_texts(analysis.chunk_ids)
+        chunk_ids = [chunk_id for chunk_id in analysis.chunk_ids if chunk_id in texts]
+        return {
+            "symptoms":  analysis.symptoms,
+            "chunk_ids": chunk_ids,
+            "chunks":    [texts[chunk_id] for chunk_id in chunk_ids],
+        }
+
+    context = await aretrieve_context(transcript.text)
+
+    async with AsyncSessionLocal() as own_db:
+        own_db.add(models.TranscriptAnalysis(
+            transcript_id = transcript.id,
+            symptoms      = context["symptoms"],
+            chunk_ids     = context["chunk_ids"],
+        ))
+        try:
+            await own_db.commit()
+        except IntegrityError:
+            # Another request stored the analysis for this transcript first
+            await own_db.rollback()
+
+    return context
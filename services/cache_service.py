@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache settings, all optional
+CACHE_BACKEND     = os.getenv("RAG_CACHE_BACKEND", "memory")   # memory | sqlite | none
+CACHE_TTL         = int(os.getenv("RAG_CACHE_TTL", "86400"))   # seconds, 0 disables expiry
+CACHE_MAX_ENTRIES = int(os.getenv("RAG_CACHE_MAX_ENTRIES", "2048"))
+CACHE_PATH        = os.getenv("RAG_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "rag_cache.sqlite3"))
+
+def content_key(namespace: str, text: str) -> str:
+    """Build a cache key from a namespace and a hash of the text it was computed from."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+class MemoryCache:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._entries    = OrderedDict()   # key -> (expires_at, value)
+        self._lock       = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] and entry[0] < time.time()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value):
+        expires_at = time.time() + self.ttl if self.ttl else 0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "backend":   "memory",
+            "entries":   len(self._entries),
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+        }
+
+class SqliteCache:
+    """Persistent cache stored in a local SQLite file, evicting least recently used entries."""
+
+    def __init__(self, path: str = CACHE_PATH, max_entries: int = CACHE_MAX_ENTRIES, ttl: int = CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.hits        = 0
+        self.misses      = 0
+        self.evictions   = 0
+        self._lock       = threading.Lock()
+        self._conn       = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key         TEXT PRIMARY KEY,
+                value       TEXT NOT NULL,
+                expires_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] and row[1] < now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value):
+        now        = time.time()
+        expires_at = now + self.ttl if self.ttl else 0
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            # Drop expired rows, then the least recently used ones over the size limit
+            cursor = self._conn.execute("DELETE FROM cache WHERE expires_at > 0 AND expires_at < ?", (now,))
+            self.evictions += cursor.rowcount
+            cursor = self._conn.execute("""
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return {
+            "backend":   "sqlite",
+            "entries":   entries,
+            "hits":      self.hits,
+            "misses":    self.misses,
+            "evictions": self.evictions,
+        }
+
+class NullCache:
+    """Cache that stores nothing, used when caching is turned off."""
+
+    hits = misses = evictions = 0
+
+    def get(self, key: str):
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": "none", "entries": 0, "hits": 0, "misses": self.misses, "evictions": 0}
+
+def create_cache(backend: str = CACHE_BACKEND):
+    """Create the cache backend selected by RAG_CACHE_BACKEND."""
+    if backend == "sqlite":
+        return SqliteCache()
+    if backend == "memory":
+        return MemoryCache()
+    if backend == "none":
+        return NullCache()
+    raise ValueError(f"Unknown RAG_CACHE_BACKEND: {backend}")
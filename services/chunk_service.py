@@ -0,0 +1,43 @@
+from sqlalchemy import select, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from db.database import SessionLocal, AsyncSessionLocal, engine
+from db import models
+
+# Chunk columns written at ingestion time and returned by lookups
+CHUNK_FIELDS = ("id", "text", "source", "drug_name", "page")
+
+def chunk_to_dict(chunk: models.KnowledgeChunk) -> dict:
+    return {field: getattr(chunk, field) for field in CHUNK_FIELDS}
+
+async def aget_chunks(chunk_ids: list) -> dict:
+    """Load chunks by ID, returning a dict of chunk ID -> chunk fields."""
+    if not chunk_ids:
+        return {}
+    async with AsyncSessionLocal() as db:
+        rows = await db.scalars(select(models.KnowledgeChunk).where(models.KnowledgeChunk.id.in_(chunk_ids)))
+        return {row.id: chunk_to_dict(row) for row in rows}
+
+def save_chunks(chunks: list):
+    """Insert or update chunks by ID. Called by ingestion before the vectors are stored."""
+    if not chunks:
+        return
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    rows    = [{field: chunk.get(field) for field in CHUNK_FIELDS} for chunk in chunks]
+    stmt    = dialect.insert(models.KnowledgeChunk).values(rows)
+    stmt    = stmt.on_conflict_do_update(
+        index_elements=[models.KnowledgeChunk.id],
+        set_={field: stmt.excluded[field] for field in CHUNK_FIELDS if field != "id"},
+    )
+    with SessionLocal() as db:
+        db.execute(stmt)
+        db.commit()
+
+def delete_chunks(chunk_ids: list):
+    with SessionLocal() as db:
+        db.execute(delete(models.KnowledgeChunk).where(models.KnowledgeChunk.id.in_(chunk_ids)))
+        db.commit()
+
+async def aget_drug_names() -> list:
+    """Distinct drug names of the ingested drug label chunks."""
+    async with AsyncSessionLocal() as db:
+        return list(await db.scalars(select(models.KnowledgeChunk.drug_name).where(models.KnowledgeChunk.drug_name.is_not(None)).distinct()))
@@ -0,0 +1,161 @@
+import os
+import re
+
+# Token budgets for the sections of the suggestion and discharge prompts.
+# Long consultations are condensed to fit, so prompt size (and LLM latency)
+# stays flat however long the visit runs.
+KNOWLEDGE_TOKENS  = int(os.getenv("CONTEXT_KNOWLEDGE_TOKENS", "1200"))
+TRANSCRIPT_TOKENS = int(os.getenv("CONTEXT_TRANSCRIPT_TOKENS", "3000"))
+
+# Share of the transcript budget kept verbatim for the most recent part of the
+# conversation; older segments are condensed into the rest
+RECENT_SHARE = 0.6
+
+# Knowledge base chunks overlap by 50 characters, so a shared edge shorter than
+# this is a coincidence rather than splitter overlap
+MIN_OVERLAP = 20
+MAX_OVERLAP = 200
+
+# Chunks cut to fit the budget are dropped instead if less than this would remain
+MIN_CHUNK_TOKENS = 40
+
+# Layout of a transcript that had to be condensed
+CONDENSED_TEMPLATE = "[Earlier conversation, condensed]\n{summary}\n\n[Most recent conversation]\n{recent}"
+
+TOKEN_PATTERN    = re.compile(r"\w+|[^\w\s]")
+WORD_PATTERN     = re.compile(r"\S+")
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in a text.
+
+    Words up to four characters are usually one token and longer ones split
+    into roughly four-character pieces; punctuation is a token of its own.
+    This tracks the Llama tokenizer closely enough for budgeting without
+    loading it.
+    """
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PATTERN.findall(text or ""))
+
+def split_at_tokens(text: str, budget: int, from_end: bool = False) -> int:
+    """Offset at a word boundary where the start of a text (or with from_end, its end) fills a token budget."""
+    words = list(WORD_PATTERN.finditer(text))
+    if from_end:
+        words = words[::-1]
+
+    offset, used = len(text) if from_end else 0, 0
+    for word in words:
+        used += count_tokens(word.group())
+        if used > budget:
+            break
+        offset = word.start() if from_end else word.end()
+    return offset
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """Cut a text at a word boundary so it fits within a token budget."""
+    if count_tokens(text) <= budget:
+        return text
+    return text[:split_at_tokens(text, budget)]
+
+def edge_overlap(previous: str, text: str) -> int:
+    """Length of the longest end of previous that text starts with."""
+    for size in range(min(len(previous), len(text), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if previous.endswith(text[:size]):
+            return size
+    return 0
+
+def dedupe_chunks(chunks: list, chunk_ids: list) -> tuple:
+    """Remove repeated knowledge base text before it reaches the prompt.
+
+    Chunks whose text is already contained in an earlier chunk are dropped,
+    and the text a chunk shares with the end of an earlier neighbour from the
+    splitter overlap is trimmed from its start. Rank order is kept.
+    """
+    kept_chunks, kept_ids = [], []
+    for chunk_id, chunk in zip(chunk_ids, chunks):
+        text = chunk.strip()
+        if not text or any(text in other for other in kept_chunks):
+            continue
+        overlap = max((edge_overlap(other, text) for other in kept_chunks), default=0)
+        if overlap:
+            text = text[overlap:].strip()
+        kept_chunks.append(text)
+        kept_ids.append(chunk_id)
+    return kept_chunks, kept_ids
+
+def fit_chunks(chunks: list, chunk_ids: list, budget: int = KNOWLEDGE_TOKENS) -> tuple:
+    """Keep the highest ranked chunks that fit in the budget, cutting the last one if needed."""
+    kept_chunks, kept_ids, used = [], [], 0
+    for chunk_id, chunk in zip(chunk_ids, chunks):
+        remaining = budget - used
+        tokens    = count_tokens(chunk)
+        if tokens > remaining:
+            if remaining >= MIN_CHUNK_TOKENS:
+                kept_chunks.append(truncate_to_tokens(chunk, remaining))
+                kept_ids.append(chunk_id)
+            break
+        kept_chunks.append(chunk)
+        kept_ids.append(chunk_id)
+        used += tokens
+    return kept_chunks, kept_ids
+
+def condense_transcript(text: str, budget: int, terms: list) -> str:
+    """Shrink an older part of the transcript to the sentences that carry clinical content.
+
+    Sentences mentioning one of the extracted symptom terms come first, then
+    the longest of the rest, until the budget is used. Repeated sentences and
+    fillers of one or two words are left out, and the kept sentences stay in
+    their original order.
+    """
+    sentences = [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+    lowered   = [s.lower() for s in sentences]
+    mentions  = [sum(term in sentence for term in terms) for sentence in lowered]
+
+    def priority(index):
+        return (-mentions[index], -len(sentences[index]))
+
+    chosen, seen, used = set(), set(), 0
+    for index in sorted(range(len(sentences)), key=priority):
+        if lowered[index] in seen or (not mentions[index] and len(sentences[index].split()) < 3):
+            continue
+        cost = count_tokens(sentences[index])
+        if used + cost > budget:
+            continue
+        chosen.add(index)
+        seen.add(lowered[index])
+        used += cost
+
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+def fit_transcript(transcript: str, budget: int = TRANSCRIPT_TOKENS, symptoms: str = "") -> str:
+    """Fit a transcript into a token budget.
+
+    Short transcripts are returned unchanged. Otherwise the most recent part is
+    kept word for word and the earlier part is condensed with the extracted
+    symptoms as a guide to what matters.
+    """
+    if count_tokens(transcript) <= budget:
+        return transcript
+
+    budget -= count_tokens(CONDENSED_TEMPLATE)
+    split   = split_at_tokens(transcript, int(budget * RECENT_SHARE), from_end=True)
+    recent  = transcript[split:].strip()
+    earlier = transcript[:split]
+
+    terms   = [t.strip().lower() for t in (symptoms or "").split(",") if t.strip()]
+    summary = condense_transcript(earlier, budget - count_tokens(recent), terms)
+
+    return CONDENSED_TEMPLATE.format(summary=summary or "(omitted)", recent=recent)
+
+def build_prompt_context(transcript: str, chunks: list, chunk_ids: list, symptoms: str = "") -> dict:
+    """Deduplicate and budget the transcript and knowledge passages for an LLM prompt."""
+    before = count_tokens(transcript) + sum(count_tokens(c) for c in chunks)
+
+    chunks, chunk_ids = dedupe_chunks(chunks, chunk_ids)
+    chunks, chunk_ids = fit_chunks(chunks, chunk_ids)
+    transcript        = fit_transcript(transcript, symptoms=symptoms)
+
+    after = count_tokens(transcript) + sum(count_tokens(c) for c in chunks)
+    if after < before:
+        print(f"Prompt context trimmed from ~{before} to ~{after} tokens")
+
+    return {"transcript": transcript, "chunks": chunks, "chunk_ids": chunk_ids}
@@ -1,141 +1,55 @@
-import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, Table, TableStyle, ListFlowable, ListItem
-from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
-
-def generate_discharge_pdf(session, transcript_text: str, discharge_content: dict) -> bytes:
-    """Generate a discharge summary PDF and return it as bytes."""
-
-    buffer = io.BytesIO()
-    doc    = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm,
-    )
-
-    styles  = getSampleStyleSheet()
-    content = []
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        "Title",
-        parent=styles["Heading1"],
-        fontSize=22,
-        textColor=colors.HexColor("#0f172a"),
-        alignment=TA_CENTER,
-        spaceAfter=4,
-    )
-    subtitle_style = ParagraphStyle(
-        "Subtitle",
-        parent=styles["Normal"],
-        fontSize=10,
-        textColor=colors.HexColor("#64748b"),
-        alignment=TA_CENTER,
-        spaceAfter=20,
-    )
-    section_style = ParagraphStyle(
-        "Section",
-        parent=styles["Heading2"],
-        fontSize=13,
-        textColor=colors.HexColor("#1e293b"),
-        spaceBefore=16,
-        spaceAfter=8,
-    )
-    body_style = ParagraphStyle(
-        "Body",
-        parent=styles["Normal"],
-        fontSize=10,
-        textColor=colors.HexColor("#334155"),
-        leading=16,
-    )
-    footer_style = ParagraphStyle(
-        "Footer",
-        parent=styles["Normal"],
-        fontSize=8,
-        textColor=colors.HexColor("#94a3b8"),
-        alignment=TA_CENTER,
-    )
-
-    # Header
-    content.append(Paragraph("MedAssist", title_style))
-    content.append(Paragraph("Patient Discharge Summary", subtitle_style))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
-    content.append(Spacer(1, 12))
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer
+from services.pdf_service import STYLES, DATE_FORMAT, build_pdf, format_date, header, section, rule, info_table, bullet_list, footer
+
+def discharge_report_data(session, discharge_content: dict) -> dict:
+    """Copy what the discharge summary shows into plain data, so it can be sent to a rendering process."""
+    return {
+        "session":        {"id": session.id, "title": session.title, "created_at": str(session.created_at)},
+        "discharge_date": datetime.now().strftime(DATE_FORMAT),
+        "content":        discharge_content,
+    }
+
+def render_discharge_pdf(report: dict, output):
+    """Render a discharge summary from discharge_report_data and write it to output, a path or binary file."""
+    session           = report["session"]
+    discharge_content = report["content"]
+    content           = header("MedAssist", "Patient Discharge Summary", title_style="title_large")
 
     # Session info table
-    content.append(Paragraph("Consultation Details", section_style))
-    discharge_date = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-    created        = datetime.fromisoformat(str(session.created_at)).strftime("%B %d, %Y at %I:%M %p")
-    info_data = [
-        ["Session Title",   session.title],
-        ["Session ID",      str(session.id)],
-        ["Consultation Date", created],
-        ["Discharge Date",  discharge_date],
-    ]
-    info_table = Table(info_data, colWidths=[4.5*cm, 12.5*cm])
-    info_table.setStyle(TableStyle([
-        ("FONTSIZE",      (0, 0), (-1, -1), 10),
-        ("TEXTCOLOR",     (0, 0), (0, -1), colors.HexColor("#64748b")),
-        ("TEXTCOLOR",     (1, 0), (1, -1), colors.HexColor("#1e293b")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-    ]))
-    content.append(info_table)
+    content.append(section("Consultation Details"))
+    content.append(info_table([
+        ["Session Title",     session["title"]],
+        ["Session ID",        str(session["id"])],
+        ["Consultation Date", format_date(session["created_at"])],
+        ["Discharge Date",    report["discharge_date"]],
+    ], col_widths=[4.5*cm, 12.5*cm]))
     content.append(Spacer(1, 8))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(rule())
 
     # Possible cause
-    content.append(Paragraph("Possible Cause", section_style))
-    content.append(Paragraph(
-        discharge_content.get("possible_cause", "Not determined."),
-        body_style
-    ))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(section("Possible Cause"))
+    content.append(Paragraph(discharge_content.get("possible_cause", "Not determined."), STYLES["body"]))
+    content.append(rule())
 
     # Prescribed drugs
-    content.append(Paragraph("Prescribed Drugs and Dosages", section_style))
-    drugs = discharge_content.get("prescribed_drugs", [])
-    if drugs:
-        items = [ListItem(Paragraph(d, body_style), bulletColor=colors.HexColor("#3b82f6")) for d in drugs]
-        content.append(ListFlowable(items, bulletType="bullet"))
-    else:
-        content.append(Paragraph("No drugs prescribed.", body_style))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(section("Prescribed Drugs and Dosages"))
+    content += bullet_list(discharge_content.get("prescribed_drugs", []), "No drugs prescribed.")
+    content.append(rule())
 
     # Follow up tests
-    content.append(Paragraph("Recommended Follow-Up Tests", section_style))
-    tests = discharge_content.get("followup_tests", [])
-    if tests:
-        items = [ListItem(Paragraph(t, body_style), bulletColor=colors.HexColor("#3b82f6")) for t in tests]
-        content.append(ListFlowable(items, bulletType="bullet"))
-    else:
-        content.append(Paragraph("No follow-up tests recommended.", body_style))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(section("Recommended Follow-Up Tests"))
+    content += bullet_list(discharge_content.get("followup_tests", []), "No follow-up tests recommended.")
+    content.append(rule())
 
     # Follow up instructions
-    content.append(Paragraph("Follow-Up Instructions", section_style))
-    instructions = discharge_content.get("followup_instructions", [])
-    if instructions:
-        items = [ListItem(Paragraph(i, body_style), bulletColor=colors.HexColor("#3b82f6")) for i in instructions]
-        content.append(ListFlowable(items, bulletType="bullet"))
-    else:
-        content.append(Paragraph("No specific instructions provided.", body_style))
+    content.append(section("Follow-Up Instructions"))
+    content += bullet_list(discharge_content.get("followup_instructions", []), "No specific instructions provided.")
 
-    # Footer
-    content.append(Spacer(1, 24))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
-    content.append(Spacer(1, 6))
-    content.append(Paragraph(
+    content += footer(
         "Generated by MedAssist — for clinical reference only. Doctor review and approval required before patient discharge.",
-        footer_style
-    ))
+        space_before=24,
+    )
 
-    doc.build(content)
-    buffer.seek(0)
-    return buffer.read()
\ No newline at end of file
+    build_pdf(content, output)
@@ -0,0 +1,135 @@
+import os
+import uuid
+import shutil
+import hashlib
+import tempfile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import models
+
+# Clients revalidate with If-None-Match on every download instead of reusing
+# a stale copy, and shared caches never store patient documents
+CACHE_CONTROL = "private, no-cache"
+
+# Where stored PDF exports are kept, one file per ETag. The discharge job can
+# run in a separate worker process, so it must be shared with the workers.
+CACHE_DIR = os.getenv("PDF_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "medassist-exports")
+
+async def aget_session_version(session_id: int, db: AsyncSession):
+    """Return what a session's exports depend on, or None if the session doesn't exist.
+
+    New transcripts and suggestions raise the max IDs; title edits, feedback
+    and live transcript appends bump updated_at. Suggestion runs leave
+    updated_at alone, so they only change the session export's version.
+    """
+    latest_transcript = (
+        select(func.max(models.Transcript.id))
+        .where(models.Transcript.session_id == session_id)
+        .scalar_subquery()
+    )
+    latest_suggestion = (
+        select(func.max(models.Suggestion.id))
+        .where(models.Suggestion.session_id == session_id)
+        .scalar_subquery()
+    )
+    row = (await db.execute(
+        select(
+            func.coalesce(models.Session.updated_at, models.Session.created_at),
+            latest_transcript,
+            latest_suggestion,
+        ).where(models.Session.id == session_id)
+    )).first()
+    if row is None:
+        return None
+
+    changed_at, transcript_id, suggestion_id = row
+    return {"changed_at": str(changed_at), "transcript_id": transcript_id, "suggestion_id": suggestion_id}
+
+# The parts of the session version each export shows. The discharge summary
+# is generated from the latest transcript and doesn't list the suggestions.
+EXPORT_VERSION_FIELDS = {
+    "export":    ("changed_at", "transcript_id", "suggestion_id"),
+    "discharge": ("changed_at", "transcript_id"),
+}
+
+def export_etag(kind: str, session_id: int, version: dict) -> str:
+    """Strong ETag for one kind of export at one session version."""
+    parts  = [str(version[field]) for field in EXPORT_VERSION_FIELDS[kind]]
+    raw    = ":".join([kind, str(session_id), *parts])
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return f'"{kind}-{digest}"'
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """True if an If-None-Match header names this ETag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in tags
+
+def cached_path(etag: str) -> str:
+    """Path of the stored PDF for an ETag. The ETag hashes the session ID, so it is unique across sessions."""
+    return os.path.join(CACHE_DIR, etag.strip('"') + ".pdf")
+
+def store_file(path: str, target: str):
+    """Put a copy of a rendered PDF at target, linking it rather than copying where the filesystem allows."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    partial = f"{target}.{uuid.uuid4().hex}.part"
+    try:
+        os.link(path, partial)
+    except OSError:
+        shutil.copyfile(path, partial)
+    os.replace(partial, target)
+
+def remove_cached_files(etags: list):
+    """Delete stored PDFs that no export row points to any more."""
+    for etag in etags:
+        try:
+            os.remove(cached_path(etag))
+        except FileNotFoundError:
+            pass
+
+async def aget_cached_export(session_id: int, kind: str, etag: str, db: AsyncSession):
+    """Return the path of the stored PDF if it was rendered for this ETag, or None.
+
+    A row whose file is gone (e.g. a cleared temp directory) counts as a miss
+    and is rendered again.
+    """
+    stored = await db.scalar(
+        select(models.PdfExport.id).where(
+            models.PdfExport.session_id == session_id,
+            models.PdfExport.kind       == kind,
+            models.PdfExport.etag       == etag,
+        )
+    )
+    path = cached_path(etag)
+    if stored is None or not os.path.exists(path):
+        return None
+    return path
+
+async def asave_export(session_id: int, kind: str, etag: str, path: str, db: AsyncSession):
+    """Store a rendered PDF file, replacing the previous version of the same export.
+
+    The database only keeps the ETag and size; the file is kept in CACHE_DIR
+    and the one it replaces is deleted. The caller still owns path. The export
+    is still sent if this fails; it is just rendered again next time.
+    """
+    try:
+        await run_in_threadpool(store_file, path, cached_path(etag))
+        replaced = (await db.scalars(select(models.PdfExport.etag).where(
+            models.PdfExport.session_id == session_id,
+            models.PdfExport.kind       == kind,
+        ))).all()
+        await db.execute(delete(models.PdfExport).where(
+            models.PdfExport.session_id == session_id,
+            models.PdfExport.kind       == kind,
+        ))
+        db.add(models.PdfExport(session_id=session_id, kind=kind, etag=etag, size=os.path.getsize(path)))
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        print(f"Could not store {kind} PDF for session {session_id}: {e}")
+        return
+    await run_in_threadpool(remove_cached_files, [old for old in replaced if old != etag])
@@ -1,148 +1,88 @@
-import io
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, Table, TableStyle
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from datetime import datetime
-
-def generate_session_pdf(session, transcripts, suggestions) -> bytes:
-    """Generate a PDF summary for a consultation session and return it as bytes."""
-
-    buffer = io.BytesIO()
-    doc    = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm,
-    )
-
-    styles  = getSampleStyleSheet()
-    content = []
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        "Title",
-        parent=styles["Heading1"],
-        fontSize=20,
-        textColor=colors.HexColor("#0f172a"),
-        alignment=TA_CENTER,
-        spaceAfter=6,
-    )
-    subtitle_style = ParagraphStyle(
-        "Subtitle",
-        parent=styles["Normal"],
-        fontSize=10,
-        textColor=colors.HexColor("#64748b"),
-        alignment=TA_CENTER,
-        spaceAfter=20,
-    )
-    section_style = ParagraphStyle(
-        "Section",
-        parent=styles["Heading2"],
-        fontSize=13,
-        textColor=colors.HexColor("#1e293b"),
-        spaceBefore=16,
-        spaceAfter=8,
-    )
-    body_style = ParagraphStyle(
-        "Body",
-        parent=styles["Normal"],
-        fontSize=10,
-        textColor=colors.HexColor("#334155"),
-        leading=16,
-    )
-    label_style = ParagraphStyle(
-        "Label",
-        parent=styles["Normal"],
-        fontSize=9,
-        textColor=colors.HexColor("#94a3b8"),
-        spaceAfter=2,
-    )
-
-    # Header
-    content.append(Paragraph("MedAssist", title_style))
-    content.append(Paragraph("Consultation Report", subtitle_style))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
-    content.append(Spacer(1, 12))
+from reportlab.platypus import Paragraph, Spacer
+from services.pdf_service import STYLES, build_pdf, format_date, header, section, rule, info_table, footer
+
+STATUS_COLORS = {
+    "accepted": "#22c55e",
+    "rejected": "#ef4444",
+    "modified": "#f59e0b",
+    "pending":  "#94a3b8",
+}
+
+TYPE_LABELS = {
+    "diagnosis": "Diagnosis",
+    "test":      "Recommended Test",
+    "drug":      "Drug / Dosage",
+    "red_flag":  "Red Flag",
+}
+
+def session_report_data(session, transcripts, suggestions) -> dict:
+    """Copy what the consultation report shows out of the ORM objects, so it can be sent to a rendering process."""
+    return {
+        "session": {"id": session.id, "title": session.title, "created_at": str(session.created_at)},
+        "transcripts": [t.text for t in transcripts],
+        "suggestions": [
+            {
+                "type":        s.type,
+                "content":     s.content,
+                "confidence":  s.confidence,
+                "status":      str(s.status.value if hasattr(s.status, "value") else s.status),
+                "doctor_note": s.doctor_note,
+            }
+            for s in suggestions
+        ],
+    }
+
+def render_session_pdf(report: dict, output):
+    """Render a consultation report from session_report_data and write it to output, a path or binary file."""
+    session = report["session"]
+    body    = STYLES["body"]
+    content = header("MedAssist", "Consultation Report")
 
     # Session info
-    content.append(Paragraph("Session Details", section_style))
-    created = datetime.fromisoformat(str(session.created_at)).strftime("%B %d, %Y at %I:%M %p")
-    info_data = [
-        ["Session Title", session.title],
-        ["Session ID",    str(session.id)],
-        ["Date",          created],
-    ]
-    info_table = Table(info_data, colWidths=[4*cm, 13*cm])
-    info_table.setStyle(TableStyle([
-        ("FONTSIZE",    (0, 0), (-1, -1), 10),
-        ("TEXTCOLOR",  (0, 0), (0, -1), colors.HexColor("#64748b")),
-        ("TEXTCOLOR",  (1, 0), (1, -1), colors.HexColor("#1e293b")),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
-    ]))
-    content.append(info_table)
+    content.append(section("Session Details"))
+    content.append(info_table([
+        ["Session Title", session["title"]],
+        ["Session ID",    str(session["id"])],
+        ["Date",          format_date(session["created_at"])],
+    ], col_widths=[4*cm, 13*cm]))
     content.append(Spacer(1, 12))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(rule())
 
     # Transcript
-    content.append(Paragraph("Transcript", section_style))
-    if transcripts:
-        for t in transcripts:
-            content.append(Paragraph(t.text, body_style))
+    content.append(section("Transcript"))
+    if report["transcripts"]:
+        for text in report["transcripts"]:
+            content.append(Paragraph(text, body))
             content.append(Spacer(1, 6))
     else:
-        content.append(Paragraph("No transcript available.", body_style))
+        content.append(Paragraph("No transcript available.", body))
 
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
+    content.append(rule())
 
     # Suggestions
-    content.append(Paragraph("AI Suggestions", section_style))
+    content.append(section("AI Suggestions"))
 
-    if suggestions:
-        for s in suggestions:
+    if report["suggestions"]:
+        for s in report["suggestions"]:
             # Type and status badge
-            status_color = {
-                "accepted": "#22c55e",
-                "rejected": "#ef4444",
-                "modified": "#f59e0b",
-                "pending":  "#94a3b8",
-            }.get(str(s.status.value if hasattr(s.status, 'value') else s.status), "#94a3b8")
-
-            type_label = {
-                "diagnosis": "Diagnosis",
-                "test":      "Recommended Test",
-                "drug":      "Drug / Dosage",
-                "red_flag":  "Red Flag",
-            }.get(s.type, s.type)
+            status_color = STATUS_COLORS.get(s["status"], "#94a3b8")
+            type_label   = TYPE_LABELS.get(s["type"], s["type"])
 
             content.append(Paragraph(
                 f'<font color="{status_color}">●</font> <b>{type_label}</b> '
-                f'— <font color="#94a3b8">{s.confidence} confidence</font>',
-                body_style
+                f'— <font color="#94a3b8">{s["confidence"]} confidence</font>',
+                body
             ))
-            content.append(Paragraph(s.content, body_style))
+            content.append(Paragraph(s["content"], body))
 
-            if s.doctor_note:
-                content.append(Paragraph(f"Doctor note: {s.doctor_note}", label_style))
+            if s["doctor_note"]:
+                content.append(Paragraph(f"Doctor note: {s['doctor_note']}", STYLES["label"]))
 
             content.append(Spacer(1, 8))
     else:
-        content.append(Paragraph("No suggestions generated for this session.", body_style))
+        content.append(Paragraph("No suggestions generated for this session.", body))
 
-    # Footer
-    content.append(Spacer(1, 20))
-    content.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor("#e2e8f0")))
-    content.append(Spacer(1, 6))
-    content.append(Paragraph(
-        "Generated by MedAssist — for clinical reference only. Doctor review required.",
-        ParagraphStyle("Footer", parent=styles["Normal"], fontSize=8,
-                       textColor=colors.HexColor("#94a3b8"), alignment=TA_CENTER)
-    ))
+    content += footer("Generated by MedAssist — for clinical reference only. Doctor review required.", space_before=20)
 
-    doc.build(content)
-    buffer.seek(0)
-    return buffer.read()
\ No newline at end of file
+    build_pdf(content, output)
@@ -0,0 +1,81 @@
+import re
+
+# Common presenting symptoms and conditions. Together with the drug names in
+# the knowledge base they cover most of what retrieval needs from a transcript.
+CLINICAL_TERMS = (
+    "abdominal pain", "acid reflux", "allergy", "anemia", "anxiety", "arthritis", "asthma",
+    "back pain", "bleeding", "blood in stool", "blood in urine", "blurred vision", "body ache",
+    "breathlessness", "bronchitis", "bruising", "burning urination", "chest pain", "chills",
+    "cold", "confusion", "congestion", "constipation", "cough", "cramps", "dehydration",
+    "depression", "diabetes", "diarrhea", "dizziness", "drowsiness", "dry mouth", "ear pain",
+    "eczema", "fainting", "fatigue", "fever", "flu", "headache", "heartburn", "hives",
+    "high blood pressure", "hypertension", "indigestion", "infection", "inflammation",
+    "insomnia", "itching", "jaundice", "joint pain", "loss of appetite", "malaria",
+    "migraine", "muscle pain", "nasal congestion", "nausea", "neck pain", "numbness",
+    "pain", "palpitations", "pneumonia", "rash", "runny nose", "seizure", "shortness of breath",
+    "sinusitis", "sneezing", "sore throat", "sputum", "stomach ache", "sweating", "swelling",
+    "tingling", "tuberculosis", "typhoid", "urinary tract infection", "vomiting", "weakness",
+    "weight loss", "wheezing",
+)
+
+# Brand names made of ordinary words ("Pain Relief", "Cold and Flu") would
+# match everyday speech, so only distinctive single-word brands are used
+MIN_BRAND_LENGTH = 5
+
+WORD_PATTERN  = re.compile(r"[a-z0-9]+")
+DRUG_PATTERN  = re.compile(r"^(.*?)\s*\((.*)\)\s*$")
+NAME_SPLITTER = re.compile(r",|/|\band\b")
+
+def words(text: str) -> tuple:
+    return tuple(WORD_PATTERN.findall(text.lower()))
+
+def drug_terms(drug_names: list) -> set:
+    """Turn "Brand (generic)" drug names into the terms worth matching in a transcript."""
+    terms = set()
+    for name in drug_names:
+        match          = DRUG_PATTERN.match(name or "")
+        brand, generic = match.groups() if match else (name or "", "")
+        for part in NAME_SPLITTER.split(generic.lower()):
+            if part.strip() and part.strip() != "unknown":
+                terms.add(part.strip())
+        brand_words = words(brand)
+        if len(brand_words) == 1 and len(brand_words[0]) >= MIN_BRAND_LENGTH and brand_words[0] != "unknown":
+            terms.add(brand_words[0])
+    return terms
+
+class TermExtractor:
+    """Dictionary-based extraction of clinical terms from a transcript.
+
+    Terms are matched as whole word sequences, longest first, so "chest pain"
+    wins over "pain". A trailing plural s is ignored on both sides.
+    """
+
+    def __init__(self, terms):
+        self.terms   = {}   # word tuple -> term as listed
+        self.longest = 1
+        for term in terms:
+            key = tuple(w.rstrip("s") or w for w in words(term))
+            if key:
+                self.terms.setdefault(key, term.lower())
+                self.longest = max(self.longest, len(key))
+
+    def extract(self, text: str) -> list:
+        """Return the terms found in the text in order of first mention, without repeats."""
+        tokens = [w.rstrip("s") or w for w in words(text)]
+        found  = {}
+        i      = 0
+        while i < len(tokens):
+            for size in range(min(self.longest, len(tokens) - i), 0, -1):
+                term = self.terms.get(tuple(tokens[i:i + size]))
+                if term:
+                    found.setdefault(term, None)
+                    i += size
+                    break
+            else:
+                i += 1
+        return list(found)
+
+def build_term_extractor(drug_names: list) -> TermExtractor:
+    extractor = TermExtractor(CLINICAL_TERMS + tuple(sorted(drug_terms(drug_names))))
+    print(f"Term extractor loaded with {len(extractor.terms)} terms")
+    return extractor
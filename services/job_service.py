@@ -0,0 +1,332 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import AsyncSessionLocal
+from db import models
+from db.schemas import SuggestionOut
+from services.suggestion_service import alatest_transcript, asaved_suggestions, agenerate_session_suggestions, arefresh_suggestions
+from services.export_cache_service import aget_session_version, export_etag, aget_cached_export
+from services.report_service import arender_discharge_export
+from services.transcription_service import transcribe_file, discard_job_upload
+from services.rag_service import close_retriever
+from services.pdf_service import shutdown_pool
+
+# Jobs each process runs at the same time. Set to 0 to run none in the web
+# server, when a separate `python -m services.job_service` process runs them.
+JOB_WORKERS       = int(os.getenv("JOB_WORKERS", "2"))
+
+# Seconds between checks for jobs queued by other processes and retries
+# coming due. Jobs queued in the same process start straight away.
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+
+# Seconds a job may run before it is cancelled. A job still marked running
+# well after this was left behind by a process that stopped, and is retried.
+JOB_TIMEOUT       = int(os.getenv("JOB_TIMEOUT", "900"))
+
+# Failed jobs are retried after JOB_RETRY_DELAY seconds, doubling each time,
+# until they have been tried JOB_MAX_ATTEMPTS times
+JOB_MAX_ATTEMPTS  = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY   = float(os.getenv("JOB_RETRY_DELAY", "5"))
+
+# Seconds finished jobs and their results are kept
+JOB_RETENTION     = int(os.getenv("JOB_RETENTION", "86400"))
+
+SWEEP_INTERVAL = 60
+CLAIM_BATCH    = 10
+TERMINAL       = ("succeeded", "failed")
+
+class JobError(Exception):
+    """A failure that retrying won't fix, such as a deleted session. The job fails without further attempts."""
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+# ----------------------------------------------------------------
+# Handlers: each runs one kind of job with its own database session
+# and returns the JSON result stored on the job
+# ----------------------------------------------------------------
+
+async def arun_suggestions_job(job: models.Job, db: AsyncSession) -> dict:
+    """Generate and save suggestions, once per job even if it is retried.
+
+    Incremental refreshes only save when they move the watermark, so a retry
+    finds nothing new. A full run that saved its suggestions but was retried
+    before the job was marked done returns what it saved, found by the newest
+    suggestion ID recorded when the job was queued.
+    """
+    if job.payload.get("incremental"):
+        session = await db.get(models.Session, job.session_id)
+        if not session:
+            raise JobError("Session not found")
+        suggestions = await arefresh_suggestions(session, db)
+    else:
+        transcript = await alatest_transcript(job.session_id, db)
+        if not transcript:
+            raise JobError("No transcript found for this session")
+        suggestions = []
+        if job.attempts > 1 and "after_suggestion_id" in job.payload:
+            suggestions = await asaved_suggestions(transcript, job.payload["after_suggestion_id"], db)
+        if not suggestions:
+            suggestions = await agenerate_session_suggestions(transcript, db)
+
+    return {"suggestions": [SuggestionOut.model_validate(s).model_dump(mode="json") for s in suggestions]}
+
+async def arun_discharge_job(job: models.Job, db: AsyncSession) -> dict:
+    """Generate and store the discharge PDF; the client downloads it from the export cache."""
+    version = await aget_session_version(job.session_id, db)
+    if version is None:
+        raise JobError("Session not found")
+    if version["transcript_id"] is None:
+        raise JobError("No transcript found for this session")
+
+    etag = export_etag("discharge", job.session_id, version)
+    if await aget_cached_export(job.session_id, "discharge", etag, db) is None:
+        path = await arender_discharge_export(job.session_id, etag, db)
+        os.remove(path)
+
+    return {"etag": etag, "url": f"/api/sessions/{job.session_id}/discharge"}
+
+async def arun_transcribe_job(job: models.Job, db: AsyncSession) -> dict:
+    if not await db.get(models.Session, job.session_id):
+        raise JobError("Session not found")
+    if not os.path.exists(job.payload["path"]):
+        raise JobError("The uploaded recording is no longer available")
+
+    # Transcribed from the spooled upload, in segments if it is long
+    text = await transcribe_file(job.payload["path"], job.payload["filename"], job.payload["content_type"])
+
+    transcript = models.Transcript(session_id=job.session_id, text=text)
+    db.add(transcript)
+    await db.commit()
+    return {"text": text, "transcript_id": transcript.id}
+
+HANDLERS = {
+    "suggestions": arun_suggestions_job,
+    "discharge":   arun_discharge_job,
+    "transcribe":  arun_transcribe_job,
+}
+
+def discard_job_files(job: models.Job):
+    """Delete the upload a job was given, once it has finished and won't be retried."""
+    if job.payload.get("path"):
+        discard_job_upload(job.payload["path"])
+
+# ----------------------------------------------------------------
+# Queue. Jobs are rows in the jobs table, so the queue works the same
+# on SQLite and Postgres and survives restarts.
+# ----------------------------------------------------------------
+
+_wakeup   = asyncio.Event()   # set when a job is queued in this process
+_watchers = {}                # job ID -> Event set when that job changes in this process
+_tasks    = []
+
+def wake_workers():
+    _wakeup.set()
+
+def notify(job_id: str):
+    event = _watchers.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+async def await_job_change(job_id: str, timeout: float):
+    """Wait until a job changes in this process, or timeout seconds for changes made elsewhere."""
+    event = _watchers.setdefault(job_id, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except TimeoutError:
+        pass
+
+async def aenqueue_job(kind: str, session_id: int, payload: dict, db: AsyncSession) -> models.Job:
+    """Queue a job and return it. Uploads the handler needs, such as audio, are passed as a spooled file path in payload."""
+    now = utcnow()
+    job = models.Job(
+        id         = uuid.uuid4().hex,
+        kind       = kind,
+        status     = "queued",
+        session_id = session_id,
+        payload    = payload,
+        attempts   = 0,
+        run_at     = now,
+        created_at = now,
+    )
+    db.add(job)
+    await db.commit()
+    wake_workers()
+    return job
+
+async def aget_job(job_id: str):
+    async with AsyncSessionLocal() as db:
+        return await db.get(models.Job, job_id)
+
+async def aclaim_job():
+    """Take the oldest due job off the queue, or return None if there isn't one.
+
+    A job is claimed by an UPDATE that only matches while it is still queued,
+    so when workers in several processes race for the same job exactly one
+    of them gets it, without row locks the SQLite backend doesn't have.
+    """
+    now = utcnow()
+    async with AsyncSessionLocal() as db:
+        candidates = (await db.scalars(
+            select(models.Job.id)
+            .where(models.Job.status == "queued", models.Job.run_at <= now)
+            .order_by(models.Job.run_at)
+            .limit(CLAIM_BATCH)
+        )).all()
+
+        for job_id in candidates:
+            claimed = await db.execute(
+                update(models.Job)
+                .where(models.Job.id == job_id, models.Job.status == "queued")
+                .values(status="running", started_at=now, attempts=models.Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if claimed.rowcount == 1:
+                return await db.get(models.Job, job_id)
+    return None
+
+async def afinish_job(job_id: str, status: str, **values):
+    """Record the outcome of a run."""
+    values["status"] = status
+    if status in TERMINAL:
+        values["finished_at"] = utcnow()
+    else:
+        values["started_at"] = None
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(models.Job).where(models.Job.id == job_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    notify(job_id)
+
+async def arun_job(job: models.Job):
+    """Run a claimed job and store its result, retrying later if it fails."""
+    print(f"Job {job.id}: {job.kind} for session {job.session_id}, attempt {job.attempts}")
+    notify(job.id)
+
+    try:
+        handler = HANDLERS.get(job.kind)
+        if handler is None:
+            raise JobError(f"Unknown job kind: {job.kind}")
+        async with AsyncSessionLocal() as db:
+            result = await asyncio.wait_for(handler(job, db), JOB_TIMEOUT)
+    except asyncio.CancelledError:
+        # The process is shutting down: hand the job back without using up an attempt
+        await afinish_job(job.id, "queued", attempts=job.attempts - 1, run_at=utcnow())
+        raise
+    except Exception as e:
+        error = f"Timed out after {JOB_TIMEOUT}s" if isinstance(e, TimeoutError) else str(e) or type(e).__name__
+        if isinstance(e, JobError) or job.attempts >= JOB_MAX_ATTEMPTS:
+            print(f"Job {job.id} failed: {error}")
+            await afinish_job(job.id, "failed", error=error)
+            discard_job_files(job)
+        else:
+            delay = JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            print(f"Job {job.id} failed, retrying in {delay:.0f}s: {error}")
+            await afinish_job(job.id, "queued", error=error, run_at=utcnow() + timedelta(seconds=delay))
+    else:
+        await afinish_job(job.id, "succeeded", result=result, error=None)
+        discard_job_files(job)
+
+async def asweep_jobs():
+    """Retry jobs left running by a process that stopped, and delete expired finished jobs."""
+    now   = utcnow()
+    stale = now - timedelta(seconds=JOB_TIMEOUT + SWEEP_INTERVAL)
+    lost  = "The worker running this job stopped"
+
+    async with AsyncSessionLocal() as db:
+        abandoned = (models.Job.status == "running", models.Job.started_at < stale)
+        requeued  = await db.execute(
+            update(models.Job)
+            .where(*abandoned, models.Job.attempts < JOB_MAX_ATTEMPTS)
+            .values(status="queued", run_at=now, started_at=None, error=lost)
+            .execution_options(synchronize_session=False)
+        )
+        # Out of attempts: failed, and their uploads deleted once that is saved
+        failed = (await db.scalars(
+            select(models.Job).where(*abandoned, models.Job.attempts >= JOB_MAX_ATTEMPTS)
+        )).all()
+        if failed:
+            await db.execute(
+                update(models.Job)
+                .where(models.Job.id.in_([job.id for job in failed]))
+                .values(status="failed", finished_at=now, error=lost)
+                .execution_options(synchronize_session=False)
+            )
+        await db.execute(delete(models.Job).where(
+            models.Job.status.in_(TERMINAL),
+            models.Job.finished_at < now - timedelta(seconds=JOB_RETENTION),
+        ))
+        await db.commit()
+
+    for job in failed:
+        discard_job_files(job)
+    if requeued.rowcount:
+        print(f"Requeued {requeued.rowcount} abandoned jobs")
+        wake_workers()
+
+async def awork(worker: int):
+    while True:
+        # Cleared before looking, so a job queued while this worker looks isn't missed
+        _wakeup.clear()
+        try:
+            job = await aclaim_job()
+        except Exception as e:
+            print(f"Job worker {worker} could not check the queue: {e}")
+            job = None
+
+        if job is not None:
+            await arun_job(job)
+            continue
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), JOB_POLL_INTERVAL)
+        except TimeoutError:
+            pass
+
+async def asweep_forever():
+    while True:
+        try:
+            await asweep_jobs()
+        except Exception as e:
+            print(f"Job sweep failed: {e}")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+def start_workers(workers: int = JOB_WORKERS):
+    """Start the job workers on the running event loop, called when the app starts."""
+    global _wakeup
+    if workers <= 0:
+        return
+    _wakeup = asyncio.Event()
+    _tasks.extend(asyncio.create_task(awork(n)) for n in range(workers))
+    _tasks.append(asyncio.create_task(asweep_forever()))
+    print(f"Started {workers} job workers")
+
+async def stop_workers():
+    """Stop the job workers, putting back any jobs they were running."""
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+async def arun_worker_process():
+    """Run jobs without serving the API, alongside web servers started with JOB_WORKERS=0."""
+    start_workers(max(JOB_WORKERS, 1))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await stop_workers()
+        await close_retriever()
+        shutdown_pool()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(arun_worker_process())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,271 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import aiohttp
+import urllib3
+import groq
+from pinecone.exceptions import PineconeApiException, PineconeProtocolError
+
+# Limits for calls to each external service, per process. Override any of them
+# with <PROVIDER>_RATE_LIMIT (requests per minute, 0 for no limit),
+# <PROVIDER>_CONCURRENCY, <PROVIDER>_TIMEOUT (seconds per attempt) and
+# <PROVIDER>_DEADLINE (seconds for the whole call, including waiting for a
+# turn and retries), e.g. GROQ_RATE_LIMIT=300 on a paid Groq plan. The
+# Groq and Whisper defaults are Groq's free tier limits.
+PROVIDER_DEFAULTS = {
+    # Groq chat completions: suggestions, discharge summaries, symptom extraction
+    "groq":     dict(rate_limit=30,  concurrency=8,  timeout=60,  deadline=180),
+    # Groq Whisper, which Groq limits separately from chat
+    "whisper":  dict(rate_limit=20,  concurrency=4,  timeout=300, deadline=900),
+    # Pinecone inference (query embeddings) and index queries
+    "pinecone": dict(rate_limit=600, concurrency=16, timeout=10,  deadline=30),
+}
+
+# Retries after a rate limit, timeout, dropped connection or server error.
+# Each waits a random time up to OUTBOUND_BACKOFF * 2^attempt seconds (capped
+# at OUTBOUND_MAX_BACKOFF), or as long as the provider's Retry-After says.
+OUTBOUND_RETRIES     = int(os.getenv("OUTBOUND_RETRIES", "4"))
+OUTBOUND_BACKOFF     = float(os.getenv("OUTBOUND_BACKOFF", "0.5"))
+OUTBOUND_MAX_BACKOFF = float(os.getenv("OUTBOUND_MAX_BACKOFF", "20"))
+
+RETRY_STATUSES   = {408, 409, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    groq.APIConnectionError,
+    aiohttp.ClientConnectionError,
+    urllib3.exceptions.HTTPError,
+    PineconeProtocolError,
+)
+
+class OutboundUnavailable(Exception):
+    """A provider stayed rate limited or unreachable for the whole deadline of a call.
+
+    The API answers these with a 503 and a Retry-After, instead of a 500.
+    """
+
+    def __init__(self, provider: str, reason: str, retry_after: float):
+        super().__init__(f"{provider} is unavailable: {reason}")
+        self.provider    = provider
+        self.retry_after = retry_after
+
+def error_status(error: Exception):
+    """HTTP status of a failed call, from the Groq or Pinecone exception, if it got a response."""
+    if isinstance(error, groq.APIStatusError):
+        return error.status_code
+    if isinstance(error, PineconeApiException):
+        return error.status
+    return None
+
+def is_transient(error: Exception) -> bool:
+    status = error_status(error)
+    if status is not None:
+        return status in RETRY_STATUSES
+    return isinstance(error, TRANSIENT_ERRORS)
+
+def describe(error: Exception) -> str:
+    return str(error) or type(error).__name__
+
+def retry_after(error: Exception):
+    """Seconds the provider asked us to wait before retrying, if it said."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Lets calls through at rate_limit per minute on average, in bursts of up to 10 seconds' worth.
+
+    Callers reserve a token and then wait for it outside the lock, so waiting
+    calls go out in the order they arrived instead of all retrying at once.
+    """
+
+    def __init__(self, rate_limit: float):
+        self.rate     = rate_limit / 60
+        self.capacity = max(1.0, self.rate * 10)
+        self.tokens   = self.capacity
+        self.updated  = time.monotonic()
+        self.lock     = threading.Lock()
+
+    def refill(self) -> float:
+        """Add the tokens earned since the last call and return how long until one is free. Call with the lock held."""
+        now          = time.monotonic()
+        self.tokens  = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def next_free(self) -> float:
+        """Seconds until a token is free, without taking it."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            return self.refill()
+
+    def reserve(self, max_wait: float):
+        """Take a token and return how long to wait for it, or None if that's longer than max_wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            wait = self.refill()
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+class Provider:
+    """Rate limit, concurrency limit, timeouts and retry policy shared by every call to one service."""
+
+    def __init__(self, name: str, rate_limit: float, concurrency: int, timeout: float, deadline: float):
+        self.name        = name
+        self.concurrency = concurrency
+        self.timeout     = timeout
+        self.deadline    = deadline
+        self.bucket      = TokenBucket(rate_limit)
+        # Calls share one semaphore per event loop
+        self._loop        = None
+        self._slots       = None
+        self.counts       = {"calls": 0, "retries": 0, "rate_limited": 0, "timeouts": 0, "failures": 0, "unavailable": 0}
+        self.waited       = 0.0   # seconds spent waiting for the rate limit
+
+    @classmethod
+    def from_env(cls, name: str, defaults: dict):
+        settings = {key: float(os.getenv(f"{name.upper()}_{key.upper()}", value)) for key, value in defaults.items()}
+        settings["concurrency"] = int(settings["concurrency"])
+        return cls(name, **settings)
+
+    def async_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._slots = loop, asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def remaining(self, deadline: float) -> float:
+        return deadline - time.monotonic()
+
+    def out_of_time(self) -> OutboundUnavailable:
+        """The error for a call that has used up its deadline, retried once the next rate limit turn is free."""
+        self.counts["unavailable"] += 1
+        return OutboundUnavailable(self.name, f"call took longer than its {self.deadline:.0f}s deadline", max(1.0, self.bucket.next_free()))
+
+    def reserve_turn(self, deadline: float) -> float:
+        """Reserve a rate limit token and return the wait, or give up if it would pass the deadline."""
+        remaining = self.remaining(deadline)
+        if remaining <= 0:
+            raise self.out_of_time()
+        wait = self.bucket.reserve(remaining)
+        if wait is None:
+            self.counts["unavailable"] += 1
+            wait = self.bucket.next_free()
+            raise OutboundUnavailable(self.name, f"too many calls queued for the rate limit (next turn in {wait:.0f}s, {remaining:.0f}s left)", wait)
+        self.waited += wait
+        return wait
+
+    def backoff(self, attempt: int, error: Exception, deadline: float) -> float:
+        """Record a failed attempt and return how long to wait before retrying, or re-raise if it can't be retried."""
+        if isinstance(error, OutboundUnavailable):
+            raise error
+
+        status = error_status(error)
+        if status == 429:
+            self.counts["rate_limited"] += 1
+        if isinstance(error, TimeoutError):
+            self.counts["timeouts"] += 1
+
+        if not is_transient(error):
+            self.counts["failures"] += 1
+            raise error
+        if attempt >= OUTBOUND_RETRIES:
+            self.counts["unavailable"] += 1
+            raise OutboundUnavailable(self.name, f"still failing after {attempt + 1} attempts ({describe(error)})", OUTBOUND_MAX_BACKOFF) from error
+
+        delay = random.uniform(0, min(OUTBOUND_MAX_BACKOFF, OUTBOUND_BACKOFF * 2 ** attempt))
+        delay = max(delay, retry_after(error) or 0)
+        if delay >= self.remaining(deadline):
+            self.counts["unavailable"] += 1
+            raise OutboundUnavailable(self.name, f"no time left to retry ({describe(error)})", delay) from error
+
+        self.counts["retries"] += 1
+        print(f"{self.name} call failed ({describe(error)}), retrying in {delay:.1f}s")
+        return delay
+
+    def attempt_timeout(self, deadline: float) -> float:
+        remaining = self.remaining(deadline)
+        if remaining <= 0:
+            raise self.out_of_time()
+        return min(self.timeout, remaining)
+
+    def stats(self) -> dict:
+        return {**self.counts, "rate_limit_wait_seconds": round(self.waited, 2)}
+
+providers = {name: Provider.from_env(name, defaults) for name, defaults in PROVIDER_DEFAULTS.items()}
+
+async def await_turn(p: Provider, slots: asyncio.Semaphore, deadline: float):
+    """Wait for a rate limit token, then for a free connection slot."""
+    await asyncio.sleep(p.reserve_turn(deadline))
+    timeout = p.attempt_timeout(deadline)
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout)
+    except TimeoutError:
+        p.counts["unavailable"] += 1
+        raise OutboundUnavailable(p.name, f"all {p.concurrency} connections stayed busy", p.timeout)
+
+async def acall(provider: str, fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) within a provider's rate and concurrency limits, retrying transient failures.
+
+    fn must return a new awaitable each time, since failed attempts call it again.
+    """
+    p        = providers[provider]
+    deadline = time.monotonic() + p.deadline
+    slots    = p.async_slots()
+    for attempt in range(OUTBOUND_RETRIES + 1):
+        await await_turn(p, slots, deadline)
+        try:
+            p.counts["calls"] += 1
+            timeout = p.attempt_timeout(deadline)
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout)
+        except Exception as e:
+            delay = p.backoff(attempt, e, deadline)
+        finally:
+            slots.release()
+        await asyncio.sleep(delay)
+
+async def astream(provider: str, fn, *args, **kwargs):
+    """Yield from the async iterator fn(*args, **kwargs) within a provider's limits.
+
+    The stream holds a connection slot until it ends. Failures before the
+    first item are retried like acall; after that they are raised, since the
+    caller has already used part of the output. Each item must arrive within
+    the provider's timeout.
+    """
+    p        = providers[provider]
+    deadline = time.monotonic() + p.deadline
+    slots    = p.async_slots()
+    for attempt in range(OUTBOUND_RETRIES + 1):
+        await await_turn(p, slots, deadline)
+        started = False
+        try:
+            p.counts["calls"] += 1
+            items = aiter(fn(*args, **kwargs))
+            while True:
+                timeout = p.timeout if started else p.attempt_timeout(deadline)
+                try:
+                    item = await asyncio.wait_for(anext(items), timeout)
+                except StopAsyncIteration:
+                    return
+                started = True
+                yield item
+        except Exception as e:
+            if started:
+                p.counts["failures"] += 1
+                raise
+            delay = p.backoff(attempt, e, deadline)
+        finally:
+            slots.release()
+        await asyncio.sleep(delay)
+
+def outbound_stats() -> dict:
+    """Calls, retries, 429s, timeouts and give-ups per provider since the process started."""
+    return {name: p.stats() for name, p in providers.items()}
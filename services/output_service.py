@@ -0,0 +1,177 @@
+import re
+import json
+import threading
+from typing import Literal
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+# Groq JSON mode: the model is constrained to emit a single valid JSON object
+JSON_MODE = {"type": "json_object"}
+
+# ----------------------------------------------------------------
+# Schemas the LLM output is validated against
+# ----------------------------------------------------------------
+
+class SuggestionItem(BaseModel):
+    type:        Literal["diagnosis", "test", "drug", "red_flag"]
+    content:     str = Field(min_length=1)
+    confidence:  Literal["high", "medium", "low"] = "medium"
+    source_docs: list[str] = []
+
+    @field_validator("type", "confidence", mode="before")
+    @classmethod
+    def normalize_label(cls, value):
+        # "Red flag" and "HIGH" are close enough to the allowed values
+        if isinstance(value, str):
+            return value.strip().lower().replace(" ", "_").replace("-", "_")
+        return value
+
+    @field_validator("source_docs", mode="before")
+    @classmethod
+    def split_source_docs(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return re.findall(r"[\w-]+", value)
+        return [str(v) for v in value] if isinstance(value, list) else value
+
+class DischargeContent(BaseModel):
+    possible_cause:        str = Field(min_length=1)
+    prescribed_drugs:      list[str] = []
+    followup_tests:        list[str] = []
+    followup_instructions: list[str] = []
+
+# Returned when the model output can't be used even after a repair attempt
+FALLBACK_SUGGESTION = {
+    "type":        "red_flag",
+    "content":     "Could not parse AI suggestions. Please review the transcript manually.",
+    "confidence":  "low",
+    "source_docs": "N/A",
+}
+
+FALLBACK_DISCHARGE = {
+    "possible_cause":        "Could not generate cause analysis. Please review manually.",
+    "prescribed_drugs":      [],
+    "followup_tests":        [],
+    "followup_instructions": [],
+}
+
+# ----------------------------------------------------------------
+# Validation
+# ----------------------------------------------------------------
+
+def error_summary(error: Exception) -> str:
+    """Short description of why an output failed, for the repair prompt."""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(p) for p in e['loc']) or 'value'}: {e['msg']}" for e in error.errors()
+        )
+    return str(error)
+
+def validate_suggestion(item) -> tuple:
+    """Validate one suggestion, returning (suggestion dict, None) or (None, error)."""
+    try:
+        return SuggestionItem.model_validate(item).model_dump(), None
+    except ValidationError as e:
+        return None, error_summary(e)
+
+def validate_suggestions(raw: str) -> tuple:
+    """Validate a suggestions response, item by item.
+
+    Returns the valid suggestions and a list of (output, error) pairs for the
+    parts that failed. A response that is not JSON at all fails as a whole.
+    """
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError as e:
+        return [], [(raw, f"invalid JSON: {e}")]
+
+    items = data.get("suggestions") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return [], [(raw, 'expected an object with a "suggestions" array')]
+
+    valid, invalid = [], []
+    for item in items:
+        suggestion, error = validate_suggestion(item)
+        if error:
+            invalid.append((item, error))
+        else:
+            valid.append(suggestion)
+    return valid, invalid
+
+def validate_discharge(raw: str) -> tuple:
+    """Validate a discharge response, returning (content dict, None) or (None, error)."""
+    try:
+        return DischargeContent.model_validate_json(raw).model_dump(), None
+    except ValidationError as e:
+        return None, error_summary(e)
+
+# ----------------------------------------------------------------
+# Repair prompts — only the failed parts are sent back, with the errors
+# ----------------------------------------------------------------
+
+def format_failed_output(output) -> str:
+    return output if isinstance(output, str) else json.dumps(output)
+
+def build_suggestions_repair_prompt(invalid: list) -> str:
+    failures = "\n\n".join(
+        f"Output: {format_failed_output(output)}\nProblem: {error}" for output, error in invalid
+    )
+    return f"""
+The following clinical suggestions failed validation. Fix each one so it is valid.
+
+Return a JSON object of the form {{"suggestions": [...]}}. Each suggestion must have:
+- type: one of "diagnosis", "test", "drug", "red_flag"
+- content: the suggestion text
+- confidence: one of "high", "medium", "low"
+- source_docs: an array of passage ID strings
+
+Keep the clinical meaning of each suggestion. Drop any that cannot be fixed.
+
+{failures}
+"""
+
+def build_discharge_repair_prompt(output: str, error: str) -> str:
+    return f"""
+The following discharge summary failed validation. Fix it so it is valid.
+
+Return a JSON object with exactly these fields:
+- "possible_cause": a string
+- "prescribed_drugs": an array of strings
+- "followup_tests": an array of strings
+- "followup_instructions": an array of strings
+
+Output: {output}
+Problem: {error}
+"""
+
+# ----------------------------------------------------------------
+# Failure metrics
+# ----------------------------------------------------------------
+
+class OutputStats:
+    """Counters for structured output validation, per kind of generation."""
+
+    COUNTERS = ("generations", "invalid_outputs", "invalid_items", "repairs", "repaired_items", "fallbacks")
+
+    def __init__(self):
+        self._counts = {}
+        self._lock   = threading.Lock()
+
+    def record(self, kind: str, counter: str, count: int = 1):
+        with self._lock:
+            counts = self._counts.setdefault(kind, dict.fromkeys(self.COUNTERS, 0))
+            counts[counter] += count
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for kind, counts in self._counts.items():
+                generations  = counts["generations"] or 1
+                result[kind] = dict(
+                    counts,
+                    repair_rate   = round(counts["repairs"] / generations, 4),
+                    fallback_rate = round(counts["fallbacks"] / generations, 4),
+                )
+            return result
+
+output_stats = OutputStats()
@@ -0,0 +1,199 @@
+import os
+import asyncio
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable, Table, TableStyle, ListFlowable, ListItem
+
+# Processes that render PDF exports. ReportLab layout is CPU-bound Python, so
+# rendering in separate processes keeps it from competing with API requests
+# for the GIL. Set to 0 to render in the threadpool instead.
+RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Where rendered PDFs are written before they are streamed to the client
+SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or tempfile.gettempdir()
+
+DATE_FORMAT  = "%B %d, %Y at %I:%M %p"
+MARGIN       = 2*cm
+RULE_COLOR   = colors.HexColor("#e2e8f0")
+BULLET_COLOR = colors.HexColor("#3b82f6")
+
+# ----------------------------------------------------------------
+# Styles shared by every report, built once per process
+# ----------------------------------------------------------------
+
+def build_styles() -> dict:
+    sample = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            "Title",
+            parent=sample["Heading1"],
+            fontSize=20,
+            textColor=colors.HexColor("#0f172a"),
+            alignment=TA_CENTER,
+            spaceAfter=6,
+        ),
+        "title_large": ParagraphStyle(
+            "TitleLarge",
+            parent=sample["Heading1"],
+            fontSize=22,
+            textColor=colors.HexColor("#0f172a"),
+            alignment=TA_CENTER,
+            spaceAfter=4,
+        ),
+        "subtitle": ParagraphStyle(
+            "Subtitle",
+            parent=sample["Normal"],
+            fontSize=10,
+            textColor=colors.HexColor("#64748b"),
+            alignment=TA_CENTER,
+            spaceAfter=20,
+        ),
+        "section": ParagraphStyle(
+            "Section",
+            parent=sample["Heading2"],
+            fontSize=13,
+            textColor=colors.HexColor("#1e293b"),
+            spaceBefore=16,
+            spaceAfter=8,
+        ),
+        "body": ParagraphStyle(
+            "Body",
+            parent=sample["Normal"],
+            fontSize=10,
+            textColor=colors.HexColor("#334155"),
+            leading=16,
+        ),
+        "label": ParagraphStyle(
+            "Label",
+            parent=sample["Normal"],
+            fontSize=9,
+            textColor=colors.HexColor("#94a3b8"),
+            spaceAfter=2,
+        ),
+        "footer": ParagraphStyle(
+            "Footer",
+            parent=sample["Normal"],
+            fontSize=8,
+            textColor=colors.HexColor("#94a3b8"),
+            alignment=TA_CENTER,
+        ),
+    }
+
+STYLES = build_styles()
+
+INFO_TABLE_STYLE = TableStyle([
+    ("FONTSIZE",      (0, 0), (-1, -1), 10),
+    ("TEXTCOLOR",     (0, 0), (0, -1), colors.HexColor("#64748b")),
+    ("TEXTCOLOR",     (1, 0), (1, -1), colors.HexColor("#1e293b")),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+])
+
+# ----------------------------------------------------------------
+# Building blocks. Flowables hold layout state, so these return new
+# ones for every document.
+# ----------------------------------------------------------------
+
+def format_date(value) -> str:
+    return datetime.fromisoformat(str(value)).strftime(DATE_FORMAT)
+
+def rule() -> HRFlowable:
+    return HRFlowable(width="100%", thickness=1, color=RULE_COLOR)
+
+def header(title: str, subtitle: str, title_style: str = "title") -> list:
+    return [
+        Paragraph(title, STYLES[title_style]),
+        Paragraph(subtitle, STYLES["subtitle"]),
+        rule(),
+        Spacer(1, 12),
+    ]
+
+def section(title: str) -> Paragraph:
+    return Paragraph(title, STYLES["section"])
+
+def info_table(rows: list, col_widths: list) -> Table:
+    table = Table(rows, colWidths=col_widths)
+    table.setStyle(INFO_TABLE_STYLE)
+    return table
+
+def bullet_list(items: list, empty_text: str) -> list:
+    if not items:
+        return [Paragraph(empty_text, STYLES["body"])]
+    bullets = [ListItem(Paragraph(item, STYLES["body"]), bulletColor=BULLET_COLOR) for item in items]
+    return [ListFlowable(bullets, bulletType="bullet")]
+
+def footer(text: str, space_before: int) -> list:
+    return [
+        Spacer(1, space_before),
+        rule(),
+        Spacer(1, 6),
+        Paragraph(text, STYLES["footer"]),
+    ]
+
+def build_pdf(content: list, output):
+    """Lay out the flowables on A4 pages and write the PDF to output, a path or binary file."""
+    doc = SimpleDocTemplate(
+        output,
+        pagesize=A4,
+        rightMargin=MARGIN,
+        leftMargin=MARGIN,
+        topMargin=MARGIN,
+        bottomMargin=MARGIN,
+    )
+    doc.build(content)
+
+# ----------------------------------------------------------------
+# Rendering off the request path
+# ----------------------------------------------------------------
+
+_pool = None
+
+def get_pool() -> ProcessPoolExecutor:
+    """Start the rendering processes on first use.
+
+    Workers are spawned rather than forked so they don't inherit the server's
+    event loop, threads or database connections.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def render_to_file(render, report: dict, path: str) -> int:
+    """Render a report straight to a file and return its size in bytes."""
+    render(report, path)
+    return os.path.getsize(path)
+
+async def arender(render, report: dict) -> str:
+    """Render a report in the process pool to a temporary file and return its path.
+
+    Only the path comes back from the rendering process, not a pickled copy of
+    the PDF, and the file can be streamed from disk. render is pickled along
+    with report, so pass a module-level function and plain data rather than ORM
+    objects. The caller deletes the file once it has been sent.
+    """
+    fd, path = tempfile.mkstemp(prefix="medassist-", suffix=".pdf", dir=SPOOL_DIR)
+    os.close(fd)
+    try:
+        if RENDER_WORKERS <= 0:
+            await run_in_threadpool(render_to_file, render, report, path)
+        else:
+            await asyncio.get_running_loop().run_in_executor(get_pool(), render_to_file, render, report, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def shutdown_pool():
+    """Stop the rendering processes, called when the app shuts down."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
@@ -1,46 +1,99 @@
 import os
+import re
 import json
-from pinecone import Pinecone
 from langchain_groq import ChatGroq
 from dotenv import load_dotenv
+from services.cache_service import create_cache, content_key
+from services.retrieval_service import create_retriever
+from services.context_service import build_prompt_context
+from services.extraction_service import build_term_extractor
+from services.chunk_service import aget_drug_names
+from services.outbound_service import providers, acall, astream
+from services.output_service import (
+    JSON_MODE, FALLBACK_SUGGESTION, FALLBACK_DISCHARGE, output_stats,
+    validate_suggestion, validate_suggestions, validate_discharge,
+    build_suggestions_repair_prompt, build_discharge_repair_prompt,
+)
 
 load_dotenv()
 
-# Initialize Pinecone client
-pc         = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX")
-index      = pc.Index(index_name)
+# Knowledge base search backend (Pinecone or the local index), chosen by RETRIEVER
+retriever = create_retriever()
+
+# Chunks retrieved per query. Hybrid search ranks exact matches higher, so
+# a smaller value keeps recall while sending the LLM a shorter prompt.
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "5"))
+
+# Models per pipeline stage. Symptom extraction only returns a list of terms,
+# so it runs on a small, fast model (or the dictionary extractor) and only
+# generation pays for the large one.
+LLM_MODEL         = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
+EXTRACTION_MODEL  = os.getenv("EXTRACTION_MODEL", "llama-3.1-8b-instant")
+SYMPTOM_EXTRACTOR = os.getenv("SYMPTOM_EXTRACTOR", "llm")   # llm | dictionary
 
-# Load the Groq LLM
+# Load the Groq LLMs. Retries and timeouts are handled by the outbound call
+# layer, so the clients don't retry on their own.
 llm = ChatGroq(
     api_key=os.getenv("GROQ_API_KEY"),
-    model_name="llama-3.3-70b-versatile",
+    model_name=LLM_MODEL,
+    max_retries=0,
+    timeout=providers["groq"].timeout,
 )
 
-def embed_query(text: str) -> list:
-    """Embed a query using Pinecone's inference API."""
-    response = pc.inference.embed(
-        model="multilingual-e5-large",
-        inputs=[text],
-        parameters={"input_type": "query"}
-    )
-    return response[0].values
-
-def retrieve_relevant_chunks(query: str, k: int = 5) -> list:
-    """Search Pinecone for the most relevant knowledge base chunks."""
-    query_embedding = embed_query(query)
-    results = index.query(
-        vector=query_embedding,
-        top_k=k,
-        include_metadata=True
-    )
-    # Extract the text from the metadata of each match
-    chunks = [match.metadata.get("text", "") for match in results.matches]
-    return chunks
+extraction_llm = ChatGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    model_name=EXTRACTION_MODEL,
+    max_retries=0,
+    timeout=providers["groq"].timeout,
+)
+
+# Built on first use from the drug names in the chunk store
+term_extractor = None
+
+# Cache for extracted symptoms, query embeddings and retrieved chunks, keyed by
+# a hash of the text they were computed from. Suggestions and discharge run on
+# the same transcript, so the second request skips extraction and retrieval.
+cache = create_cache()
+
+def symptoms_cache_key(transcript: str) -> str:
+    return content_key(f"symptoms:{SYMPTOM_EXTRACTOR}:{EXTRACTION_MODEL}", transcript)
+
+def embedding_cache_key(text: str) -> str:
+    return content_key(f"embed:{retriever.embed_model}", text)
+
+def matches_cache_key(query: str, k: int) -> str:
+    return content_key(f"matches:{retriever.name}:{k}", query)
+
+def chunk_cache_key(chunk_id: str) -> str:
+    return content_key(f"chunk:{retriever.name}", chunk_id)
+
+def remember_chunks(matches: list):
+    """Cache each retrieved chunk's text by ID so stored chunk IDs can be resolved later."""
+    for match in matches:
+        cache.set(chunk_cache_key(match["id"]), match["text"])
+
+def remember_chunk_texts(texts: dict):
+    """Cache chunk texts fetched by ID."""
+    for chunk_id, text in texts.items():
+        cache.set(chunk_cache_key(chunk_id), text)
+
+def build_context(symptoms: str, matches: list) -> dict:
+    return {
+        "symptoms":  symptoms,
+        "chunk_ids": [m["id"] for m in matches],
+        "chunks":    [m["text"] for m in matches],
+    }
+
+async def close_retriever():
+    """Close the retriever's network clients, called when the app shuts down."""
+    await retriever.aclose()
+
+# ----------------------------------------------------------------
+# Prompts and parsing shared by the suggestions and discharge pipelines
+# ----------------------------------------------------------------
 
-def extract_symptoms(transcript: str) -> str:
-    """Use the LLM to extract key symptoms and medical terms from the transcript."""
-    prompt = f"""
+def build_symptoms_prompt(transcript: str) -> str:
+    return f"""
 You are a medical assistant. Extract all symptoms, medical conditions, and key clinical
 terms from the following doctor-patient conversation transcript.
 Return only a comma-separated list of terms, nothing else.
@@ -48,71 +101,34 @@ Return only a comma-separated list of terms, nothing else.
 Transcript:
 {transcript}
 """
-    response = llm.invoke(prompt)
-    return response.content.strip()
 
-def generate_suggestions(transcript: str, chunks: list) -> list:
-    """Use the LLM to generate structured suggestions based on the transcript and retrieved chunks."""
-
-    context = "\n\n".join(chunks)
-
-    prompt = f"""
+def build_suggestions_prompt(transcript: str, chunks: list, chunk_ids: list) -> str:
+    # Each passage is labelled with its chunk ID so suggestions can cite it
+    context = "\n\n".join(f"[{chunk_id}]\n{text}" for chunk_id, text in zip(chunk_ids, chunks))
+    return f"""
 You are a clinical decision support assistant helping a doctor during a consultation.
 Based on the patient transcript and the medical knowledge provided, generate structured suggestions.
 
-Return ONLY a valid JSON array with no extra text, no markdown, no explanation.
-Each item in the array must have these exact fields:
+Return a JSON object of the form {{"suggestions": [...]}}.
+Each item in the suggestions array must have these exact fields:
 - type: one of "diagnosis", "test", "drug", "red_flag"
 - content: the suggestion text
 - confidence: one of "high", "medium", "low"
-- source_docs: a short description of the source used
+- source_docs: an array of the IDs (shown in square brackets above each passage) of the medical knowledge passages the suggestion is based on
 
 Medical Knowledge:
 {context}
 
 Patient Transcript:
 {transcript}
-
-JSON array:
 """
-    response = llm.invoke(prompt)
-    raw      = response.content.strip()
-
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    raw = raw.strip()
-
-    try:
-        suggestions = json.loads(raw)
-    except json.JSONDecodeError:
-        try:
-            start       = raw.index("[")
-            end         = raw.rindex("]") + 1
-            suggestions = json.loads(raw[start:end])
-        except (ValueError, json.JSONDecodeError):
-            suggestions = [{
-                "type":        "red_flag",
-                "content":     "Could not parse AI suggestions. Please review the transcript manually.",
-                "confidence":  "low",
-                "source_docs": "N/A"
-            }]
-
-    return suggestions
-
-def generate_discharge_content(transcript: str, chunks: list) -> dict:
-    """Generate discharge summary content based on the transcript and retrieved chunks."""
 
+def build_discharge_prompt(transcript: str, chunks: list) -> str:
     context = "\n\n".join(chunks)
-
-    prompt = f"""You are a clinical decision support assistant helping a doctor write a discharge summary.
+    return f"""You are a clinical decision support assistant helping a doctor write a discharge summary.
 Based on the patient transcript and the medical knowledge provided, generate a structured discharge summary.
 
-You MUST return ONLY a raw JSON object. No markdown, no code blocks, no backticks, no explanation, no preamble.
-Start your response with {{ and end with }}.
-
-The JSON object must have exactly these fields:
+Return a JSON object with exactly these fields:
 - "possible_cause": a string paragraph explaining the most likely underlying cause
 - "prescribed_drugs": an array of strings, each being a drug name with dosage and frequency
 - "followup_tests": an array of strings, each being a recommended test
@@ -124,56 +140,325 @@ Medical Knowledge:
 Patient Transcript:
 {transcript}
 """
-    response = llm.invoke(prompt)
-    raw      = response.content.strip()
-
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-    raw = raw.strip()
-
-    try:
-        content = json.loads(raw)
-    except json.JSONDecodeError:
-        try:
-            start   = raw.index("{")
-            end     = raw.rindex("}") + 1
-            content = json.loads(raw[start:end])
-        except (ValueError, json.JSONDecodeError):
-            content = {
-                "possible_cause":        "Could not generate cause analysis. Please review manually.",
-                "prescribed_drugs":      [],
-                "followup_tests":        [],
-                "followup_instructions": []
-            }
 
+def cite_sources(suggestion: dict, chunk_ids: list) -> dict:
+    """Keep only the cited chunk IDs that were actually given to the LLM, stored comma-separated."""
+    cited = suggestion.get("source_docs")
+    if isinstance(cited, str):
+        cited = re.findall(r"[\w-]+", cited)
+    elif not isinstance(cited, list):
+        cited = []
+    known = set(chunk_ids)
+    valid = [c for c in dict.fromkeys(str(c).strip("[] ") for c in cited) if c in known]
+    return dict(suggestion, source_docs=", ".join(valid))
+
+def default_chunk_ids(chunks: list) -> list:
+    return [str(i) for i in range(1, len(chunks) + 1)]
+
+class JsonArrayStreamParser:
+    """Incrementally parse a streamed JSON array, yielding each object as soon as it closes.
+
+    The array is either the whole response or the "suggestions" value of a
+    wrapping object, as validate_suggestions expects; anything else before it
+    is skipped. Brackets inside strings, before or inside the array, don't
+    count towards the nesting depth. Items that close but aren't valid JSON
+    are kept in malformed so they can be repaired.
+    """
+
+    def __init__(self):
+        self.buffer    = ""
+        self.position  = 0      # next character of the buffer to scan
+        self.depth     = 0      # 1 inside the array, 2+ inside an item
+        self.in_string = False
+        self.escaped   = False
+        self.start     = None   # buffer offset where the current item began
+        self.outer     = 0      # nesting depth before the array opens
+        self.key       = None   # last string read before the array opens
+        self.malformed = []
+
+    def feed(self, text: str) -> list:
+        """Add more streamed text and return any items completed by it."""
+        if self.depth < 0:
+            return []
+
+        self.buffer += text
+        items = []
+
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                if self.depth == 0 and self.in_string:
+                    self.key += char
+            elif self.depth == 0:
+                if char == '"':
+                    self.in_string = True
+                    self.key       = ""
+                elif char == "[" and (self.outer == 0 or (self.outer == 1 and self.key == "suggestions")):
+                    self.depth = 1
+                elif char in "{[":
+                    self.outer += 1
+                elif char in "}]":
+                    self.outer -= 1
+            elif char == '"':
+                self.in_string = True
+            elif char in "{[":
+                if self.depth == 1:
+                    self.start = self.position
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 1 and self.start is not None:
+                    text = self.buffer[self.start:self.position + 1]
+                    try:
+                        items.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        self.malformed.append(text)
+                    self.start = None
+                elif self.depth == 0:
+                    # End of the array, ignore anything after it
+                    self.position = len(self.buffer)
+                    self.depth    = -1
+                    break
+
+            self.position += 1
+
+        # Drop text that can no longer be part of an item
+        if self.start is None and self.position > 0:
+            self.buffer   = self.buffer[self.position:]
+            self.position = 0
+        elif self.start:
+            self.buffer   = self.buffer[self.start:]
+            self.position -= self.start
+            self.start    = 0
+
+        return items
+
+def record_suggestion_failures(invalid: list):
+    output_stats.record("suggestions", "generations")
+    if invalid:
+        output_stats.record("suggestions", "invalid_outputs")
+        output_stats.record("suggestions", "invalid_items", len(invalid))
+
+def finish_suggestions(suggestions: list, invalid: list, chunk_ids: list) -> list:
+    """Attach validated citations, falling back to a single error suggestion if nothing usable came back."""
+    if not suggestions and invalid:
+        output_stats.record("suggestions", "fallbacks")
+        suggestions = [FALLBACK_SUGGESTION]
+    return [cite_sources(s, chunk_ids) for s in suggestions]
+
+def finish_discharge(content: dict) -> dict:
+    if content is None:
+        output_stats.record("discharge", "fallbacks")
+        return dict(FALLBACK_DISCHARGE)
     return content
 
-def run_rag_pipeline(transcript: str) -> list:
-    """Run the full RAG pipeline — extract symptoms, retrieve chunks, generate suggestions."""
+# ----------------------------------------------------------------
+# Pipeline — every network call is awaited so the event loop can serve
+# other consultations while waiting
+# ----------------------------------------------------------------
+
+async def aembed_query(text: str) -> list:
+    """Embed a query with the retriever's embedding model."""
+    key    = embedding_cache_key(text)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    embedding = await retriever.aembed_query(text)
+    cache.set(key, embedding)
+    return embedding
+
+async def aretrieve_relevant_matches(query: str, k: int = RETRIEVAL_K) -> list:
+    """Search the knowledge base for the most relevant chunks, returning their IDs and texts."""
+    key    = matches_cache_key(query, k)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    query_embedding = await aembed_query(query)
+    matches         = await retriever.aquery(query, query_embedding, k)
+    remember_chunks(matches)
+    cache.set(key, matches)
+    return matches
+
+async def afetch_chunk_texts(chunk_ids: list) -> dict:
+    """Load chunk texts by ID, from the cache where possible and from the retriever otherwise."""
+    texts   = {chunk_id: cache.get(chunk_cache_key(chunk_id)) for chunk_id in chunk_ids}
+    missing = [chunk_id for chunk_id, text in texts.items() if text is None]
+    if missing:
+        fetched = await retriever.afetch(missing)
+        remember_chunk_texts(fetched)
+        texts.update(fetched)
+    return {chunk_id: text for chunk_id, text in texts.items() if text}
+
+async def aextract_symptoms(transcript: str) -> str:
+    """Extract key symptoms and medical terms from the transcript.
+
+    With SYMPTOM_EXTRACTOR=dictionary the terms are matched locally, and the
+    extraction model is only called when none are found.
+    """
+    global term_extractor
+    key    = symptoms_cache_key(transcript)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    symptoms = ""
+    if SYMPTOM_EXTRACTOR == "dictionary":
+        if term_extractor is None:
+            term_extractor = build_term_extractor(await aget_drug_names())
+        symptoms = ", ".join(term_extractor.extract(transcript))
+    if not symptoms:
+        response = await acall("groq", extraction_llm.ainvoke, build_symptoms_prompt(transcript))
+        symptoms = response.content.strip()
+    cache.set(key, symptoms)
+    return symptoms
+
+async def agenerate_suggestions(transcript: str, chunks: list, chunk_ids: list = None, symptoms: str = "") -> list:
+    """Use the LLM to generate structured suggestions based on the transcript and retrieved chunks.
+
+    The transcript and chunks are fitted to the prompt token budgets first,
+    using the extracted symptoms to decide what to keep of a long transcript.
+    Each suggestion's source_docs holds the IDs of the chunks it cites.
+
+    The model runs in JSON mode and every suggestion is validated against
+    SuggestionItem; the ones that fail get one targeted repair call.
+    """
+    prompt   = build_prompt_context(transcript, chunks, chunk_ids or default_chunk_ids(chunks), symptoms)
+    response = await acall(
+        "groq",
+        llm.ainvoke,
+        build_suggestions_prompt(prompt["transcript"], prompt["chunks"], prompt["chunk_ids"]),
+        response_format=JSON_MODE,
+    )
+    suggestions, invalid = validate_suggestions(response.content)
+    record_suggestion_failures(invalid)
+    if invalid:
+        suggestions += await arepair_suggestions(invalid)
+    return finish_suggestions(suggestions, invalid, prompt["chunk_ids"])
+
+async def arepair_suggestions(invalid: list) -> list:
+    """Ask the LLM to fix just the suggestions that failed validation."""
+    print(f"Repairing {len(invalid)} invalid suggestion outputs")
+    output_stats.record("suggestions", "repairs")
+    response    = await acall("groq", llm.ainvoke, build_suggestions_repair_prompt(invalid), response_format=JSON_MODE)
+    repaired, _ = validate_suggestions(response.content)
+    output_stats.record("suggestions", "repaired_items", len(repaired))
+    return repaired
+
+async def astream_suggestions(transcript: str, chunks: list, chunk_ids: list = None, symptoms: str = ""):
+    """Stream suggestions from the LLM, yielding each one as soon as its JSON object is complete.
+
+    Items that fail validation are held back and repaired together once the
+    stream ends.
+    """
+    prompt    = build_prompt_context(transcript, chunks, chunk_ids or default_chunk_ids(chunks), symptoms)
+    chunk_ids = prompt["chunk_ids"]
+    parser    = JsonArrayStreamParser()
+    raw       = ""
+    invalid   = []
+    emitted   = 0
+    async for token in astream(
+        "groq",
+        llm.astream,
+        build_suggestions_prompt(prompt["transcript"], prompt["chunks"], chunk_ids),
+        response_format=JSON_MODE,
+    ):
+        raw += token.content
+        for item in parser.feed(token.content):
+            suggestion, error = validate_suggestion(item)
+            if error:
+                invalid.append((item, error))
+                continue
+            emitted += 1
+            yield cite_sources(suggestion, chunk_ids)
+
+    invalid += [(text, "invalid JSON") for text in parser.malformed]
+    if not emitted and not invalid:
+        invalid.append((raw, 'expected an object with a "suggestions" array' if parser.depth == 0 else "no suggestions in the response"))
+    record_suggestion_failures(invalid)
+
+    repaired = await arepair_suggestions(invalid) if invalid else []
+    for suggestion in finish_suggestions(repaired, invalid if not emitted else [], chunk_ids):
+        yield suggestion
+
+async def agenerate_discharge_content(transcript: str, chunks: list, symptoms: str = "") -> dict:
+    """Generate discharge summary content based on the transcript and retrieved chunks.
+
+    Output that fails DischargeContent validation gets one repair call.
+    """
+    prompt   = build_prompt_context(transcript, chunks, default_chunk_ids(chunks), symptoms)
+    response = await acall("groq", llm.ainvoke, build_discharge_prompt(prompt["transcript"], prompt["chunks"]), response_format=JSON_MODE)
+    content, error = validate_discharge(response.content)
+    output_stats.record("discharge", "generations")
+    if error:
+        output_stats.record("discharge", "invalid_outputs")
+        content = await arepair_discharge(response.content, error)
+    return finish_discharge(content)
+
+async def arepair_discharge(output: str, error: str):
+    """Ask the LLM to fix a discharge summary that failed validation."""
+    print(f"Repairing invalid discharge content: {error}")
+    output_stats.record("discharge", "repairs")
+    response    = await acall("groq", llm.ainvoke, build_discharge_repair_prompt(output, error), response_format=JSON_MODE)
+    content, _  = validate_discharge(response.content)
+    if content is not None:
+        output_stats.record("discharge", "repaired_items")
+    return content
 
-    symptoms    = extract_symptoms(transcript)
+async def aretrieve_context(transcript: str, k: int = RETRIEVAL_K) -> dict:
+    """Extract symptoms from the transcript and retrieve the matching chunks.
+
+    This stage is shared by the suggestions and discharge pipelines.
+    """
+    symptoms = await aextract_symptoms(transcript)
     print(f"Extracted symptoms: {symptoms}")
 
-    chunks      = retrieve_relevant_chunks(symptoms, k=5)
-    print(f"Retrieved {len(chunks)} chunks from Pinecone")
+    matches  = await aretrieve_relevant_matches(symptoms, k=k)
+    print(f"Retrieved {len(matches)} chunks from {retriever.name}")
+
+    return build_context(symptoms, matches)
 
-    suggestions = generate_suggestions(transcript, chunks)
+async def arun_rag_pipeline(transcript: str, context: dict = None) -> list:
+    """Run the full RAG pipeline — extract symptoms, retrieve chunks, generate suggestions.
+
+    Pass a previously retrieved context to skip extraction and retrieval.
+    """
+    if context is None:
+        context = await aretrieve_context(transcript)
+
+    suggestions = await agenerate_suggestions(transcript, context["chunks"], context["chunk_ids"], context["symptoms"])
     print(f"Generated {len(suggestions)} suggestions")
 
     return suggestions
 
-def run_discharge_pipeline(transcript: str) -> dict:
-    """Run the RAG pipeline specifically for generating discharge content."""
+async def astream_rag_pipeline(transcript: str, context: dict = None):
+    """Streaming version of arun_rag_pipeline, yielding suggestions as they are generated."""
+    if context is None:
+        context = await aretrieve_context(transcript)
 
-    symptoms = extract_symptoms(transcript)
-    print(f"Extracted symptoms for discharge: {symptoms}")
+    count = 0
+    async for suggestion in astream_suggestions(transcript, context["chunks"], context["chunk_ids"], context["symptoms"]):
+        count += 1
+        yield suggestion
+    print(f"Streamed {count} suggestions")
 
-    chunks   = retrieve_relevant_chunks(symptoms, k=5)
-    print(f"Retrieved {len(chunks)} chunks for discharge")
+async def arun_discharge_pipeline(transcript: str, context: dict = None) -> dict:
+    """Run the RAG pipeline specifically for generating discharge content.
 
-    content  = generate_discharge_content(transcript, chunks)
+    Pass a previously retrieved context to skip extraction and retrieval.
+    """
+    if context is None:
+        context = await aretrieve_context(transcript)
+
+    content = await agenerate_discharge_content(transcript, context["chunks"], context["symptoms"])
     print("Discharge content generated")
 
-    return content
\ No newline at end of file
+    return content
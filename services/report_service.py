@@ -0,0 +1,38 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.queries import session_with_children
+from services.export_service import session_report_data, render_session_pdf
+from services.discharge_service import discharge_report_data, render_discharge_pdf
+from services.pdf_service import arender
+from services.export_cache_service import asave_export
+from services.analysis_service import aget_transcript_context
+from services.rag_service import arun_discharge_pipeline
+
+async def arender_session_export(session_id: int, etag: str, db: AsyncSession) -> str:
+    """Render the consultation report for a session, store it under etag and return the temp file path."""
+    result = await db.scalars(session_with_children(session_id))
+    s      = result.unique().first()
+
+    # Lay out the PDF in a rendering process so it doesn't hold up other requests
+    path = await arender(render_session_pdf, session_report_data(s, s.transcripts, s.suggestions))
+    await asave_export(session_id, "export", etag, path, db)
+    return path
+
+async def arender_discharge_export(session_id: int, etag: str, db: AsyncSession) -> str:
+    """Generate and render the discharge summary for a session, store it under etag and return the temp file path.
+
+    The session must have at least one transcript.
+    """
+    # Load the session and its transcripts in one query
+    result = await db.scalars(session_with_children(session_id, with_suggestions=False))
+    s      = result.unique().first()
+
+    # Transcripts are ordered by creation time, so the last one is the latest
+    transcript = s.transcripts[-1]
+
+    # Reuse the symptoms and chunks stored by the suggestions run, if any
+    context           = await aget_transcript_context(transcript, db)
+    discharge_content = await arun_discharge_pipeline(transcript.text, context)
+
+    path = await arender(render_discharge_pdf, discharge_report_data(s, discharge_content))
+    await asave_export(session_id, "discharge", etag, path, db)
+    return path
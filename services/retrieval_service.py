@@ -0,0 +1,348 @@
+import os
+import re
+import json
+import math
+import heapq
+import asyncio
+import numpy as np
+from collections import Counter, defaultdict
+from pinecone import PineconeAsyncio
+from dotenv import load_dotenv
+from services.chunk_service import aget_chunks
+from services.outbound_service import acall
+
+load_dotenv()
+
+# Which knowledge base search backend the RAG pipeline uses:
+# pinecone (hosted index) or local (in-process index built from the knowledge base)
+RETRIEVER = os.getenv("RETRIEVER", "pinecone")
+
+PINECONE_EMBED_MODEL = "multilingual-e5-large"
+
+# The local index is built by knowledge_base/build_local_index.py with the
+# same embedding model that embeds queries at runtime
+LOCAL_INDEX_PATH  = os.getenv("LOCAL_INDEX_PATH", os.path.join(os.path.dirname(__file__), "..", "knowledge_base", "local_index"))
+LOCAL_EMBED_MODEL = os.getenv("LOCAL_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Hybrid search adds BM25 keyword matching, which catches exact drug names and
+# doses that embeddings blur, and fuses both rankings. Each side contributes
+# HYBRID_CANDIDATES results; the reranker, if any, reorders the fused list.
+HYBRID_SEARCH      = os.getenv("HYBRID_SEARCH", "false").lower() in ("1", "true", "yes")
+HYBRID_CANDIDATES  = int(os.getenv("HYBRID_CANDIDATES", "20"))
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH")
+RERANKER           = os.getenv("RERANKER", "none")
+RERANK_MODEL       = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+
+KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), "..", "knowledge_base")
+
+# ----------------------------------------------------------------
+# Pinecone
+# ----------------------------------------------------------------
+
+def chunk_matches(ids: list, chunks: dict) -> list:
+    """Attach chunk texts to IDs in ranked order, dropping IDs missing from the chunk store."""
+    missing = [chunk_id for chunk_id in ids if chunk_id not in chunks]
+    if missing:
+        print(f"{len(missing)} retrieved chunks are not in the chunk store; re-run ingestion")
+    return [{"id": chunk_id, "text": chunks[chunk_id]["text"]} for chunk_id in ids if chunk_id in chunks]
+
+class PineconeRetriever:
+    """Embeds queries with Pinecone inference and searches the hosted Pinecone index.
+
+    The index only holds vectors and IDs; chunk text comes from the chunk
+    store, so query responses stay small.
+    """
+
+    def __init__(self):
+        self.index_name  = os.getenv("PINECONE_INDEX")
+        self.name        = f"pinecone:{self.index_name}"
+        self.embed_model = PINECONE_EMBED_MODEL
+        # Written by knowledge_base/ingest.py with the same chunk IDs
+        self.keyword_index_path = os.path.join(KNOWLEDGE_BASE_PATH, "keyword_index.json")
+        # Async clients are created lazily so the underlying HTTP session
+        # binds to the running event loop
+        self.async_pc    = None
+        self.async_index = None
+
+    async def get_async_clients(self):
+        """Return the async Pinecone client and index, creating them on first use."""
+        if self.async_index is None:
+            self.async_pc    = PineconeAsyncio(api_key=os.getenv("PINECONE_API_KEY"))
+            description      = await acall("pinecone", self.async_pc.describe_index, self.index_name)
+            self.async_index = self.async_pc.IndexAsyncio(host=description.host)
+        return self.async_pc, self.async_index
+
+    async def aembed_query(self, text: str) -> list:
+        client, _ = await self.get_async_clients()
+        response  = await acall(
+            "pinecone",
+            client.inference.embed,
+            model=self.embed_model,
+            inputs=[text],
+            parameters={"input_type": "query"}
+        )
+        return list(response[0].values)
+
+    async def aquery(self, text: str, embedding: list, k: int) -> list:
+        _, async_index = await self.get_async_clients()
+        results = await acall("pinecone", async_index.query, vector=embedding, top_k=k, include_metadata=False)
+        ids     = [match.id for match in results.matches]
+        return chunk_matches(ids, await aget_chunks(ids))
+
+    async def afetch(self, chunk_ids: list) -> dict:
+        return {chunk_id: chunk["text"] for chunk_id, chunk in (await aget_chunks(chunk_ids)).items()}
+
+    async def aclose(self):
+        if self.async_index is not None:
+            await self.async_index.close()
+        if self.async_pc is not None:
+            await self.async_pc.close()
+        self.async_pc, self.async_index = None, None
+
+# ----------------------------------------------------------------
+# Local
+# ----------------------------------------------------------------
+
+def load_embedding_model(model_name: str = LOCAL_EMBED_MODEL):
+    """Load the local ONNX embedding model, downloading it on first use."""
+    try:
+        from fastembed import TextEmbedding
+    except ImportError:
+        raise RuntimeError("The local retriever needs fastembed: pip install 'medicalassistant[local]'")
+    return TextEmbedding(model_name)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+class LocalRetriever:
+    """Searches a local index: unit-length chunk embeddings in a memory-mapped
+    NumPy matrix, scored by dot product (cosine similarity) against a query
+    embedded in-process. No network calls once the model is downloaded.
+    """
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH, model_name: str = LOCAL_EMBED_MODEL):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise RuntimeError(f"No local index at {path}; build it with python -m knowledge_base.build_local_index")
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["model"] != model_name:
+            raise RuntimeError(f"Local index was built with {meta['model']}, but LOCAL_EMBED_MODEL is {model_name}")
+
+        self.embed_model = model_name
+        self.name        = f"local:{os.path.basename(os.path.normpath(path))}"
+        self.keyword_index_path = os.path.join(path, "keyword_index.json")
+        self.embeddings  = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self.ids         = []
+        self.texts       = []
+        with open(os.path.join(path, "chunks.jsonl")) as f:
+            for line in f:
+                chunk = json.loads(line)
+                self.ids.append(chunk["id"])
+                self.texts.append(chunk["text"])
+        self.positions   = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+        self.model       = load_embedding_model(model_name)
+        print(f"Loaded local index with {len(self.ids)} chunks from {path}")
+
+    def embed_query(self, text: str) -> list:
+        vector = np.asarray(next(iter(self.model.query_embed([text]))), dtype=np.float32)
+        return (vector / max(np.linalg.norm(vector), 1e-12)).tolist()
+
+    def query(self, text: str, embedding: list, k: int) -> list:
+        scores = self.embeddings @ np.asarray(embedding, dtype=np.float32)
+        k      = min(k, len(scores))
+        if k == 0:
+            return []
+        top    = np.argpartition(-scores, k - 1)[:k]
+        top    = top[np.argsort(-scores[top])]
+        return [{"id": self.ids[i], "text": self.texts[i]} for i in top]
+
+    def fetch(self, chunk_ids: list) -> dict:
+        return {chunk_id: self.texts[self.positions[chunk_id]] for chunk_id in chunk_ids if chunk_id in self.positions}
+
+    # Embedding is CPU-bound, so it runs in a thread; the search itself is a
+    # single matrix-vector product and fast enough to run on the event loop
+    async def aembed_query(self, text: str) -> list:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    async def aquery(self, text: str, embedding: list, k: int) -> list:
+        return self.query(text, embedding, k)
+
+    async def afetch(self, chunk_ids: list) -> dict:
+        return self.fetch(chunk_ids)
+
+    async def aclose(self):
+        pass
+
+# ----------------------------------------------------------------
+# Hybrid (BM25 + vector)
+# ----------------------------------------------------------------
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "with",
+}
+
+def tokenize(text: str) -> list:
+    """Lowercase words and numbers, so "500mg" matches both "500" and "mg"."""
+    return [t for t in re.findall(r"[a-z]+|\d+(?:\.\d+)?", text.lower()) if t not in STOPWORDS]
+
+class KeywordIndex:
+    """BM25 over the knowledge base chunks. The inverted index (term -> chunk
+    positions and term counts) is built once at ingestion time and saved next
+    to the vector index, so a search only touches the query's terms.
+    """
+
+    def __init__(self, ids: list, texts: list, lengths: list, postings: dict, k1: float = 1.5, b: float = 0.75):
+        self.ids        = ids
+        self.texts      = texts
+        self.lengths    = lengths
+        self.postings   = postings
+        self.k1         = k1
+        self.b          = b
+        self.positions  = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        n               = len(ids)
+        self.idf        = {term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for term, p in postings.items()}
+
+    @classmethod
+    def build(cls, chunks: list) -> "KeywordIndex":
+        """Build the index from {"id", "text"} chunks."""
+        postings = defaultdict(list)
+        lengths  = []
+        for i, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                postings[term].append([i, count])
+        return cls([c["id"] for c in chunks], [c["text"] for c in chunks], lengths, dict(postings))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "ids":      self.ids,
+                "texts":    self.texts,
+                "lengths":  self.lengths,
+                "postings": self.postings,
+                "k1":       self.k1,
+                "b":        self.b,
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "KeywordIndex":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["ids"], data["texts"], data["lengths"], data["postings"], data["k1"], data["b"])
+
+    def search(self, query: str, k: int) -> list:
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, count in self.postings[term]:
+                length     = self.lengths[i] / self.avg_length if self.avg_length else 1.0
+                scores[i] += idf * count * (self.k1 + 1) / (count + self.k1 * (1 - self.b + self.b * length))
+        top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [{"id": self.ids[i], "text": self.texts[i]} for i, _ in top]
+
+    def fetch(self, chunk_ids: list) -> dict:
+        return {chunk_id: self.texts[self.positions[chunk_id]] for chunk_id in chunk_ids if chunk_id in self.positions}
+
+def reciprocal_rank_fusion(rankings: list, constant: int = 60) -> list:
+    """Merge ranked match lists, scoring each chunk by the sum of 1 / (constant + rank)."""
+    scores  = defaultdict(float)
+    matches = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            scores[match["id"]] += 1 / (constant + rank)
+            matches.setdefault(match["id"], match)
+    return [matches[chunk_id] for chunk_id in sorted(scores, key=scores.get, reverse=True)]
+
+class CrossEncoderReranker:
+    """Reorders matches by a cross-encoder's relevance score for the query."""
+
+    def __init__(self, model_name: str = RERANK_MODEL):
+        try:
+            from fastembed.rerank.cross_encoder import TextCrossEncoder
+        except ImportError:
+            raise RuntimeError("The cross-encoder reranker needs fastembed: pip install 'medicalassistant[local]'")
+        self.name  = f"rerank:{model_name}"
+        self.model = TextCrossEncoder(model_name)
+
+    def rerank(self, query: str, matches: list) -> list:
+        scores = list(self.model.rerank(query, [m["text"] for m in matches]))
+        order  = sorted(range(len(matches)), key=lambda i: scores[i], reverse=True)
+        return [matches[i] for i in order]
+
+class HybridRetriever:
+    """Runs vector search and BM25 keyword search, fuses the two rankings with
+    reciprocal rank fusion and optionally reranks the fused candidates.
+    """
+
+    def __init__(self, dense, keyword_index: KeywordIndex, reranker=None, candidates: int = HYBRID_CANDIDATES):
+        self.dense         = dense
+        self.keyword_index = keyword_index
+        self.reranker      = reranker
+        self.candidates    = candidates
+        self.embed_model   = dense.embed_model
+        self.name          = f"hybrid:{dense.name}" + (f":{reranker.name}" if reranker else "")
+
+    def fuse(self, text: str, dense_matches: list, k: int) -> list:
+        fused = reciprocal_rank_fusion([dense_matches, self.keyword_index.search(text, self.candidates)])
+        return fused[:k]
+
+    async def aembed_query(self, text: str) -> list:
+        return await self.dense.aembed_query(text)
+
+    # BM25 over the knowledge base takes well under a millisecond and runs on
+    # the event loop; reranking is model inference and runs in a thread
+    async def aquery(self, text: str, embedding: list, k: int) -> list:
+        dense_matches = await self.dense.aquery(text, embedding, self.candidates)
+        if self.reranker is None:
+            return self.fuse(text, dense_matches, k)
+        fused = self.fuse(text, dense_matches, self.candidates)
+        return (await asyncio.to_thread(self.reranker.rerank, text, fused))[:k]
+
+    async def afetch(self, chunk_ids: list) -> dict:
+        texts   = self.keyword_index.fetch(chunk_ids)
+        missing = [chunk_id for chunk_id in chunk_ids if chunk_id not in texts]
+        if missing:
+            texts.update(await self.dense.afetch(missing))
+        return texts
+
+    async def aclose(self):
+        await self.dense.aclose()
+
+RERANKERS = {
+    "none":          None,
+    "cross-encoder": CrossEncoderReranker,
+}
+
+RETRIEVERS = {
+    "pinecone": PineconeRetriever,
+    "local":    LocalRetriever,
+}
+
+def create_retriever():
+    """Create the retriever selected by RETRIEVER, wrapped for hybrid search if enabled."""
+    try:
+        retriever_class = RETRIEVERS[RETRIEVER]
+    except KeyError:
+        raise ValueError(f"Unknown RETRIEVER: {RETRIEVER}")
+    retriever = retriever_class()
+
+    if not HYBRID_SEARCH:
+        return retriever
+
+    if RERANKER not in RERANKERS:
+        raise ValueError(f"Unknown RERANKER: {RERANKER}")
+    path          = KEYWORD_INDEX_PATH or retriever.keyword_index_path
+    keyword_index = KeywordIndex.load(path)
+    reranker      = RERANKERS[RERANKER]() if RERANKERS[RERANKER] else None
+    print(f"Hybrid search with {len(keyword_index.ids)} keyword-indexed chunks from {path}")
+    return HybridRetriever(retriever, keyword_index, reranker)
@@ -0,0 +1,195 @@
+import os
+import re
+from difflib import SequenceMatcher
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from db import models
+from db.queries import set_watermark
+from services.rag_service import aretrieve_context, agenerate_suggestions, arun_rag_pipeline
+from services.analysis_service import aget_transcript_context
+
+# Suggestions whose normalized text is at least this similar to an existing
+# suggestion of the same type are treated as duplicates and not saved
+DUPLICATE_THRESHOLD = float(os.getenv("SUGGESTION_DUPLICATE_THRESHOLD", "0.85"))
+
+# Refreshes with fewer new words than this skip the pipeline entirely and
+# leave the watermark where it is, so the words are picked up next time
+MIN_NEW_WORDS = int(os.getenv("SUGGESTION_MIN_NEW_WORDS", "8"))
+
+async def alatest_transcript(session_id: int, db: AsyncSession):
+    """Return the latest transcript for a session, or None if it has none."""
+    return await db.scalar(
+        select(models.Transcript)
+        .where(models.Transcript.session_id == session_id)
+        .order_by(models.Transcript.created_at.desc())
+        .limit(1)
+    )
+
+async def advance_watermark(transcript: models.Transcript, db: AsyncSession):
+    """Mark everything up to the end of a transcript as analyzed, so the next incremental refresh starts from there."""
+    await db.execute(set_watermark(transcript.session_id, transcript.id, len(transcript.text)))
+
+def suggestion_values(session_id: int, s: dict):
+    """Column values for a generated suggestion, or None if required fields are missing."""
+    if not s.get("content") or not s.get("type"):
+        return None
+    return dict(
+        session_id  = session_id,
+        type        = s.get("type",        "diagnosis"),
+        content     = s.get("content",     ""),
+        confidence  = s.get("confidence",  "medium"),
+        source_docs = s.get("source_docs", ""),
+    )
+
+async def agenerate_session_suggestions(transcript: models.Transcript, db: AsyncSession) -> list:
+    """Run the RAG pipeline on a whole transcript and save the suggestions it returns."""
+    # Extract symptoms and retrieve chunks once per transcript, then generate
+    context          = await aget_transcript_context(transcript, db)
+    suggestions_data = await arun_rag_pipeline(transcript.text, context)
+
+    # Skip suggestions that are missing required fields
+    rows = [v for v in (suggestion_values(transcript.session_id, s) for s in suggestions_data) if v]
+    await advance_watermark(transcript, db)
+    if not rows:
+        await db.commit()
+        return []
+
+    # Save all suggestions in one INSERT ... RETURNING
+    result = await db.scalars(insert(models.Suggestion).returning(models.Suggestion), rows)
+    saved  = result.all()
+    await db.commit()
+    return list(saved)
+
+async def alatest_suggestion_id(session_id: int, db: AsyncSession) -> int:
+    """ID of the session's newest suggestion, or 0 if it has none."""
+    return await db.scalar(
+        select(func.coalesce(func.max(models.Suggestion.id), 0))
+        .where(models.Suggestion.session_id == session_id)
+    )
+
+async def asaved_suggestions(transcript: models.Transcript, after_id: int, db: AsyncSession) -> list:
+    """Suggestions a finished run saved for a transcript, newer than after_id.
+
+    A run commits its suggestions together with a watermark at the end of the
+    transcript, so the watermark must cover all of it; otherwise nothing is
+    returned.
+    """
+    session = await db.get(models.Session, transcript.session_id)
+    if (session.analyzed_transcript_id, session.analyzed_chars) != (transcript.id, len(transcript.text)):
+        return []
+    return (await db.scalars(
+        select(models.Suggestion)
+        .where(models.Suggestion.session_id == transcript.session_id, models.Suggestion.id > after_id)
+        .order_by(models.Suggestion.id)
+    )).all()
+
+def normalize_suggestion(text: str) -> str:
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+def is_near_duplicate(a: dict, b: dict, threshold: float = DUPLICATE_THRESHOLD) -> bool:
+    """True if two suggestions have the same type and almost the same content."""
+    if a.get("type") != b.get("type"):
+        return False
+    a_text = normalize_suggestion(a.get("content"))
+    b_text = normalize_suggestion(b.get("content"))
+    if a_text == b_text:
+        return True
+    return SequenceMatcher(None, a_text, b_text).ratio() >= threshold
+
+def drop_near_duplicates(candidates: list, existing: list) -> list:
+    """Remove candidates that repeat an existing suggestion or an earlier candidate."""
+    kept = []
+    for candidate in candidates:
+        if any(is_near_duplicate(candidate, other) for other in existing + kept):
+            continue
+        kept.append(candidate)
+    return kept
+
+def transcript_delta(transcripts: list, transcript_id, chars: int):
+    """Return the transcript text after the watermark and the watermark at its end.
+
+    Transcripts are in the order they were recorded. Live transcription only
+    ever appends to a transcript, so a character offset into the watermark
+    transcript marks how much of it has been analyzed.
+    """
+    if not transcripts:
+        return "", (transcript_id, chars)
+
+    ids   = [t.id for t in transcripts]
+    start = ids.index(transcript_id) if transcript_id in ids else None
+
+    if start is None:
+        # Nothing analyzed yet, or the watermark transcript no longer exists
+        parts = [t.text for t in transcripts]
+    else:
+        parts = [transcripts[start].text[chars:]] + [t.text for t in transcripts[start + 1:]]
+
+    last  = transcripts[-1]
+    delta = "\n".join(p.strip() for p in parts if p and p.strip())
+    return delta, (last.id, len(last.text))
+
+async def asession_suggestions(session_id: int, db: AsyncSession) -> list:
+    return (await db.scalars(
+        select(models.Suggestion)
+        .where(models.Suggestion.session_id == session_id)
+        .order_by(models.Suggestion.id)
+    )).all()
+
+async def arefresh_suggestions(session: models.Session, db: AsyncSession) -> list:
+    """Add suggestions for the transcript content recorded since the last refresh.
+
+    Symptom extraction, retrieval and generation only see the new content.
+    New suggestions that repeat one the session already has (including ones
+    the doctor rejected) are dropped, and every suggestion for the session is
+    returned.
+
+    No transaction is held open during the LLM calls. The watermark is then
+    moved with a compare-and-set, so if two refreshes of a session race, only
+    the first to finish saves its suggestions.
+    """
+    transcripts = (await db.scalars(
+        select(models.Transcript)
+        .where(models.Transcript.session_id == session.id)
+        .order_by(models.Transcript.created_at, models.Transcript.id)
+    )).all()
+
+    old_id, old_chars             = session.analyzed_transcript_id, session.analyzed_chars
+    delta, (transcript_id, chars) = transcript_delta(transcripts, old_id, old_chars)
+    existing                      = await asession_suggestions(session.id, db)
+
+    if len(delta.split()) < MIN_NEW_WORDS:
+        print(f"Session {session.id}: {len(delta.split())} new words, keeping existing suggestions")
+        return existing
+
+    # End the read transaction, so no connection or locks are held while the LLM runs
+    await db.commit()
+
+    print(f"Session {session.id}: analyzing {len(delta)} new characters")
+    context    = await aretrieve_context(delta)
+    candidates = await agenerate_suggestions(delta, context["chunks"], context["chunk_ids"], context["symptoms"])
+
+    # Skip suggestions that are missing required fields, then drop repeats
+    candidates = [s for s in candidates if suggestion_values(session.id, s)]
+    known      = [{"type": s.type, "content": s.content} for s in existing]
+    new        = drop_near_duplicates(candidates, known)
+    print(f"Generated {len(candidates)} suggestions, {len(new)} new")
+
+    advanced = await db.execute(
+        set_watermark(session.id, transcript_id, chars).where(
+            models.Session.analyzed_transcript_id.is_not_distinct_from(old_id),
+            models.Session.analyzed_chars == old_chars,
+        )
+    )
+    if advanced.rowcount != 1:
+        # Another refresh analyzed this text first and saved its suggestions
+        await db.commit()
+        print(f"Session {session.id}: refreshed by another request, discarding {len(new)} suggestions")
+        return await asession_suggestions(session.id, db)
+
+    saved = []
+    rows  = [suggestion_values(session.id, s) for s in new]
+    if rows:
+        saved = (await db.scalars(insert(models.Suggestion).returning(models.Suggestion), rows)).all()
+    await db.commit()
+
+    return list(existing) + list(saved)
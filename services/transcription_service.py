@@ -0,0 +1,239 @@
+import os
+import re
+import shutil
+import asyncio
+import tempfile
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from groq import AsyncGroq
+from dotenv import load_dotenv
+from services.outbound_service import providers, acall
+
+load_dotenv()
+
+# Load the async Groq client with the API key from .env. Retries and timeouts
+# are handled by the outbound call layer, so the client doesn't retry on its own.
+client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), max_retries=0, timeout=providers["whisper"].timeout)
+
+WHISPER_MODEL = "whisper-large-v3"
+
+# Long recordings are cut into overlapping segments that are transcribed in
+# parallel. The overlap lets words cut at a boundary appear whole in one of
+# the two segments; the duplicate copy is removed when stitching.
+SEGMENT_SECONDS        = int(os.getenv("TRANSCRIBE_SEGMENT_SECONDS", "600"))
+SEGMENT_OVERLAP        = int(os.getenv("TRANSCRIBE_SEGMENT_OVERLAP", "5"))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+UPLOAD_CHUNK_BYTES     = 1024 * 1024
+
+# Where recordings queued for background transcription wait for a worker. Jobs
+# can run in a separate worker process, so it must be shared with the workers.
+SPOOL_DIR = os.getenv("TRANSCRIBE_SPOOL_DIR") or os.path.join(tempfile.gettempdir(), "medassist-uploads")
+
+# ffmpeg is needed to cut segments; without it recordings are sent whole
+FFMPEG  = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+async def spool_upload(file: UploadFile, directory: str) -> str:
+    """Copy an uploaded file to disk chunk by chunk and return its path.
+
+    File writes block, so each one runs in the threadpool rather than on the event loop.
+    """
+    suffix = os.path.splitext(file.filename or "")[1] or ".webm"
+    path   = os.path.join(directory, f"upload{suffix}")
+    out    = await run_in_threadpool(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            await run_in_threadpool(out.write, chunk)
+    finally:
+        await run_in_threadpool(out.close)
+    return path
+
+def make_job_directory() -> str:
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    return tempfile.mkdtemp(prefix="job-", dir=SPOOL_DIR)
+
+async def spool_job_upload(file: UploadFile) -> str:
+    """Spool an upload into a directory of its own under SPOOL_DIR, for a background job, and return its path."""
+    directory = await run_in_threadpool(make_job_directory)
+    try:
+        return await spool_upload(file, directory)
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+def discard_job_upload(path: str):
+    """Delete an upload spooled by spool_job_upload, along with its directory."""
+    shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+async def run_command(*args: str) -> bytes:
+    """Run an external command without blocking the event loop and return its stdout."""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(args[0])} failed: {stderr.decode(errors='ignore')[-500:]}")
+    return stdout
+
+async def probe_duration(path: str):
+    """Return the duration of an audio file in seconds, or None if it can't be determined."""
+    if not FFPROBE:
+        return None
+    try:
+        output = await run_command(
+            FFPROBE, "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", path,
+        )
+        return float(output.strip())
+    except (RuntimeError, ValueError):
+        return None
+
+def plan_segments(duration: float, segment_seconds: int = SEGMENT_SECONDS, overlap: int = SEGMENT_OVERLAP) -> list:
+    """Split a recording into (start, length) windows that overlap by `overlap` seconds."""
+    segments = []
+    start    = 0.0
+    while start < duration:
+        length = min(segment_seconds, duration - start)
+        segments.append((start, length))
+        if start + length >= duration:
+            break
+        start += segment_seconds - overlap
+    return segments
+
+async def extract_segment(path: str, start: float, length: float, out_path: str):
+    """Cut one segment out of the recording as small mono Opus audio."""
+    await run_command(
+        FFMPEG, "-v", "error", "-y",
+        "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", path,
+        "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "32k",
+        out_path,
+    )
+
+async def transcribe_segment(path: str, filename: str, content_type: str) -> str:
+    """Send one audio file to Whisper via Groq, streaming it from disk."""
+    # Reopened for every attempt, since a failed upload leaves the file partly read
+    async def send():
+        with open(path, "rb") as audio:
+            return await client.audio.transcriptions.create(
+                model=WHISPER_MODEL,
+                file=(filename, audio, content_type),
+            )
+
+    response = await acall("whisper", send)
+    return response.text
+
+async def fake_transcribe_segment(path: str, filename: str, content_type: str) -> str:
+    """Offline stand-in for Whisper. "Audio" that is UTF-8 text, as sent by the tests, is
+    heard as that text; real audio is described instead of transcribed."""
+    with open(path, "rb") as audio:
+        data = audio.read()
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return f"[{filename}: {len(data)} bytes]"
+
+# TRANSCRIBER=fake swaps Whisper for the local stand-in, for tests and offline development
+TRANSCRIBERS = {
+    "groq": transcribe_segment,
+    "fake": fake_transcribe_segment,
+}
+TRANSCRIBER = os.getenv("TRANSCRIBER", "groq")
+
+def get_transcriber():
+    """Return the function used to transcribe one audio file."""
+    try:
+        return TRANSCRIBERS[TRANSCRIBER]
+    except KeyError:
+        raise ValueError(f"Unknown TRANSCRIBER: {TRANSCRIBER}")
+
+async def transcribe_bytes(audio: bytes, filename: str, content_type: str) -> str:
+    """Transcribe a small, self-contained audio clip held in memory, such as a live window."""
+    with tempfile.TemporaryDirectory(prefix="medassist-audio-") as directory:
+        path = os.path.join(directory, filename)
+        with open(path, "wb") as out:
+            out.write(audio)
+        return await get_transcriber()(path, filename, content_type)
+
+def normalize_word(word: str) -> str:
+    return re.sub(r"[^\w]", "", word.lower())
+
+def merge_overlap(previous: str, current: str, max_words: int = 40) -> str:
+    """Drop the words at the start of `current` that repeat the end of `previous`."""
+    prev_words = previous.split()
+    curr_words = current.split()
+    prev_norm  = [normalize_word(w) for w in prev_words[-max_words:]]
+    curr_norm  = [normalize_word(w) for w in curr_words[:max_words]]
+
+    # Find the longest run that ends `previous` and starts `current`
+    for size in range(min(len(prev_norm), len(curr_norm)), 0, -1):
+        if prev_norm[-size:] == curr_norm[:size]:
+            return " ".join(curr_words[size:])
+    return current
+
+def stitch_transcripts(texts: list) -> str:
+    """Join segment transcripts in order, removing text repeated across boundaries."""
+    stitched = ""
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        if stitched:
+            text = merge_overlap(stitched, text)
+            if text:
+                stitched += " " + text
+        else:
+            stitched = text
+    return stitched
+
+async def transcribe_recording(path: str, filename: str, content_type: str, directory: str) -> str:
+    """Transcribe a recording of any length stored at path.
+
+    Recordings longer than one segment are cut into overlapping segments in
+    directory, transcribed concurrently and stitched back together in order.
+    """
+    duration = await probe_duration(path) if FFMPEG else None
+
+    # Short recordings, or no ffmpeg available: send the file as it is
+    if duration is None or duration <= SEGMENT_SECONDS:
+        return await get_transcriber()(path, filename, content_type)
+
+    segments  = plan_segments(duration)
+    semaphore = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+    print(f"Transcribing {duration:.0f}s recording in {len(segments)} segments")
+
+    async def transcribe_part(i: int, start: float, length: float) -> str:
+        async with semaphore:
+            segment_path = os.path.join(directory, f"segment-{i:04d}.ogg")
+            await extract_segment(path, start, length, segment_path)
+            try:
+                return await get_transcriber()(segment_path, f"segment-{i:04d}.ogg", "audio/ogg")
+            finally:
+                os.remove(segment_path)
+
+    texts = await asyncio.gather(*(
+        transcribe_part(i, start, length) for i, (start, length) in enumerate(segments)
+    ))
+    return stitch_transcripts(texts)
+
+async def transcribe_upload(file: UploadFile) -> str:
+    """Transcribe an uploaded recording of any length.
+
+    The upload is spooled to a temporary file instead of being read into
+    memory, then transcribed in segments if it is long.
+    """
+    content_type = file.content_type or "audio/webm"
+    filename     = file.filename or "recording.webm"
+
+    with tempfile.TemporaryDirectory(prefix="medassist-audio-") as directory:
+        path = await spool_upload(file, directory)
+        return await transcribe_recording(path, filename, content_type, directory)
+
+async def transcribe_file(path: str, filename: str, content_type: str) -> str:
+    """Transcribe a recording of any length already on disk, such as one spooled for a background job.
+
+    Segments are cut into a temporary directory; the recording itself is left in place.
+    """
+    with tempfile.TemporaryDirectory(prefix="medassist-audio-") as directory:
+        return await transcribe_recording(path, filename, content_type, directory)
@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+
+# The app reads its settings at import time, so point it at a throwaway SQLite
+# database and the offline stand-ins before anything imports it
+TEST_DIR = tempfile.mkdtemp(prefix="medassist-tests-")
+DB_PATH  = os.path.join(TEST_DIR, "test.db")
+os.environ["DATABASE_URL"]       = f"sqlite:///{DB_PATH}"
+os.environ["PDF_CACHE_DIR"]      = os.path.join(TEST_DIR, "exports")
+os.environ["TRANSCRIBER"]        = "fake"
+os.environ["JOB_WORKERS"]        = "0"
+os.environ["PDF_RENDER_WORKERS"] = "0"
+os.environ["RAG_CACHE_BACKEND"]  = "none"
+os.environ.setdefault("GROQ_API_KEY",     "test")
+os.environ.setdefault("PINECONE_API_KEY", "test")
+os.environ.setdefault("PINECONE_INDEX",   "test")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from fastapi.testclient import TestClient
+from db.database import Base, engine
+from db import models  # noqa: F401  registers the tables
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def client():
+    import main
+    with TestClient(main.app) as c:
+        yield c
@@ -0,0 +1,156 @@
+import json
+import pytest
+from langchain_core.documents import Document
+from knowledge_base import ingest
+
+def drug(i: int, use: str = None) -> dict:
+    return {
+        "openfda": {"brand_name": [f"Brand{i}"], "generic_name": [f"generic{i}"]},
+        "indications_and_usage": [use or f"Relief of condition number {i}."],
+    }
+
+class RecordingSource(ingest.FileSource):
+    """FileSource that remembers the cursors it was asked to start from."""
+
+    def __init__(self, path: str):
+        super().__init__(path, page_size=1)
+        self.cursors = []
+
+    def pages(self, cursor: dict = None):
+        self.cursors.append(cursor)
+        yield from super().pages(cursor)
+
+class GuidelineSource:
+    """Stand-in for PdfSource: one page per guideline, or none and a failure if unreachable."""
+
+    origins = ("pdfs",)
+
+    def __init__(self, pages: list, reachable: bool = True):
+        self.pages_text = pages
+        self.failed     = [] if reachable else ["WHO guideline"]
+
+    def pages(self, cursor: dict = None):
+        docs = [
+            Document(page_content=text, metadata={"source": "WHO guideline", "origin": "pdfs", "page": 1})
+            for text in self.pages_text
+        ] if not self.failed else []
+        yield docs, None
+
+class RecordingSink(ingest.MemorySink):
+    """MemorySink that remembers the IDs of every chunk it was asked to store."""
+
+    def __init__(self):
+        super().__init__()
+        self.stored = []
+
+    def store(self, chunks: list, embeddings: list):
+        super().store(chunks, embeddings)
+        with self.lock:
+            self.stored.extend(c["id"] for c in chunks)
+
+@pytest.fixture
+def drugs_file(tmp_path):
+    path = tmp_path / "drugs.json"
+
+    def write(drugs: list) -> str:
+        path.write_text(json.dumps({"results": drugs}))
+        return str(path)
+
+    return write
+
+def ingest_once(path: str, sink, checkpoint: str, max_pages: int = None) -> RecordingSource:
+    source = RecordingSource(path)
+    ingest.build_knowledge_base(
+        source             = source,
+        sink               = sink,
+        checkpoint_path    = checkpoint,
+        workers            = 2,
+        max_pages          = max_pages,
+        keyword_index_path = None,
+    )
+    return source
+
+def test_interrupted_run_resumes_from_checkpoint_cursor(tmp_path, drugs_file):
+    path       = drugs_file([drug(i) for i in range(5)])
+    checkpoint = str(tmp_path / "checkpoint.sqlite3")
+    sink       = RecordingSink()
+
+    # Stopped after two of the five one-record pages
+    first = ingest_once(path, sink, checkpoint, max_pages=2)
+    assert first.cursors == [None]
+    assert len(sink.stored) == 2
+
+    # The next run starts at the third page and only stores the rest
+    stored_before = list(sink.stored)
+    second = ingest_once(path, sink, checkpoint)
+    assert second.cursors == [{"offset": 2}]
+    assert len(sink.stored) == 5
+    assert not set(sink.stored[2:]) & set(stored_before)
+    assert len(sink.vectors) == 5
+
+def test_second_run_skips_unchanged_chunks(tmp_path, drugs_file):
+    checkpoint = str(tmp_path / "checkpoint.sqlite3")
+    sink       = RecordingSink()
+
+    ingest_once(drugs_file([drug(i) for i in range(5)]), sink, checkpoint)
+    assert len(sink.stored) == 5
+    old_ids = set(sink.vectors)
+
+    # One record changed: only its new chunk is embedded and stored, and the
+    # chunk it replaces is deleted
+    sink.stored.clear()
+    changed = [drug(i) for i in range(5)]
+    changed[3] = drug(3, "Relief of a different condition.")
+    second = ingest_once(drugs_file(changed), sink, checkpoint)
+
+    assert second.cursors == [None]
+    assert len(sink.stored) == 1
+    assert sink.stored[0] not in old_ids
+    assert len(sink.vectors) == 5
+    assert len(old_ids - set(sink.vectors)) == 1
+
+def test_first_run_deletes_vectors_left_by_the_old_ingest_script(tmp_path, drugs_file):
+    checkpoint = str(tmp_path / "checkpoint.sqlite3")
+    sink       = RecordingSink()
+    legacy     = [f"chunk-{i}" for i in range(4)]
+    sink.store([{"id": i, "text": "old"} for i in legacy], sink.embed(["old"] * len(legacy)))
+
+    ingest_once(drugs_file([drug(i) for i in range(3)]), sink, checkpoint)
+
+    assert not set(legacy) & set(sink.vectors)
+    assert len(sink.vectors) == 3
+
+def guideline_ids(sink) -> set:
+    return {i for i, v in sink.vectors.items() if v["chunk"]["source"] == "WHO guideline"}
+
+def test_guideline_chunks_survive_runs_that_skip_or_fail_to_read_the_pdfs(tmp_path, drugs_file):
+    path       = drugs_file([drug(i) for i in range(3)])
+    checkpoint = str(tmp_path / "checkpoint.sqlite3")
+    sink       = RecordingSink()
+    pages      = ["Malaria treatment guideline.", "Tuberculosis treatment guideline."]
+
+    def run(*sources):
+        ingest.build_knowledge_base(
+            source             = ingest.CombinedSource([RecordingSource(path), *sources]),
+            sink               = sink,
+            checkpoint_path    = checkpoint,
+            workers            = 2,
+            keyword_index_path = None,
+        )
+
+    run(GuidelineSource(pages))
+    stored = guideline_ids(sink)
+    assert len(stored) == 2
+
+    # Like --skip-pdfs: the guidelines weren't read, so they aren't stale
+    run()
+    assert guideline_ids(sink) == stored
+
+    # A failed download doesn't delete them either
+    run(GuidelineSource(pages, reachable=False))
+    assert guideline_ids(sink) == stored
+
+    # A run that reads the PDFs still removes a guideline that is gone
+    run(GuidelineSource(pages[:1]))
+    assert len(guideline_ids(sink)) == 1
+    assert len(sink.vectors) == 4
@@ -0,0 +1,61 @@
+import asyncio
+from sqlalchemy import select, func
+from db.database import SessionLocal, AsyncSessionLocal
+from db import models
+from services import job_service, suggestion_service
+
+def queue_suggestions_job(client, monkeypatch) -> str:
+    """Create a session with a transcript and queue a full suggestions run for it."""
+    async def pipeline(text, context=None):
+        return [{"type": "diagnosis", "content": "Influenza", "confidence": "high"}]
+
+    async def context(transcript, db):
+        return {"symptoms": "fever", "chunks": [], "chunk_ids": []}
+
+    monkeypatch.setattr(suggestion_service, "arun_rag_pipeline", pipeline)
+    monkeypatch.setattr(suggestion_service, "aget_transcript_context", context)
+
+    session_id = client.post("/api/sessions", json={"title": "Queued"}).json()["id"]
+    with SessionLocal() as db:
+        db.add(models.Transcript(session_id=session_id, text="The patient has had a fever for two days"))
+        db.commit()
+
+    response = client.post("/api/suggestions?background=true", json={"session_id": session_id})
+    assert response.status_code == 202
+    return response.json()["id"]
+
+def test_a_queued_job_is_claimed_once(client, monkeypatch):
+    job_id = queue_suggestions_job(client, monkeypatch)
+
+    async def claim_twice():
+        return await asyncio.gather(job_service.aclaim_job(), job_service.aclaim_job())
+
+    claimed = [job.id for job in asyncio.run(claim_twice()) if job is not None]
+    assert claimed.count(job_id) == 1
+
+def test_retried_suggestions_job_does_not_save_them_again(client, monkeypatch):
+    job_id = queue_suggestions_job(client, monkeypatch)
+
+    async def run_attempt(attempts: int) -> dict:
+        async with AsyncSessionLocal() as db:
+            job = await db.get(models.Job, job_id)
+            job.attempts = attempts
+            return await job_service.arun_suggestions_job(job, db)
+
+    async def count_suggestions(session_id: int) -> int:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(select(func.count()).where(models.Suggestion.session_id == session_id))
+
+    # The first attempt saves its suggestions but the job is never marked done
+    first = asyncio.run(run_attempt(1))
+    with SessionLocal() as db:
+        session_id = db.get(models.Job, job_id).session_id
+
+    async def fail(text, context=None):
+        raise AssertionError("the retry generated suggestions again")
+
+    monkeypatch.setattr(suggestion_service, "arun_rag_pipeline", fail)
+    retry = asyncio.run(run_attempt(2))
+
+    assert retry == first
+    assert asyncio.run(count_suggestions(session_id)) == 1
@@ -0,0 +1,56 @@
+import asyncio
+import pytest
+from routers import audio
+
+@pytest.fixture
+def first_window_slow(monkeypatch):
+    """Make the first window finish last, so windows complete out of order."""
+    transcribe_bytes = audio.transcribe_bytes
+
+    async def delayed(data: bytes, filename: str, content_type: str) -> str:
+        if filename == "window-00000.webm":
+            await asyncio.sleep(0.3)
+        return await transcribe_bytes(data, filename, content_type)
+
+    monkeypatch.setattr(audio, "transcribe_bytes", delayed)
+
+def run_live(client, windows: list, query: str = ""):
+    """Send windows over the live socket of a new session, then "end".
+
+    Returns the session ID and every message up to the final one.
+    """
+    session_id = client.post("/api/sessions", json={"title": "Live visit"}).json()["id"]
+    messages   = []
+    with client.websocket_connect(f"/api/transcribe/live?session_id={session_id}{query}") as ws:
+        for window in windows:
+            ws.send_bytes(window.encode())
+        ws.send_text("end")
+        while not messages or messages[-1]["type"] != "final":
+            messages.append(ws.receive_json())
+    return session_id, messages
+
+def test_overlapping_windows_are_appended_in_order_without_repeats(client, first_window_slow):
+    session_id, messages = run_live(client, [
+        "The patient has had a fever",
+        "had a fever and a dry cough",
+        "a dry cough since Monday",
+    ], "&overlap=true")
+
+    expected = "The patient has had a fever and a dry cough since Monday"
+    final    = messages[-1]
+    assert final["text"] == expected
+
+    # Every partial is the transcript so far, never out of order
+    for message in messages[:-1]:
+        assert message["type"] == "partial"
+        assert expected.startswith(message["text"])
+
+    # One rolling transcript, saved with the same text
+    detail = client.get(f"/api/sessions/{session_id}").json()
+    assert [t["text"] for t in detail["transcripts"]] == [expected]
+    assert detail["transcripts"][0]["id"] == final["transcript_id"]
+
+def test_words_repeated_across_windows_are_kept_without_overlap(client):
+    _, messages = run_live(client, ["Take two tablets, no", "no more than twice a day"])
+
+    assert messages[-1]["text"] == "Take two tablets, no no more than twice a day"
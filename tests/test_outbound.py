@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from services import outbound_service
+from services.outbound_service import TokenBucket, Provider, OutboundUnavailable
+
+class Clock:
+    """Stand-in for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(outbound_service.time, "monotonic", clock)
+    return clock
+
+def test_token_bucket_refills_at_the_rate_limit(clock):
+    bucket = TokenBucket(rate_limit=60)   # one a second, bursts of ten
+
+    assert [bucket.reserve(max_wait=0) for _ in range(10)] == [0.0] * 10
+    assert bucket.reserve(max_wait=0) is None
+    assert bucket.reserve(max_wait=5) == pytest.approx(1.0)
+    assert bucket.next_free() == pytest.approx(2.0)
+
+    clock.now += 3.5
+    assert bucket.next_free() == 0.0
+    assert bucket.reserve(max_wait=0) == 0.0
+
+    # Refilling stops at the burst size
+    clock.now += 60
+    assert [bucket.reserve(max_wait=0) for _ in range(10)] == [0.0] * 10
+    assert bucket.reserve(max_wait=0) is None
+
+def test_full_queue_and_spent_deadline_are_reported_apart(clock):
+    provider = Provider("test", rate_limit=60, concurrency=1, timeout=1, deadline=5)
+    for _ in range(10):
+        provider.reserve_turn(clock.now + 5)
+
+    with pytest.raises(OutboundUnavailable, match="too many calls queued") as queued:
+        provider.reserve_turn(clock.now + 0.5)
+    assert queued.value.retry_after == pytest.approx(1.0)
+
+    with pytest.raises(OutboundUnavailable, match="longer than its 5s deadline") as late:
+        provider.reserve_turn(clock.now - 1)
+    assert late.value.retry_after >= 1.0
+    assert provider.counts["unavailable"] == 2
+
+def test_call_that_keeps_timing_out_gives_up_at_its_deadline(monkeypatch):
+    provider = Provider("test", rate_limit=0, concurrency=1, timeout=0.1, deadline=0.35)
+    monkeypatch.setitem(outbound_service.providers, "test", provider)
+    monkeypatch.setattr(outbound_service, "OUTBOUND_BACKOFF", 0.01)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def call():
+        started = asyncio.get_running_loop().time()
+        with pytest.raises(OutboundUnavailable):
+            await outbound_service.acall("test", hang)
+        return asyncio.get_running_loop().time() - started
+
+    elapsed = asyncio.run(call())
+    assert elapsed < 1
+    assert provider.counts["timeouts"] >= 2
+    assert provider.counts["unavailable"] == 1
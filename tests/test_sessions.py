@@ -0,0 +1,113 @@
+import os
+import pytest
+from datetime import datetime, timezone
+from db.database import SessionLocal
+from db import models
+from services import analysis_service, suggestion_service, report_service, export_cache_service
+
+@pytest.fixture
+def offline_pipelines(monkeypatch):
+    """Replace retrieval and generation with fixed results."""
+    async def retrieve(text):
+        return {"symptoms": "fever", "chunks": [], "chunk_ids": []}
+
+    async def suggest(text, context=None):
+        return [{"type": "diagnosis", "content": "Influenza", "confidence": "high"}]
+
+    async def discharge(text, context=None):
+        return {"possible_cause": "Influenza", "prescribed_drugs": ["Paracetamol"], "followup_tests": []}
+
+    monkeypatch.setattr(analysis_service, "aretrieve_context", retrieve)
+    monkeypatch.setattr(suggestion_service, "arun_rag_pipeline", suggest)
+    monkeypatch.setattr(report_service, "arun_discharge_pipeline", discharge)
+
+def session_with_transcript(client, text: str = "The patient has had a fever for two days") -> int:
+    session_id = client.post("/api/sessions", json={"title": "Follow-up"}).json()["id"]
+    with SessionLocal() as db:
+        db.add(models.Transcript(session_id=session_id, text=text))
+        db.commit()
+    return session_id
+
+def test_export_is_not_modified_while_the_session_is_unchanged(client, offline_pipelines):
+    session_id = session_with_transcript(client)
+    url        = f"/api/sessions/{session_id}/export"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["content-type"] == "application/pdf"
+    etag  = first.headers["etag"]
+
+    again = client.get(url, headers={"If-None-Match": f'W/{etag}, "other"'})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert not again.content
+
+    client.put(f"/api/sessions/{session_id}", json={"title": "Renamed"})
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+def test_suggestion_runs_only_change_the_session_export(client, offline_pipelines):
+    session_id = session_with_transcript(client)
+    # Far enough back that a run bumping updated_at would be seen
+    with SessionLocal() as db:
+        db.get(models.Session, session_id).updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        db.commit()
+
+    export     = client.get(f"/api/sessions/{session_id}/export").headers["etag"]
+    discharge  = client.get(f"/api/sessions/{session_id}/discharge").headers["etag"]
+
+    response = client.post("/api/suggestions", json={"session_id": session_id})
+    assert [s["content"] for s in response.json()["suggestions"]] == ["Influenza"]
+
+    assert client.get(f"/api/sessions/{session_id}/discharge", headers={"If-None-Match": discharge}).status_code == 304
+    assert client.get(f"/api/sessions/{session_id}/export", headers={"If-None-Match": export}).status_code == 200
+
+def test_stored_export_is_served_from_its_file_until_the_session_changes(client, offline_pipelines):
+    session_id = session_with_transcript(client)
+    url        = f"/api/sessions/{session_id}/export"
+
+    first = client.get(url)
+    path  = export_cache_service.cached_path(first.headers["etag"])
+    with open(path, "rb") as f:
+        assert f.read() == first.content
+
+    stored = client.get(url)
+    assert stored.content == first.content
+    assert stored.headers["content-length"] == str(len(first.content))
+
+    # A new version replaces the file of the old one
+    client.put(f"/api/sessions/{session_id}", json={"title": "Renamed"})
+    renamed = client.get(url)
+    assert not os.path.exists(path)
+    assert os.path.exists(export_cache_service.cached_path(renamed.headers["etag"]))
+
+    # A missing file is rendered again
+    os.remove(export_cache_service.cached_path(renamed.headers["etag"]))
+    again = client.get(url)
+    assert again.status_code == 200
+    assert again.headers["etag"] == renamed.headers["etag"]
+    assert os.path.exists(export_cache_service.cached_path(again.headers["etag"]))
+
+    client.delete(f"/api/sessions/{session_id}")
+    assert not os.path.exists(export_cache_service.cached_path(again.headers["etag"]))
+
+def test_session_pages_follow_the_cursor_without_gaps_or_repeats(client):
+    created = [client.post("/api/sessions", json={"title": f"Paged visit {i}"}).json()["id"] for i in range(5)]
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "Paged visit", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/sessions", params=params).json()
+        seen  += [s["id"] for s in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert seen == sorted(created, reverse=True)
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "bm8tc2VwYXJhdG9y", "MjAyNi0xMC0xN3xzZXZlbg=="])
+def test_malformed_cursor_is_rejected(client, cursor):
+    response = client.get("/api/sessions", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
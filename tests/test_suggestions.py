@@ -0,0 +1,97 @@
+import json
+import asyncio
+from types import SimpleNamespace
+from sqlalchemy import select
+from db.database import AsyncSessionLocal
+from db import models
+from services import suggestion_service, rag_service
+from services.output_service import FALLBACK_SUGGESTION
+
+TEXT = "The patient reports a high fever, a dry cough and aching joints for three days"
+
+def test_racing_refreshes_save_one_set_of_suggestions(monkeypatch):
+    async def retrieve(text):
+        return {"symptoms": "fever, cough", "chunks": [], "chunk_ids": []}
+
+    async def generate(text, chunks, chunk_ids, symptoms):
+        await asyncio.sleep(0.1)   # both refreshes are waiting on the LLM at once
+        return [{"type": "diagnosis", "content": "Influenza", "confidence": "high"}]
+
+    monkeypatch.setattr(suggestion_service, "aretrieve_context", retrieve)
+    monkeypatch.setattr(suggestion_service, "agenerate_suggestions", generate)
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            session = models.Session(title="Race")
+            db.add(session)
+            await db.commit()
+            db.add(models.Transcript(session_id=session.id, text=TEXT))
+            await db.commit()
+            session_id = session.id
+
+        async def refresh():
+            async with AsyncSessionLocal() as db:
+                session = await db.get(models.Session, session_id)
+                return [s.content for s in await suggestion_service.arefresh_suggestions(session, db)]
+
+        results = await asyncio.gather(refresh(), refresh())
+
+        async with AsyncSessionLocal() as db:
+            saved   = (await db.scalars(select(models.Suggestion).where(models.Suggestion.session_id == session_id))).all()
+            session = await db.get(models.Session, session_id)
+            return results, [s.content for s in saved], session.analyzed_chars
+
+    results, saved, analyzed_chars = asyncio.run(scenario())
+
+    assert saved == ["Influenza"]
+    assert results == [["Influenza"], ["Influenza"]]
+    assert analyzed_chars == len(TEXT)
+
+def parse_in_pieces(text: str, size: int = 3) -> rag_service.JsonArrayStreamParser:
+    parser = rag_service.JsonArrayStreamParser()
+    parser.items = []
+    for i in range(0, len(text), size):
+        parser.items += parser.feed(text[i:i + size])
+    return parser
+
+ITEMS = [
+    {"type": "diagnosis", "content": "Malaria [suspected]", "confidence": "high", "source_docs": ["c1"]},
+    {"type": "test", "content": "Blood smear {thick}", "confidence": "medium", "source_docs": []},
+]
+
+def test_stream_parser_yields_the_suggestions_array_items():
+    wrapped = json.dumps({"suggestions": ITEMS})
+    assert parse_in_pieces(wrapped).items == ITEMS
+    assert parse_in_pieces(json.dumps(ITEMS)).items == ITEMS
+
+def test_stream_parser_skips_brackets_and_arrays_before_the_suggestions_array():
+    text   = json.dumps({"note": 'see [ref] and "[quoted]"', "tags": ["a", {"b": []}], "suggestions": ITEMS})
+    parser = parse_in_pieces(text)
+    assert parser.items == ITEMS
+    assert parser.malformed == []
+    assert parser.depth == -1
+
+def test_stream_parser_keeps_items_that_are_not_valid_json():
+    parser = parse_in_pieces('{"suggestions": [{"type": "drug",}, ' + json.dumps(ITEMS[0]) + "]}")
+    assert parser.items == [ITEMS[0]]
+    assert parser.malformed == ['{"type": "drug",}']
+
+def test_streamed_response_without_suggestions_falls_back(monkeypatch):
+    async def tokens(provider, fn, *args, **kwargs):
+        for text in ['{"suggestions"', ": []}"]:
+            yield SimpleNamespace(content=text)
+
+    repairs = []
+
+    async def repair(invalid):
+        repairs.append(invalid)
+        return []
+
+    monkeypatch.setattr(rag_service, "astream", tokens)
+    monkeypatch.setattr(rag_service, "arepair_suggestions", repair)
+
+    async def collect():
+        return [s async for s in rag_service.astream_suggestions("Fever and cough", ["Paracetamol for fever"])]
+
+    assert [s["content"] for s in asyncio.run(collect())] == [FALLBACK_SUGGESTION["content"]]
+    assert len(repairs) == 1